@@ -4,9 +4,21 @@ Functions and classes for handling Field Files
 Niema Moshiri 2019
 '''
 from . import NULL_BYTE,NULL_STR
-from .lzss import decompress_lzss
+from .lgp import LGP,update_lgp
+from .lzss import DEFAULT_STREAM_CHUNK_SIZE,LZSSDecompressor,compress_lzss_fast,compress_lzss_stream,decompress_lzss_fast
 from .text import decode_field_text
-from struct import pack,unpack
+from array import array
+from bisect import bisect_left,bisect_right
+from collections.abc import MutableMapping
+from hashlib import sha1
+from operator import itemgetter
+from os import makedirs
+from os.path import isfile,join
+from struct import Struct,pack,pack_into,unpack,unpack_from
+try:
+    import numpy as np; HAS_NUMPY = True
+except ImportError: # fall back to (slower) per-record loops
+    HAS_NUMPY = False
 
 # section names
 SECTION_NAME = [ # Sections 1-9
@@ -66,9 +78,13 @@ SECTION8_NUM_ARROWS = 12
 SECTION9_PAL_TITLE = "PALETTE"
 SECTION9_PAL_NUM_COLORS = 6
 SECTION9_BACK_TITLE = "BACK"
+SECTION9_LAYERS = ('layer_1', 'layer_2', 'layer_3', 'layer_4')
 SECTION9_TEX_TITLE = "TEXTURE"
 SECTION9_TEX_MAX_NUM = 42
+SECTION9_PAL_MAX_NUM_PAGES = 256 # tiles refer to their color page with a 1-byte palette_ID
 SECTION9_TEX_BYTES_PER_DEPTH = 65536
+SECTION9_TILE_DEPTH_DIRECT = 2 # tile depth of 16-bit direct color tiles (other depths index a color page)
+SECTION9_BLEND_MODES = ('average', 'add', 'subtract', 'quarter-add') # PSX semi-transparency modes, indexed by tile type_trans
 EOF_END_STRING = "END"
 EOF_FILE_TERMINATOR = "FINAL FANTASY7"
 STRING_TERMINATOR = b'\xff'
@@ -129,6 +145,18 @@ OP_KAWAI   = 0x28 # Character Graphics Opcode (Multibyte sequence)
 OP_RET     = 0x00 # Return from request / Halt
 OP_SPECIAL = 0x0F # Special Opcode (Multibyte sequence)
 
+# jump OP codes (the jump distance is always the last argument): map each opcode to the size of its jump distance
+OP_JUMP_FORWARD = { # target is relative to the jump distance argument
+    0x10: 1, 0x11: 2,                                     # skip, lskip
+    0x14: 1, 0x15: 2, 0x16: 1, 0x17: 2, 0x18: 1, 0x19: 2, # if (ifub), lif (ifubl), if2 (ifsw), lif2 (ifswl), if2 (ifuw), lif2 (ifuwl)
+    0x30: 1, 0x31: 1, 0x32: 1,                            # key!, keyon, keyof
+    0xCB: 1, 0xCC: 1,                                     # prtyq, membq
+}
+OP_JUMP_BACK = { # target is relative to the start of the instruction
+    0x12: 1, 0x13: 2,                                     # back, lback
+}
+OP_JUMP_LONG = {0x10: 0x11, 0x12: 0x13, 0x14: 0x15, 0x16: 0x17, 0x18: 0x19} # long version of each short jump (same arguments, 2-byte jump distance)
+
 # sizes
 SIZE = {
     # header sizes
@@ -338,6 +366,211 @@ COLOR_SHIFT_B = 10
 COLOR_SHIFT_G =  5
 COLOR_SHIFT_R =  0
 
+class RecordSchema:
+    '''Fixed-size record layout compiled from ``SIZE`` into a single ``struct.Struct``, so that a whole record is read with one ``unpack_from`` and written with one ``pack_into``'''
+    def __init__(self, fields):
+        '''``RecordSchema`` constructor
+
+        Args:
+            ``fields`` (``list`` of ``tuple``): The (name, ``SIZE`` key, format character, count) of each field in order, where format character ``'s'`` is raw bytes and count is ``None`` for a scalar or the length of a ``list`` value. A name of ``None`` is a blank (skipped when reading, NULL when writing), and a name starting with ``'_'`` is derived (skipped when reading unless requested, and passed as a keyword argument when writing)
+        '''
+        fmt = '<'; size = 0; self.start = dict(); self.defaults = dict(); self.fields = list(); self.columns = list()
+        for name, size_key, fmt_char, count in fields:
+            n = 1 if count is None else count
+            if name is None: # pad bytes: no value, and written as NULL
+                fmt += '%dx' % (SIZE[size_key]*n)
+            else:
+                if fmt_char == 's':
+                    fmt += '%ds' % SIZE[size_key]; blank = NULL_BYTE*SIZE[size_key]
+                    self.columns.append((name, 'B', SIZE[size_key])) # raw bytes are stored as unsigned chars
+                else:
+                    fmt += '%d%s' % (n, fmt_char); blank = 0
+                    self.columns.append((name, fmt_char, n))
+                if name[0] == '_':
+                    self.defaults[name] = blank
+                self.fields.append((name, count)); self.start[name] = size
+            size += SIZE[size_key]*n
+        self.struct = Struct(fmt); self.size = self.struct.size
+        if self.size != size:
+            raise ValueError("Invalid record schema")
+        self.has_lists = any(count is not None for name, count in self.fields)
+        names = [name for name, count in self.fields]
+        self.getter = itemgetter(*names) if len(names) > 1 else lambda d: (d[names[0]],)
+        self.kept = [(i,name) for i,name in enumerate(names) if name[0] != '_']
+        self.kept_derived = list(enumerate(names))
+        self.raw = {name for name, size_key, fmt_char, count in fields if fmt_char == 's'}
+        if HAS_NUMPY:
+            self.dtype = np.dtype({
+                'names': [name for name, typecode, width in self.columns],
+                'formats': [(np.dtype('<'+typecode), (width,)) if width > 1 else np.dtype('<'+typecode) for name, typecode, width in self.columns],
+                'offsets': [self.start[name] for name, typecode, width in self.columns],
+                'itemsize': self.size,
+            })
+
+    def unpack_from(self, data, offset=0, derived=False):
+        '''Read a record
+
+        Args:
+            ``data`` (``bytes``): The data to read from
+
+            ``offset`` (``int``): The start position of the record in ``data``
+
+            ``derived`` (``bool``): Also include the derived (``'_'``-prefixed) fields
+
+        Returns:
+            ``dict``: The record
+        '''
+        vals = self.struct.unpack_from(data, offset)
+        if self.has_lists: # regroup the flat values into one value per field
+            grouped = list(); i = 0
+            for name, count in self.fields:
+                if count is None:
+                    grouped.append(vals[i]); i += 1
+                else:
+                    grouped.append(list(vals[i:i+count])); i += count
+            vals = grouped
+        return {name:vals[i] for i,name in (self.kept_derived if derived else self.kept)}
+
+    def iter_unpack(self, data, offset, num_records):
+        '''Read consecutive records
+
+        Args:
+            ``data`` (``bytes``): The data to read from
+
+            ``offset`` (``int``): The start position of the first record in ``data``
+
+            ``num_records`` (``int``): The number of records to read
+
+        Returns:
+            ``list`` of ``dict``: The records
+        '''
+        return [self.unpack_from(data, offset + i*self.size) for i in range(num_records)]
+
+    def pack_into(self, buf, offset, record, **derived):
+        '''Write a record
+
+        Args:
+            ``buf`` (``bytearray``): The (preallocated) buffer to write into
+
+            ``offset`` (``int``): The start position of the record in ``buf``
+
+            ``record`` (``dict``): The record
+
+            ``derived`` (``int``): The values of derived fields (0 if not given)
+        '''
+        vals = self.getter({**self.defaults, **record, **derived} if self.defaults else record)
+        if self.has_lists: # flatten the list values
+            flat = list()
+            for (name, count), v in zip(self.fields, vals):
+                if count is None:
+                    flat.append(v)
+                else:
+                    flat.extend(v)
+            vals = flat
+        self.struct.pack_into(buf, offset, *vals)
+
+# record schemas: (name, SIZE key, format character, count)
+SECTION2_ENTRY_SCHEMA = RecordSchema([('vector_%s'%a, 'SECTION2-ENTRY_VECTOR-VALUE', 'H', SECTION2_NUM_DIMENSIONS) for a in SECTION2_AXES] + [
+    ('_vector_z_dup',         'SECTION2-ENTRY_VECTOR-VALUE',   'H', None), # duplicate of vector z dimension 3 (sanity check? padding?)
+    ('position_camera_space', 'SECTION2-ENTRY_SPACE-POSITION', 'I', len(SECTION2_AXES)),
+    ('blank',                 'SECTION2-ENTRY_BLANK',          's', None), # seems to usually be 0, but not always
+    ('zoom',                  'SECTION2-ENTRY_ZOOM',           'H', None), # unknown if it's unsigned or signed (Makou Reactor assumes signed)
+])
+SECTION5_SECTOR_SCHEMA = RecordSchema([('vertex_%d'%i, 'SECTION5-SP_VECTOR-VALUE', 'h', 4) for i in range(1, SECTION5_NUM_VERTICES_PER_SECTOR+1)]) # (x, y, z, res) per vertex
+SECTION5_ACCESS_SCHEMA = RecordSchema([('access', 'SECTION5-AP_VECTOR-VALUE', 'h', SECTION5_NUM_VERTICES_PER_SECTOR)])
+SECTION7_TABLE_SCHEMA = RecordSchema([
+    ('enabled',  'SECTION7_ENABLED',   'B', None),
+    ('rate',     'SECTION7_RATE',      'B', None),
+    ('standard', 'SECTION7_ENCOUNTER', 'H', SECTION7_NUM_STANDARD),
+    ('special',  'SECTION7_ENCOUNTER', 'H', SECTION7_NUM_SPECIAL),
+    ('pad',      'SECTION7_PAD',       's', None),
+])
+SECTION8_HEADER_SCHEMA = RecordSchema([
+    ('name',              'SECTION8_FIELD-NAME',        's', None),
+    ('control_direction', 'SECTION8_CONTROL-DIRECTION', 'b', None),
+    ('focus_height',      'SECTION8_FOCUS-HEIGHT',      'h', None),
+    ('camera_range',      'SECTION8_CAMERA-RANGE-DIR',  'h', 4), # left, bottom, right, top
+    ('unknown_1',         'SECTION8_UNKNOWN-1',         'H', 2), # layer 3, layer 4
+    ('bg_animation',      'SECTION8_ANIMATION-WIDTH',   'h', 4), # layer 3 (width, height), layer 4 (width, height)
+    ('unknown_2_layer_3', 'SECTION8_UNKNOWN-2',         's', None),
+    ('unknown_2_layer_4', 'SECTION8_UNKNOWN-2',         's', None),
+])
+SECTION8_GATEWAY_SCHEMA = RecordSchema([
+    ('exit_vertex_1',      'SECTION8-GATEWAY_VERTEX-DIM', 'h', 3), # x, z, y
+    ('exit_vertex_2',      'SECTION8-GATEWAY_VERTEX-DIM', 'h', 3), # x, z, y
+    ('destination_vertex', 'SECTION8-GATEWAY_VERTEX-DIM', 'h', 3), # x, z, y
+    ('field_ID',           'SECTION8-GATEWAY_FIELD-ID',   'H', None),
+    ('unknown',            'SECTION8-GATEWAY_UNKNOWN',    's', None),
+])
+SECTION8_TRIGGER_SCHEMA = RecordSchema([
+    ('vertex_corner_1', 'SECTION8-TRIGGER_VERTEX-DIM',  'h', 3), # x, y, z
+    ('vertex_corner_2', 'SECTION8-TRIGGER_VERTEX-DIM',  'h', 3), # x, y, z
+    ('bg_group_ID',     'SECTION8-TRIGGER_BG-GROUP-ID', 'b', None),
+    ('bg_frame_ID',     'SECTION8-TRIGGER_BG-FRAME-ID', 'B', None),
+    ('behavior',        'SECTION8-TRIGGER_BEHAVIOR',    'B', None),
+    ('sound_ID',        'SECTION8-TRIGGER_SOUND-ID',    'B', None),
+])
+SECTION8_SHOWN_ARROWS_SCHEMA = RecordSchema([('shown_arrows', 'SECTION8_SHOWN-ARROW', 'B', SECTION8_NUM_SHOWN_ARROWS)])
+SECTION8_ARROW_SCHEMA = RecordSchema([
+    ('position', 'SECTION8-ARROW_POSITION', 'i', 3), # x, z, y
+    ('type',     'SECTION8-ARROW_TYPE',     'i', None),
+])
+SECTION9_HEADER_SCHEMA = RecordSchema([
+    ('unknown1', 'SECTION9-HEADER_UNKNOWN1', 'H', None),
+    ('depth',    'SECTION9-HEADER_DEPTH',    'H', None),
+    ('unknown2', 'SECTION9-HEADER_UNKNOWN2', 'B', None),
+])
+SECTION9_PAL_SCHEMA = RecordSchema([
+    ('_title', 'SECTION9-PAL_TITLE',  's', None), # the string "PALETTE"
+    ('size',   'SECTION9-PAL_SIZE',   'I', None),
+    ('palX',   'SECTION9-PAL_PALX',   'H', None),
+    ('palY',   'SECTION9-PAL_PALY',   'H', None),
+    ('width',  'SECTION9-PAL_WIDTH',  'H', None),
+    ('height', 'SECTION9-PAL_HEIGHT', 'H', None),
+    ('colors', 'SECTION9-PAL_COLOR',  'H', SECTION9_PAL_NUM_COLORS),
+])
+SECTION9_LAYER_SCHEMA = {
+    'layer_1': RecordSchema([('width', 'SECTION9-BACK-L1_WIDTH', 'H', None), ('height', 'SECTION9-BACK-L1_HEIGHT', 'H', None), ('_num_tiles', 'SECTION9-BACK-L1_NUM-TILES', 'H', None), ('depth', 'SECTION9-BACK-L1_DEPTH', 'H', None), (None, 'SECTION9-BACK-L1_BLANK', 'H', None)]),
+    'layer_2': RecordSchema([('width', 'SECTION9-BACK-L2_WIDTH', 'H', None), ('height', 'SECTION9-BACK-L2_HEIGHT', 'H', None), ('_num_tiles', 'SECTION9-BACK-L2_NUM-TILES', 'H', None), ('unknown', 'SECTION9-BACK-L2_UNKNOWN', 's', None), (None, 'SECTION9-BACK-L2_BLANK', 'H', None)]),
+    'layer_3': RecordSchema([('width', 'SECTION9-BACK-L3_WIDTH', 'H', None), ('height', 'SECTION9-BACK-L3_HEIGHT', 'H', None), ('_num_tiles', 'SECTION9-BACK-L3_NUM-TILES', 'H', None), ('unknown', 'SECTION9-BACK-L3_UNKNOWN', 's', None), (None, 'SECTION9-BACK-L3_BLANK', 'H', None)]),
+    'layer_4': RecordSchema([('width', 'SECTION9-BACK-L4_WIDTH', 'H', None), ('height', 'SECTION9-BACK-L4_HEIGHT', 'H', None), ('_num_tiles', 'SECTION9-BACK-L4_NUM-TILES', 'H', None), ('unknown', 'SECTION9-BACK-L4_UNKNOWN', 's', None), (None, 'SECTION9-BACK-L4_BLANK', 'H', None)]),
+}
+SECTION9_TILE_SCHEMA = RecordSchema([
+    (None,          'SECTION9-BACK-TILE_BLANK',       'H', None),
+    ('dst_x',       'SECTION9-BACK-TILE_DST-X',       'h', None),
+    ('dst_y',       'SECTION9-BACK-TILE_DST-Y',       'h', None),
+    ('unknown_1',   'SECTION9-BACK-TILE_UNKNOWN-1',   's', None),
+    ('src_x',       'SECTION9-BACK-TILE_SRC-X',       'B', None),
+    ('unknown_2',   'SECTION9-BACK-TILE_UNKNOWN-2',   's', None),
+    ('src_y',       'SECTION9-BACK-TILE_SRC-Y',       'B', None),
+    ('unknown_3',   'SECTION9-BACK-TILE_UNKNOWN-3',   's', None),
+    ('src_x2',      'SECTION9-BACK-TILE_SRC-X2',      'B', None),
+    ('unknown_4',   'SECTION9-BACK-TILE_UNKNOWN-4',   's', None),
+    ('src_y2',      'SECTION9-BACK-TILE_SRC-Y2',      'B', None),
+    ('unknown_5',   'SECTION9-BACK-TILE_UNKNOWN-5',   's', None),
+    ('width',       'SECTION9-BACK-TILE_WIDTH',       'H', None),
+    ('height',      'SECTION9-BACK-TILE_HEIGHT',      'H', None),
+    ('palette_ID',  'SECTION9-BACK-TILE_PALETTE-ID',  'B', None),
+    ('unknown_6',   'SECTION9-BACK-TILE_UNKNOWN-6',   's', None),
+    ('ID',          'SECTION9-BACK-TILE_ID',          'H', None),
+    ('param',       'SECTION9-BACK-TILE_PARAM',       'B', None),
+    ('state',       'SECTION9-BACK-TILE_STATE',       'B', None),
+    ('blending',    'SECTION9-BACK-TILE_BLENDING',    'B', None),
+    ('unknown_7',   'SECTION9-BACK-TILE_UNKNOWN-7',   's', None),
+    ('type_trans',  'SECTION9-BACK-TILE_TYPE-TRANS',  'B', None),
+    ('unknown_8',   'SECTION9-BACK-TILE_UNKNOWN-8',   's', None),
+    ('texture_id',  'SECTION9-BACK-TILE_TEXTURE-ID',  'B', None),
+    ('unknown_9',   'SECTION9-BACK-TILE_UNKNOWN-9',   's', None),
+    ('texture_id2', 'SECTION9-BACK-TILE_TEXTURE-ID2', 'B', None),
+    ('unknown_10',  'SECTION9-BACK-TILE_UNKNOWN-10',  's', None),
+    ('depth',       'SECTION9-BACK-TILE_DEPTH',       'B', None),
+    ('unknown_11',  'SECTION9-BACK-TILE_UNKNOWN-11',  's', None),
+    ('ID_big',      'SECTION9-BACK-TILE_ID-BIG',      'I', None),
+    ('_src_x_big',  'SECTION9-BACK-TILE_SRC-X-BIG',   'I', None), # derived from src_x when writing
+    ('_src_y_big',  'SECTION9-BACK-TILE_SRC-Y-BIG',   'I', None), # derived from src_y when writing
+    (None,          'SECTION9-BACK-TILE_BLANK-2',     'H', None),
+])
+
 def color_convert_bit(color,x,y):
     '''Convert an x-bit color into an y-bit color
 
@@ -371,6 +604,111 @@ def rgba_to_color(rgba):
     r,g,b,a = rgba
     return (r << COLOR_SHIFT_R) | (g << COLOR_SHIFT_G) | (b << COLOR_SHIFT_B) | (a << COLOR_SHIFT_A)
 
+def expand_color_pages(color_pages):
+    '''Convert Field color pages (5-bit RGBA) into a single 8-bit RGB NumPy array (requires NumPy)
+
+    Args:
+        ``color_pages`` (``list`` of ``list`` of ``tuple``): The color pages (e.g. ``Palette.color_pages``)
+
+    Returns:
+        ``numpy.ndarray``: The 8-bit RGB colors (shape: pages x colors x 3), where short pages are padded with black
+    '''
+    lut = np.array([color_convert_bit(c,5,8) for c in range(COLOR_MASK+1)], dtype=np.uint8)
+    pages = np.zeros((len(color_pages), max((len(p) for p in color_pages), default=0), 3), dtype=np.uint8)
+    for i,page in enumerate(color_pages):
+        if len(page) != 0:
+            pages[i,:len(page)] = lut[np.array([c[:3] for c in page], dtype=np.int64)]
+    return pages
+
+def blend_color(back, front, mode):
+    '''Blend an 8-bit RGB color onto another with a PSX semi-transparency mode
+
+    Args:
+        ``back`` (``tuple`` of ``int``): The color already drawn
+
+        ``front`` (``tuple`` of ``int``): The color being drawn
+
+        ``mode`` (``int``): The blending mode (index into ``SECTION9_BLEND_MODES``), or ``None`` to draw ``front`` as-is
+
+    Returns:
+        ``tuple`` of ``int``: The resulting color
+    '''
+    if mode is None:
+        return tuple(front)
+    elif mode == 0: # average
+        return tuple(b//2 + f//2 for b,f in zip(back,front))
+    elif mode == 1: # add
+        return tuple(min(b + f, 255) for b,f in zip(back,front))
+    elif mode == 2: # subtract
+        return tuple(max(b - f, 0) for b,f in zip(back,front))
+    else: # quarter-add
+        return tuple(min(b + f//4, 255) for b,f in zip(back,front))
+
+def count_bits(bits):
+    '''Count the set bits of a bitset
+
+    Args:
+        ``bits`` (``int``): The bitset
+
+    Returns:
+        ``int``: The number of set bits
+    '''
+    return bin(bits).count('1')
+
+def pack_color_sets(color_sets, capacity=256, window=256):
+    '''Pack sets of colors (one per tile) into as few color pages as possible, without splitting any set across pages
+
+    Pages are filled one at a time: each step adds the tile (among the next ``window`` unplaced tiles, so nearby tiles with similar colors end up together) that adds the fewest new colors to the page and still fits. This is compared against the original greedy packing (tiles in order, each into the page that ends up smallest), and the packing with fewer pages is kept
+
+    Args:
+        ``color_sets`` (``list`` of ``int``): The color set of each tile, as a bitset (bit i is set if the tile uses color i)
+
+        ``capacity`` (``int``): The maximum number of colors per page
+
+        ``window`` (``int``): The number of upcoming tiles to consider for each step of page filling
+
+    Returns:
+        ``list`` of ``int``: The page of each tile
+
+        ``int``: The number of pages
+    '''
+    popcount = getattr(int, 'bit_count', count_bits) # int.bit_count is much faster (Python 3.10+)
+    if max((popcount(bits) for bits in color_sets), default=0) > capacity:
+        raise ValueError("A tile has more than %d colors" % capacity)
+
+    # original greedy packing
+    greedy = [None]*len(color_sets); pages = [0]; page_sizes = [0]
+    for i,bits in enumerate(color_sets):
+        best = None; best_size = None
+        for p,page in enumerate(pages):
+            size = page_sizes[p] + popcount(bits & ~page)
+            if size <= capacity and (best is None or size < best_size):
+                best = p; best_size = size
+        if best is None: # no color page can fit all of them, so make a new page
+            best = len(pages); best_size = popcount(bits); pages.append(0); page_sizes.append(0)
+        pages[best] |= bits; page_sizes[best] = best_size; greedy[i] = best
+    num_greedy = len(pages)
+
+    # page filling
+    filled = [None]*len(color_sets); remaining = list(range(len(color_sets))); num_filled = 0
+    while len(remaining) != 0:
+        page = 0; page_size = 0
+        while True:
+            best = None; best_new = None
+            for j,i in enumerate(remaining[:window]):
+                new = popcount(color_sets[i] & ~page)
+                if page_size + new <= capacity and (best is None or new < best_new):
+                    best = j; best_new = new
+                    if new == 0:
+                        break
+            if best is None:
+                break
+            i = remaining.pop(best); page |= color_sets[i]; page_size += best_new; filled[i] = num_filled
+        num_filled += 1
+    if num_greedy < num_filled:
+        return greedy, num_greedy
+    return filled, num_filled
+
 def instruction_size(code, offset):
     '''Find the size of the instruction at the given offset in a script code block
 
@@ -389,6 +727,183 @@ def instruction_size(code, offset):
         size = code[offset+1]
     return size
 
+def opcode_name(opcode):
+    '''Return the name of an opcode, as stored in a ``ScriptIndex`` (special opcodes are ``(OP_SPECIAL << 8) | sub_op``)
+
+    Args:
+        ``opcode`` (``int``): The opcode
+
+    Returns:
+        ``str``: The name of the opcode
+    '''
+    if opcode > 0xFF:
+        return SPECIAL_OP_CODES.get(opcode & 0xFF, ("", -1))[0]
+    return OP[opcode][0]
+
+def jump_width(opcode):
+    '''Return the size of the jump distance argument of a jump opcode
+
+    Args:
+        ``opcode`` (``int``): The opcode
+
+    Returns:
+        ``int``: The size of the jump distance (in bytes), or ``None`` if the opcode isn't a jump
+    '''
+    return OP_JUMP_FORWARD.get(opcode, OP_JUMP_BACK.get(opcode))
+
+class ScriptIndex:
+    '''Instruction index of a Field Script's code, built in one linear pass
+
+    All offsets are offsets into the Field Script section (like the entries of ``FieldScript.actor_scripts``). Each region between consecutive script entry offsets is decoded on its own (an instruction that runs past the next entry is cut off there, and isn't treated as a jump), so bytes that can't be reached from an entry don't throw the decoding off
+    '''
+    def __init__(self, code, start_offset, actor_scripts):
+        '''``ScriptIndex`` constructor
+
+        Args:
+            ``code`` (``bytes``): The script code
+
+            ``start_offset`` (``int``): The offset of the script code in the Field Script section
+
+            ``actor_scripts`` (``list`` of ``list`` of ``int``): The entry offsets of the scripts of each actor
+        '''
+        self.start_offset = start_offset; self.end_offset = end_offset = start_offset + len(code)
+        self.offsets = array('I'); self.opcodes = array('H'); self.sizes = array('H')
+        self.jumps = dict() # map the index of each jump instruction to its target offset
+        self.by_opcode = dict() # map each opcode to the indices of its instructions
+        op_sizes = [size+1 for name,size in OP]; special_sizes = {sub_op:size+2 for sub_op,(name,size) in SPECIAL_OP_CODES.items()}
+
+        # decode each region between consecutive script entry offsets
+        self.entries = sorted({e for scripts in actor_scripts for e in scripts if start_offset <= e < end_offset})
+        self.entry_owners = dict() # map each entry offset to the (actor, script) pairs that start there
+        for actor,scripts in enumerate(actor_scripts):
+            for script,e in enumerate(scripts):
+                self.entry_owners.setdefault(e, list()).append((actor,script))
+        starts = self.entries if len(self.entries) != 0 and self.entries[0] == start_offset else [start_offset] + self.entries
+        for region_start,region_end in zip(starts, starts[1:] + [end_offset]):
+            pos = region_start
+            while pos < region_end:
+                i = pos - start_offset; op = code[i]; size = op_sizes[op]
+                if op == OP_SPECIAL:
+                    op = (OP_SPECIAL << 8) | code[i+1] if pos+1 < region_end else op
+                    size = special_sizes.get(op & 0xFF, 2)
+                elif op == OP_KAWAI:
+                    size = code[i+1] if pos+1 < region_end else 1
+                if size < 1: # unknown opcode (or broken kawai size)
+                    size = 1
+                width = jump_width(op)
+                if pos + size > region_end: # runs into the next script
+                    size = region_end - pos; width = None
+                if width is not None:
+                    arg = i + size - width
+                    distance = int.from_bytes(code[arg:arg+width], 'little')
+                    self.jumps[len(self.offsets)] = start_offset + arg + distance if op in OP_JUMP_FORWARD else pos - distance
+                self.by_opcode.setdefault(op, array('I')).append(len(self.offsets))
+                self.offsets.append(pos); self.opcodes.append(op); self.sizes.append(size); pos += size
+
+        # map each jump target to the jumps that go there
+        self.references = dict()
+        for i,target in self.jumps.items():
+            self.references.setdefault(target, list()).append(self.offsets[i])
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def index_of(self, offset):
+        '''Return the index of the instruction that starts at the given offset
+
+        Args:
+            ``offset`` (``int``): The offset
+
+        Returns:
+            ``int``: The index of the instruction
+        '''
+        i = bisect_left(self.offsets, offset)
+        if i == len(self.offsets) or self.offsets[i] != offset:
+            raise ValueError("No instruction starts at offset %d" % offset)
+        return i
+
+    def find(self, offset):
+        '''Return the index of the instruction that contains the given offset
+
+        Args:
+            ``offset`` (``int``): The offset
+
+        Returns:
+            ``int``: The index of the instruction, or ``None`` if no instruction contains the offset
+        '''
+        i = bisect_right(self.offsets, offset) - 1
+        if i < 0 or offset >= self.offsets[i] + self.sizes[i]:
+            return None
+        return i
+
+    def find_opcode(self, opcode):
+        '''Return the offsets of all instructions with the given opcode
+
+        Args:
+            ``opcode`` (``int``): The opcode (special opcodes are ``(OP_SPECIAL << 8) | sub_op``)
+
+        Returns:
+            ``list`` of ``int``: The offsets of the instructions
+        '''
+        return [self.offsets[i] for i in self.by_opcode.get(opcode, ())]
+
+    def count_opcodes(self):
+        '''Return the number of times each opcode is used
+
+        Returns:
+            ``dict``: Map each opcode (special opcodes are ``(OP_SPECIAL << 8) | sub_op``) to its number of instructions
+        '''
+        return {op:len(inds) for op,inds in self.by_opcode.items()}
+
+    def get_jump_target(self, offset):
+        '''Return the target of the jump instruction at the given offset
+
+        Args:
+            ``offset`` (``int``): The offset of the jump instruction
+
+        Returns:
+            ``int``: The target offset, or ``None`` if the instruction isn't a jump
+        '''
+        return self.jumps.get(self.index_of(offset))
+
+    def get_references(self, offset):
+        '''Return the offsets of the jump instructions that target the given offset
+
+        Args:
+            ``offset`` (``int``): The target offset
+
+        Returns:
+            ``list`` of ``int``: The offsets of the jump instructions
+        '''
+        return self.references.get(offset, list())
+
+    def get_script_range(self, entry):
+        '''Return the instructions of the script starting at the given entry offset (up to the next entry offset)
+
+        Args:
+            ``entry`` (``int``): The entry offset of the script (e.g. ``FieldScript.actor_scripts[actor][script]``)
+
+        Returns:
+            ``range``: The indices of the instructions of the script
+        '''
+        e = bisect_right(self.entries, entry)
+        end = self.entries[e] if e < len(self.entries) else self.end_offset
+        return range(bisect_left(self.offsets, entry), bisect_left(self.offsets, end))
+
+    def get_owners(self, offset):
+        '''Return the scripts whose code contains the given offset (i.e., the scripts starting at the closest entry offset at or before it)
+
+        Args:
+            ``offset`` (``int``): The offset
+
+        Returns:
+            ``list`` of ``tuple``: The (actor, script) pairs
+        '''
+        e = bisect_right(self.entries, offset) - 1
+        if e < 0:
+            return list()
+        return self.entry_owners[self.entries[e]]
+
 class FieldScript:
     '''Field Script (Section 1) class'''
     def __init__(self, data):
@@ -423,18 +938,8 @@ class FieldScript:
         if (len(self.script_code) + self.script_start_offset) in self.script_entry_offsets:
             self.script_code.append(OP_RET) # the SNW_W field has (unused) pointers after the end of the code
         
-        # add 33rd element to each script entry table which points to the instruction after the first RET of the default script (see https://github.com/niemasd/ff7tools/blob/master/ff7/field.py#L151)
-        for i in range(num_actors):
-            default_script = self.actor_scripts[i][0]
-            code_offset = default_script - self.script_start_offset
-            while code_offset < len(self.script_code):
-                if self.script_code[code_offset] == OP_RET:
-                    entry = code_offset + self.script_start_offset + 1
-                    self.actor_scripts[i].append(entry)
-                    self.script_entry_offsets.add(entry)
-                    break
-                else:
-                    code_offset += instruction_size(self.script_code, code_offset)
+        self._index = None; self._index_key = None; self._strings = None; self._strings_key = None
+        self.add_default_script_ends()
 
         # read the string offset table
         ind = string_table_offset
@@ -456,13 +961,173 @@ class FieldScript:
     def __ne__(self, other):
         return not self == other
 
+    def add_default_script_ends(self):
+        '''Add the 33rd element to each script entry table, which points to the instruction after the first RET of the default script (see https://github.com/niemasd/ff7tools/blob/master/ff7/field.py#L151)'''
+        index = ScriptIndex(self.script_code, self.script_start_offset, self.actor_scripts); rets = index.by_opcode.get(OP_RET, ())
+        for scripts in self.actor_scripts:
+            r = bisect_left(rets, bisect_left(index.offsets, scripts[0]))
+            if r < len(rets):
+                entry = index.offsets[rets[r]] + 1
+                scripts.append(entry)
+                self.script_entry_offsets.add(entry)
+
+    def disassemble(self):
+        '''Disassemble this Field Script's code into a list of instructions. Each instruction is a ``dict`` with:
+
+        * ``label``: A name for the instruction (its offset), used by jumps and script entries to refer to it
+        * ``opcode``: The opcode (special opcodes are ``(OP_SPECIAL << 8) | sub_op``)
+        * ``args``: The bytes of the arguments (without the jump distance of jumps)
+        * ``target``: The label of the jump target, or ``None`` if it isn't a jump (or it's cut off by the next script entry, in which case its bytes are kept as-is in ``args``). If the target isn't the start of an instruction (e.g. it's the end of the code), it's a ``(label, delta)`` pair: ``delta`` bytes after the instruction with that label (the closest one before the target)
+
+        Returns:
+            ``list`` of ``dict``: The instructions
+        '''
+        index = self.get_index(); starts = set(index.offsets); instructions = list()
+        for i,(offset,op,size) in enumerate(zip(index.offsets, index.opcodes, index.sizes)):
+            ind = offset - self.script_start_offset; end = ind + size
+            args = bytes(self.script_code[ind + (2 if op > 0xFF else 1) : end]); target = index.jumps.get(i)
+            if target is not None:
+                args = args[:len(args)-jump_width(op)]
+                if target not in starts: # anchor it to the closest instruction before it, so it's still relocated
+                    anchor = index.offsets[max(0, bisect_right(index.offsets, target) - 1)]; target = (anchor, target - anchor)
+            instructions.append({'label':offset, 'opcode':op, 'args':args, 'target':target})
+        return instructions
+
+    def assemble(self, instructions, actor_scripts=None):
+        '''Lay out a list of instructions (see ``disassemble``) as this Field Script's code: instruction offsets, jump distances, and script entry offsets are all recomputed (the string table offset follows the code, so ``get_bytes`` picks it up). Short jumps that can no longer reach their targets are turned into long jumps, and the size byte of each KAWAI instruction is recomputed from its arguments
+
+        Args:
+            ``instructions`` (``list`` of ``dict``): The instructions (a ``label`` of ``None`` means nothing refers to the instruction, and a ``target`` can be a label or a ``(label, delta)`` pair)
+
+            ``actor_scripts`` (``list`` of ``list``): The labels of the (first 32) script entries of each actor, or ``None`` to keep the current entries (i.e., if the labels are the offsets from ``disassemble``)
+        '''
+        if actor_scripts is None:
+            actor_scripts = [scripts[:SECTION1_HEADER_NUM_SCRIPTS_PER_ACTOR] for scripts in self.actor_scripts]
+        if len(actor_scripts) != len(self.actor_names):
+            raise ValueError("Expected script entries of %d actors, but got %d" % (len(self.actor_names), len(actor_scripts)))
+        opcodes = [ins['opcode'] for ins in instructions]
+        while True:
+            # lay out the instructions
+            offsets = list(); label_offset = dict(); offset = self.script_start_offset
+            for ins,op in zip(instructions, opcodes):
+                if ins['label'] is not None:
+                    if ins['label'] in label_offset:
+                        raise ValueError("Duplicate label: %s" % ins['label'])
+                    label_offset[ins['label']] = offset
+                offsets.append(offset)
+                offset += (2 if op > 0xFF else 1) + len(ins['args']) + (jump_width(op) if ins['target'] is not None else 0)
+
+            # encode the instructions (and jump distances)
+            code = bytearray(); promoted = False
+            for i,(ins,op,offset) in enumerate(zip(instructions, opcodes, offsets)):
+                code += op.to_bytes(2 if op > 0xFF else 1, 'big'); args = ins['args']
+                if op == OP_KAWAI and len(args) != 0: # the first argument is the size of the whole instruction
+                    if len(args) >= 0xFF:
+                        raise ValueError("Instruction %s (%s) is too long (%d bytes)" % (ins['label'], opcode_name(op), len(args)+1))
+                    args = bytes([len(args)+1]) + args[1:]
+                code += args
+                if ins['target'] is None:
+                    continue
+                width = jump_width(op)
+                if width is None:
+                    raise ValueError("Instruction %s (%s) has a jump target, but isn't a jump" % (ins['label'], opcode_name(op)))
+                label,delta = ins['target'] if isinstance(ins['target'], tuple) else (ins['target'], 0)
+                if label not in label_offset:
+                    raise ValueError("Unknown jump target: %s" % label)
+                target = label_offset[label] + delta
+                distance = target - len(code) - self.script_start_offset if op in OP_JUMP_FORWARD else offset - target
+                if distance < 0:
+                    raise ValueError("Jump %s (%s) can't reach %s" % (ins['label'], opcode_name(op), ins['target']))
+                if distance >= 1 << (8*width):
+                    if op not in OP_JUMP_LONG:
+                        raise ValueError("Jump %s (%s) can't reach %s" % (ins['label'], opcode_name(op), ins['target']))
+                    opcodes[i] = OP_JUMP_LONG[op]; promoted = True
+                    continue
+                code += distance.to_bytes(width, 'little')
+            if not promoted:
+                break
+
+        # update the script entries
+        for scripts in actor_scripts:
+            for label in scripts:
+                if label not in label_offset:
+                    raise ValueError("Unknown script entry: %s" % label)
+        self.script_code = code
+        self.actor_scripts = [[label_offset[label] for label in scripts] for scripts in actor_scripts]
+        self.script_entry_offsets = {e for scripts in self.actor_scripts for e in scripts}
+        self.add_default_script_ends()
+
+    def disassemble_text(self):
+        '''Disassemble this Field Script's code into text: one ``.entry <actor> <script> <label>`` line per script entry, followed by one ``<label>: <opcode> <name> <args> [-> <target> [<+/-delta>]]`` line per instruction (opcodes, arguments, and deltas in hex). Lines starting with ``;`` are comments
+
+        Returns:
+            ``str``: The disassembly
+        '''
+        label = lambda offset: "L%04X" % offset
+        lines = ["; %s (%s)" % (self.name, ', '.join(self.actor_names))]
+        for actor,scripts in enumerate(self.actor_scripts):
+            for script,entry in enumerate(scripts[:SECTION1_HEADER_NUM_SCRIPTS_PER_ACTOR]):
+                lines.append(".entry %d %d %s" % (actor, script, label(entry)))
+        for ins in self.disassemble():
+            line = "%s: %s %s" % (label(ins['label']), ("%04X" if ins['opcode'] > 0xFF else "%02X") % ins['opcode'], opcode_name(ins['opcode']) or '?')
+            if len(ins['args']) != 0:
+                line += ' ' + ' '.join("%02X" % b for b in ins['args'])
+            if isinstance(ins['target'], tuple):
+                line += " -> %s %+X" % (label(ins['target'][0]), ins['target'][1])
+            elif ins['target'] is not None:
+                line += " -> %s" % label(ins['target'])
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+    def assemble_text(self, text):
+        '''Assemble text (see ``disassemble_text``) as this Field Script's code. Instructions can be added (with or without a label), removed, or changed: only the opcode (the name is ignored), arguments, and jump target matter
+
+        Args:
+            ``text`` (``str``): The disassembly
+        '''
+        instructions = list(); actor_scripts = [[None]*SECTION1_HEADER_NUM_SCRIPTS_PER_ACTOR for a in self.actor_names]
+        for num,line in enumerate(text.splitlines()):
+            tokens = line.split(';')[0].split()
+            if len(tokens) == 0:
+                continue
+            try:
+                if tokens[0] == '.entry':
+                    actor_scripts[int(tokens[1])][int(tokens[2])] = tokens[3]; continue
+                label = None; target = None
+                if tokens[0].endswith(':'):
+                    label = tokens[0][:-1]; tokens = tokens[1:]
+                if len(tokens) > 1 and tokens[-2] == '->':
+                    target = tokens[-1]; tokens = tokens[:-2]
+                elif len(tokens) > 2 and tokens[-3] == '->':
+                    target = (tokens[-2], int(tokens[-1],16)); tokens = tokens[:-3]
+                instructions.append({'label':label, 'opcode':int(tokens[0],16), 'args':bytes(int(t,16) for t in tokens[2:]), 'target':target})
+            except (IndexError,ValueError):
+                raise ValueError("Invalid line %d: %s" % (num+1, line))
+        if None in {e for scripts in actor_scripts for e in scripts}:
+            raise ValueError("Missing script entries")
+        self.assemble(instructions, actor_scripts)
+
+    def get_index(self):
+        '''Return the instruction index of this Field Script's code (it's rebuilt only if ``script_code`` or ``actor_scripts`` changed, even in place)
+
+        Returns:
+            ``ScriptIndex``: The instruction index
+        '''
+        key = (self.script_start_offset, len(self.script_code), sha1(self.script_code).digest(), tuple(tuple(scripts) for scripts in self.actor_scripts))
+        if self._index is None or self._index_key != key:
+            self._index = ScriptIndex(self.script_code, self.script_start_offset, self.actor_scripts); self._index_key = key
+        return self._index
+
     def get_strings(self):
-        '''Return the strings in this Field Script
+        '''Return the strings in this Field Script (they're decoded once, and only decoded again if ``string_data`` changed, even in place)
 
         Returns:
             ``list`` of ``str``: The strings in this Field Script
         '''
-        return [decode_field_text(s) for s in self.string_data]
+        key = tuple(bytes(s) for s in self.string_data) # bytes(s) is s itself for bytes, so this only copies mutable strings
+        if self._strings is None or self._strings_key != key:
+            self._strings = [decode_field_text(s) for s in key]; self._strings_key = key
+        return list(self._strings)
 
     def get_bytes(self, version=DEFAULT_VERSION):
         '''Return the bytes encoding this Field Script to repack into a Field File
@@ -521,32 +1186,14 @@ class CameraMatrix:
         Args:
             ``data`` (``bytes``): The Camera Matrix (Section 2) data
         '''
-        self.cameras = list(); ind = 0
-        for _ in range(int(len(data)/SIZE['SECTION2-ENTRY'])):
-            cam = dict()
-
-            # read camera vectors
-            for a in SECTION2_AXES:
-                cam['vector_%s'%a] = list()
-                for __ in range(SECTION2_NUM_DIMENSIONS):
-                    cam['vector_%s'%a].append(unpack('H', data[ind:ind+SIZE['SECTION2-ENTRY_VECTOR-VALUE']])[0]); ind += SIZE['SECTION2-ENTRY_VECTOR-VALUE']
-
-            # read vector z 3rd dimension duplicate (sanity check? padding?)
-            vec_z_dim_3_dup = unpack('H', data[ind:ind+SIZE['SECTION2-ENTRY_VECTOR-VALUE']])[0]; ind += SIZE['SECTION2-ENTRY_VECTOR-VALUE']
-            if vec_z_dim_3_dup != cam['vector_z'][2]:
-                raise ValueError(ERROR_SECTION2_CAM_VEC_Z_DUP_MISMATCH)
-
-            # read camera space positions
-            cam['position_camera_space'] = list()
-            for _ in range(len(SECTION2_AXES)):
-                cam['position_camera_space'].append(unpack('I', data[ind:ind+SIZE['SECTION2-ENTRY_SPACE-POSITION']])[0]); ind += SIZE['SECTION2-ENTRY_SPACE-POSITION']
+        self.cameras = list()
+        for ind in range(0, len(data) - len(data) % SECTION2_ENTRY_SCHEMA.size, SECTION2_ENTRY_SCHEMA.size):
+            cam = SECTION2_ENTRY_SCHEMA.unpack_from(data, ind, derived=True)
 
-            # read blank (seems to usually be 0, but not always)
-            cam['blank'] = data[ind:ind+SIZE['SECTION2-ENTRY_BLANK']]; ind += SIZE['SECTION2-ENTRY_BLANK']
+            # check vector z 3rd dimension duplicate (sanity check? padding?)
+            if cam.pop('_vector_z_dup') != cam['vector_z'][2]:
+                raise ValueError(ERROR_SECTION2_CAM_VEC_Z_DUP_MISMATCH)
 
-            # read zoom (unknown if it's unsigned or signed, but Makou Reactor assumes signed, so I will to)
-            cam['zoom'] = unpack('H', data[ind:ind+SIZE['SECTION2-ENTRY_ZOOM']])[0]; ind += SIZE['SECTION2-ENTRY_ZOOM']
-            
             # camera is loaded, so append to cameras
             self.cameras.append(cam)
 
@@ -569,16 +1216,9 @@ class CameraMatrix:
         Returns:
             ``bytes``: The data to repack into a Field File
         '''
-        data = bytearray()
-        for cam in self.cameras:
-            for a in SECTION2_AXES:
-                for v in cam['vector_%s'%a]:
-                    data += pack('H', v)
-        data += pack('H', cam['vector_z'][2])
-        for v in cam['position_camera_space']:
-            data += pack('I', v)
-        data += cam['blank']
-        data += pack('H', cam['zoom'])
+        data = bytearray(len(self.cameras) * SECTION2_ENTRY_SCHEMA.size)
+        for i, cam in enumerate(self.cameras):
+            SECTION2_ENTRY_SCHEMA.pack_into(data, i * SECTION2_ENTRY_SCHEMA.size, cam, _vector_z_dup=cam['vector_z'][2])
         return data
 
 class ModelLoader:
@@ -721,21 +1361,12 @@ class Walkmesh:
             ``data`` (``bytes``): The Walkmesh (Section 5) data
         '''
         self.sector_pool = list(); self.access_pool = list(); ind = 0
-        num_sectors = unpack('I', data[ind:ind+SIZE['SECTION5-HEADER_NUM-SECTORS']])[0]; ind += SIZE['SECTION5-HEADER_NUM-SECTORS']
+        num_sectors = unpack_from('I', data, ind)[0]; ind += SIZE['SECTION5-HEADER_NUM-SECTORS']
         for _ in range(num_sectors):
-            triangle = list()
-            for __ in range(SECTION5_NUM_VERTICES_PER_SECTOR):
-                vertex_x = unpack('h', data[ind:ind+SIZE['SECTION5-SP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-SP_VECTOR-VALUE']
-                vertex_y = unpack('h', data[ind:ind+SIZE['SECTION5-SP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-SP_VECTOR-VALUE']
-                vertex_z = unpack('h', data[ind:ind+SIZE['SECTION5-SP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-SP_VECTOR-VALUE']
-                vertex_r = unpack('h', data[ind:ind+SIZE['SECTION5-SP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-SP_VECTOR-VALUE']
-                triangle.append([vertex_x, vertex_y, vertex_z, vertex_r])
-            self.sector_pool.append(triangle)
+            sector = SECTION5_SECTOR_SCHEMA.unpack_from(data, ind); ind += SECTION5_SECTOR_SCHEMA.size
+            self.sector_pool.append([sector['vertex_%d'%i] for i in range(1, SECTION5_NUM_VERTICES_PER_SECTOR+1)])
         for _ in range(num_sectors):
-            access_1 = unpack('h', data[ind:ind+SIZE['SECTION5-AP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-AP_VECTOR-VALUE']
-            access_2 = unpack('h', data[ind:ind+SIZE['SECTION5-AP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-AP_VECTOR-VALUE']
-            access_3 = unpack('h', data[ind:ind+SIZE['SECTION5-AP_VECTOR-VALUE']])[0]; ind += SIZE['SECTION5-AP_VECTOR-VALUE']
-            self.access_pool.append([access_1, access_2, access_3])
+            self.access_pool.append(SECTION5_ACCESS_SCHEMA.unpack_from(data, ind)['access']); ind += SECTION5_ACCESS_SCHEMA.size
 
     def __eq__(self, other):
         return isinstance(other,Walkmesh) and self.sector_pool == other.sector_pool and self.access_pool == other.access_pool
@@ -762,15 +1393,12 @@ class Walkmesh:
         Returns:
             ``bytes``: The data to repack into a Field File
         '''
-        data = bytearray()
-        data += pack('I', len(self.sector_pool))
+        data = bytearray(SIZE['SECTION5-HEADER_NUM-SECTORS'] + len(self.sector_pool)*SECTION5_SECTOR_SCHEMA.size + len(self.access_pool)*SECTION5_ACCESS_SCHEMA.size)
+        pack_into('I', data, 0, len(self.sector_pool)); ind = SIZE['SECTION5-HEADER_NUM-SECTORS']
         for triangle in self.sector_pool:
-            for vertex in triangle:
-                for v in vertex:
-                    data += pack('h', v)
+            SECTION5_SECTOR_SCHEMA.pack_into(data, ind, {'vertex_%d'%(i+1):vertex for i,vertex in enumerate(triangle)}); ind += SECTION5_SECTOR_SCHEMA.size
         for vector in self.access_pool:
-            for v in vector:
-                data += pack('h', v)
+            SECTION5_ACCESS_SCHEMA.pack_into(data, ind, {'access':vector}); ind += SECTION5_ACCESS_SCHEMA.size
         return data
 
 def parse_sec6_sprite_tp_blend(raw):
@@ -841,18 +1469,13 @@ class Encounter:
         '''
         self.table_1 = dict(); self.table_2 = dict(); ind = 0
         for table in [self.table_1, self.table_2]:
-            table['enabled'] = unpack('B', data[ind:ind+SIZE['SECTION7_ENABLED']])[0]; ind += SIZE['SECTION7_ENABLED']
-            table['rate'] = unpack('B', data[ind:ind+SIZE['SECTION7_RATE']])[0]; ind += SIZE['SECTION7_RATE']
+            table.update(SECTION7_TABLE_SCHEMA.unpack_from(data, ind)); ind += SECTION7_TABLE_SCHEMA.size
             table['den'] = dict()
-            for k,n in [('standard',SECTION7_NUM_STANDARD), ('special',SECTION7_NUM_SPECIAL)]:
-                table[k] = list()
-                for _ in range(n):
-                    tmp = unpack('H', data[ind:ind+SIZE['SECTION7_ENCOUNTER']])[0]; ind += SIZE['SECTION7_ENCOUNTER']
-                    table[k].append({'prob':(tmp & SECTION7_ENCOUNTER_PROB_MASK) >> SECTION7_ENCOUNTER_PROB_SHIFT, 'ID':(tmp & SECTION7_ENCOUNTER_ID_MASK) >> SECTION7_ENCOUNTER_ID_SHIFT})
+            for k in ['standard','special']:
+                table[k] = [{'prob':(tmp & SECTION7_ENCOUNTER_PROB_MASK) >> SECTION7_ENCOUNTER_PROB_SHIFT, 'ID':(tmp & SECTION7_ENCOUNTER_ID_MASK) >> SECTION7_ENCOUNTER_ID_SHIFT} for tmp in table[k]]
                 tot = sum(enc['prob'] for enc in table[k]); table['den'][k] = {True:1., False:float(tot)}[tot == 0]
                 for enc in table[k]: # divide by sum to get probability
                     enc['prob'] /= table['den'][k]
-            table['pad'] = data[ind:ind+SIZE['SECTION7_PAD']]; ind += SIZE['SECTION7_PAD']
 
     def get_bytes(self):
         '''Return the bytes encoding this Encounter to repack into a Field File
@@ -860,14 +1483,12 @@ class Encounter:
         Returns:
             ``bytes``: The data to repack into a Field File
         '''
-        data = bytearray()
-        for table in [self.table_1, self.table_2]:
-            data += pack('B', table['enabled'])
-            data += pack('B', table['rate'])
+        data = bytearray(2 * SECTION7_TABLE_SCHEMA.size)
+        for i, table in enumerate([self.table_1, self.table_2]):
+            record = {'enabled':table['enabled'], 'rate':table['rate'], 'pad':table['pad']}
             for k in ['standard','special']:
-                for enc in table[k]:
-                    data += pack('H', (int(enc['prob']*table['den'][k]) << SECTION7_ENCOUNTER_PROB_SHIFT) | (enc['ID'] << SECTION7_ENCOUNTER_ID_SHIFT))
-            data += table['pad']
+                record[k] = [(int(round(enc['prob']*table['den'][k])) << SECTION7_ENCOUNTER_PROB_SHIFT) | (enc['ID'] << SECTION7_ENCOUNTER_ID_SHIFT) for enc in table[k]]
+            SECTION7_TABLE_SCHEMA.pack_into(data, i * SECTION7_TABLE_SCHEMA.size, record)
         return data
 
 class Triggers:
@@ -878,55 +1499,18 @@ class Triggers:
         Args:
             ``data`` (``bytes``): The Encounter (Section 8) data
         '''
-        ind = 0
-        self.name = data[ind:ind+SIZE['SECTION8_FIELD-NAME']].decode().rstrip(NULL_STR); ind += SIZE['SECTION8_FIELD-NAME']
-        self.control_direction = unpack('b', data[ind:ind+SIZE['SECTION8_CONTROL-DIRECTION']])[0]; ind += SIZE['SECTION8_CONTROL-DIRECTION']
-        self.focus_height = unpack('h', data[ind:ind+SIZE['SECTION8_FOCUS-HEIGHT']])[0]; ind += SIZE['SECTION8_FOCUS-HEIGHT']
-        self.camera_range = dict()
-        for d in ['left','bottom','right','top']:
-            self.camera_range[d] = unpack('h', data[ind:ind+SIZE['SECTION8_CAMERA-RANGE-DIR']])[0]; ind += SIZE['SECTION8_CAMERA-RANGE-DIR']
-        self.unknown_1 = dict()
-        for k in ['layer_3', 'layer_4']:
-            self.unknown_1[k] = unpack('H', data[ind:ind+SIZE['SECTION8_UNKNOWN-1']])[0]; ind += SIZE['SECTION8_UNKNOWN-1']
-        self.bg_animation = {'layer_3':dict(), 'layer_4':dict()}
-        for k in ['layer_3', 'layer_4']:
-            self.bg_animation[k]['width'] = unpack('h', data[ind:ind+SIZE['SECTION8_ANIMATION-WIDTH']])[0]; ind += SIZE['SECTION8_ANIMATION-WIDTH']
-            self.bg_animation[k]['height'] = unpack('h', data[ind:ind+SIZE['SECTION8_ANIMATION-HEIGHT']])[0]; ind += SIZE['SECTION8_ANIMATION-HEIGHT']
-        self.unknown_2 = {'layer_3':list(), 'layer_4':list()}
-        for k in ['layer_3', 'layer_4']:
-            self.unknown_2[k] = data[ind:ind+SIZE['SECTION8_UNKNOWN-2']]; ind += SIZE['SECTION8_UNKNOWN-2']
-        self.gateways = list()
-        for _ in range(SECTION8_NUM_GATEWAYS):
-            gateway = dict()
-            for k in ['exit_vertex_1', 'exit_vertex_2', 'destination_vertex']:
-                gateway[k] = list()
-                for d in ['x','z','y']:
-                    gateway[k].append(unpack('h', data[ind:ind+SIZE['SECTION8-GATEWAY_VERTEX-DIM']])[0]); ind += SIZE['SECTION8-GATEWAY_VERTEX-DIM']
-            gateway['field_ID'] = unpack('H', data[ind:ind+SIZE['SECTION8-GATEWAY_FIELD-ID']])[0]; ind += SIZE['SECTION8-GATEWAY_FIELD-ID']
-            gateway['unknown'] = data[ind:ind+SIZE['SECTION8-GATEWAY_UNKNOWN']]; ind += SIZE['SECTION8-GATEWAY_UNKNOWN']
-            self.gateways.append(gateway)
-        self.triggers = list()
-        for _ in range(SECTION8_NUM_TRIGGERS):
-            trigger = dict()
-            for k in ['vertex_corner_1', 'vertex_corner_2']:
-                trigger[k] = list()
-                for d in ['x','y','z']:
-                    trigger[k].append(unpack('h', data[ind:ind+SIZE['SECTION8-TRIGGER_VERTEX-DIM']])[0]); ind += SIZE['SECTION8-TRIGGER_VERTEX-DIM']
-            trigger['bg_group_ID'] = unpack('b', data[ind:ind+SIZE['SECTION8-TRIGGER_BG-GROUP-ID']])[0]; ind += SIZE['SECTION8-TRIGGER_BG-GROUP-ID']
-            trigger['bg_frame_ID'] = unpack('B', data[ind:ind+SIZE['SECTION8-TRIGGER_BG-FRAME-ID']])[0]; ind += SIZE['SECTION8-TRIGGER_BG-FRAME-ID']
-            trigger['behavior'] = unpack('B', data[ind:ind+SIZE['SECTION8-TRIGGER_BEHAVIOR']])[0]; ind += SIZE['SECTION8-TRIGGER_BEHAVIOR']
-            trigger['sound_ID'] = unpack('B', data[ind:ind+SIZE['SECTION8-TRIGGER_SOUND-ID']])[0]; ind += SIZE['SECTION8-TRIGGER_SOUND-ID']
-            self.triggers.append(trigger)
-        self.shown_arrows = list()
-        for _ in range(SECTION8_NUM_SHOWN_ARROWS):
-            self.shown_arrows.append(unpack('B', data[ind:ind+SIZE['SECTION8_SHOWN-ARROW']])[0]); ind += SIZE['SECTION8_SHOWN-ARROW']
-        self.arrows = list()
-        for _ in range(SECTION8_NUM_ARROWS):
-            arrow = {'position': list()}
-            for d in ['x','z','y']:
-                arrow['position'].append(unpack('i', data[ind:ind+SIZE['SECTION8-ARROW_POSITION']])[0]); ind += SIZE['SECTION8-ARROW_POSITION']
-            arrow['type'] = unpack('i', data[ind:ind+SIZE['SECTION8-ARROW_TYPE']])[0]; ind += SIZE['SECTION8-ARROW_TYPE']
-            self.arrows.append(arrow)
+        header = SECTION8_HEADER_SCHEMA.unpack_from(data); ind = SECTION8_HEADER_SCHEMA.size
+        self.name = header['name'].decode().rstrip(NULL_STR)
+        self.control_direction = header['control_direction']
+        self.focus_height = header['focus_height']
+        self.camera_range = dict(zip(['left','bottom','right','top'], header['camera_range']))
+        self.unknown_1 = dict(zip(['layer_3','layer_4'], header['unknown_1']))
+        self.bg_animation = {'layer_3':dict(zip(['width','height'], header['bg_animation'][:2])), 'layer_4':dict(zip(['width','height'], header['bg_animation'][2:]))}
+        self.unknown_2 = {'layer_3':header['unknown_2_layer_3'], 'layer_4':header['unknown_2_layer_4']}
+        self.gateways = SECTION8_GATEWAY_SCHEMA.iter_unpack(data, ind, SECTION8_NUM_GATEWAYS); ind += SECTION8_NUM_GATEWAYS*SECTION8_GATEWAY_SCHEMA.size
+        self.triggers = SECTION8_TRIGGER_SCHEMA.iter_unpack(data, ind, SECTION8_NUM_TRIGGERS); ind += SECTION8_NUM_TRIGGERS*SECTION8_TRIGGER_SCHEMA.size
+        self.shown_arrows = SECTION8_SHOWN_ARROWS_SCHEMA.unpack_from(data, ind)['shown_arrows']; ind += SECTION8_SHOWN_ARROWS_SCHEMA.size
+        self.arrows = SECTION8_ARROW_SCHEMA.iter_unpack(data, ind, SECTION8_NUM_ARROWS)
 
     def get_bytes(self):
         '''Return the bytes encoding this Triggers to repack into a Field File
@@ -934,40 +1518,260 @@ class Triggers:
         Returns:
             ``bytes``: The data to repack into a Field File
         '''
-        data = bytearray()
-        data += self.name.encode(); data += NULL_BYTE*(SIZE['SECTION8_FIELD-NAME'] - len(self.name))
-        data += pack('b', self.control_direction)
-        data += pack('h', self.focus_height)
-        for d in ['left','bottom','right','top']:
-            data += pack('h', self.camera_range[d])
-        for k in ['layer_3', 'layer_4']:
-            data += pack('H', self.unknown_1[k])
-        for k in ['layer_3', 'layer_4']:
-            data += pack('h', self.bg_animation[k]['width']); data += pack('h', self.bg_animation[k]['height'])
-        for k in ['layer_3', 'layer_4']:
-            data += self.unknown_2[k]
+        data = bytearray(SECTION8_HEADER_SCHEMA.size + len(self.gateways)*SECTION8_GATEWAY_SCHEMA.size + len(self.triggers)*SECTION8_TRIGGER_SCHEMA.size + SECTION8_SHOWN_ARROWS_SCHEMA.size + len(self.arrows)*SECTION8_ARROW_SCHEMA.size)
+        SECTION8_HEADER_SCHEMA.pack_into(data, 0, {
+            'name': self.name.encode(), 'control_direction': self.control_direction, 'focus_height': self.focus_height,
+            'camera_range': [self.camera_range[d] for d in ['left','bottom','right','top']],
+            'unknown_1': [self.unknown_1[k] for k in ['layer_3','layer_4']],
+            'bg_animation': [self.bg_animation[k][d] for k in ['layer_3','layer_4'] for d in ['width','height']],
+            'unknown_2_layer_3': self.unknown_2['layer_3'], 'unknown_2_layer_4': self.unknown_2['layer_4'],
+        }); ind = SECTION8_HEADER_SCHEMA.size
         for gateway in self.gateways:
-            for k in ['exit_vertex_1', 'exit_vertex_2', 'destination_vertex']:
-                for v in gateway[k]:
-                    data += pack('h', v)
-            data += pack('H', gateway['field_ID'])
-            data += gateway['unknown']
+            SECTION8_GATEWAY_SCHEMA.pack_into(data, ind, gateway); ind += SECTION8_GATEWAY_SCHEMA.size
         for trigger in self.triggers:
-            for k in ['vertex_corner_1', 'vertex_corner_2']:
-                for v in trigger[k]:
-                    data += pack('h', v)
-            data += pack('b', trigger['bg_group_ID'])
-            data += pack('B', trigger['bg_frame_ID'])
-            data += pack('B', trigger['behavior'])
-            data += pack('B', trigger['sound_ID'])
-        for shown_arrow in self.shown_arrows:
-            data += pack('B', shown_arrow)
+            SECTION8_TRIGGER_SCHEMA.pack_into(data, ind, trigger); ind += SECTION8_TRIGGER_SCHEMA.size
+        SECTION8_SHOWN_ARROWS_SCHEMA.pack_into(data, ind, {'shown_arrows':self.shown_arrows}); ind += SECTION8_SHOWN_ARROWS_SCHEMA.size
         for arrow in self.arrows:
-            for v in arrow['position']:
-                data += pack('i', v)
-            data += pack('i', arrow['type'])
+            SECTION8_ARROW_SCHEMA.pack_into(data, ind, arrow); ind += SECTION8_ARROW_SCHEMA.size
         return data
 
+class TileView(MutableMapping):
+    '''Dict-style view of one tile in a ``TileTable`` (reads and writes go straight to the table's columns)'''
+    __slots__ = ('table', 'index')
+    def __init__(self, table, index):
+        self.table = table; self.index = index
+
+    def __getitem__(self, key):
+        return self.table.get_value(self.index, key)
+
+    def __setitem__(self, key, value):
+        self.table.set_value(self.index, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Tile fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.table.names)
+
+    def __len__(self):
+        return len(self.table.names)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class TileTable:
+    '''Columnar table of Background (Section 9) tiles: one ``array`` per tile field instead of one ``dict`` per tile'''
+    def __init__(self, tiles=None):
+        '''``TileTable`` constructor
+
+        Args:
+            ``tiles`` (iterable of ``dict``): The tiles to start with (each must have every tile field)
+        '''
+        self.names = [name for name, typecode, width in SECTION9_TILE_SCHEMA.columns if name[0] != '_']
+        self.width = {name:width for name, typecode, width in SECTION9_TILE_SCHEMA.columns}
+        self.columns = {name:array(typecode) for name, typecode, width in SECTION9_TILE_SCHEMA.columns if name[0] != '_'}
+        self.num_tiles = 0
+        if tiles is not None:
+            for tile in tiles:
+                self.append(tile)
+
+    @classmethod
+    def from_bytes(cls, data, offset, num_tiles):
+        '''Read consecutive tiles from Background (Section 9) data
+
+        Args:
+            ``data`` (``bytes``): The Background (Section 9) data
+
+            ``offset`` (``int``): The start position of the first tile in ``data``
+
+            ``num_tiles`` (``int``): The number of tiles to read
+
+        Returns:
+            ``TileTable``: The tiles
+        '''
+        table = cls(); table.num_tiles = num_tiles
+        if num_tiles == 0:
+            return table
+        if HAS_NUMPY:
+            records = np.frombuffer(data, dtype=SECTION9_TILE_SCHEMA.dtype, count=num_tiles, offset=offset)
+            for name, col in table.columns.items():
+                col.frombytes(records[name].tobytes())
+        else:
+            values = zip(*SECTION9_TILE_SCHEMA.struct.iter_unpack(memoryview(data)[offset:offset+num_tiles*SECTION9_TILE_SCHEMA.size]))
+            for (name, count), col in zip(SECTION9_TILE_SCHEMA.fields, values):
+                if name[0] == '_':
+                    continue
+                elif name in SECTION9_TILE_SCHEMA.raw:
+                    table.columns[name].frombytes(b''.join(col))
+                else:
+                    table.columns[name].extend(col)
+        return table
+
+    @classmethod
+    def from_columns(cls, num_tiles, columns):
+        '''Build a table from whole columns
+
+        Args:
+            ``num_tiles`` (``int``): The number of tiles
+
+            ``columns`` (``dict``): Map each tile field to the values of every tile (a sequence of ``int``, or the ``bytes`` of all tiles for raw fields), where missing fields are 0 (or NULL)
+
+        Returns:
+            ``TileTable``: The tiles
+        '''
+        table = cls(); table.num_tiles = num_tiles
+        for name, col in table.columns.items():
+            if name not in columns:
+                col.frombytes(NULL_BYTE * (num_tiles * table.width[name] * col.itemsize))
+            elif name in SECTION9_TILE_SCHEMA.raw:
+                col.frombytes(columns[name])
+            else:
+                col.extend(columns[name])
+            if len(col) != num_tiles * table.width[name]:
+                raise ValueError("Column %s must have %d values" % (name, num_tiles * table.width[name]))
+        return table
+
+    def __len__(self):
+        return self.num_tiles
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return TileTable(self[i] for i in range(*key.indices(self.num_tiles)))
+        elif isinstance(key, int):
+            if key < 0:
+                key += self.num_tiles
+            if key < 0 or key >= self.num_tiles:
+                raise IndexError("Index must be between at least 0 and less than %d" % self.num_tiles)
+            return TileView(self, key)
+        else:
+            raise TypeError('Index must be int, not {}'.format(type(key).__name__))
+
+    def __iter__(self):
+        for i in range(self.num_tiles):
+            yield TileView(self, i)
+
+    def __eq__(self, other):
+        if isinstance(other, TileTable):
+            return self.num_tiles == other.num_tiles and self.columns == other.columns
+        try:
+            return len(self) == len(other) and all(dict(a) == dict(b) for a,b in zip(self, other))
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'TileTable(%r)' % [dict(tile) for tile in self]
+
+    def get_value(self, index, name):
+        '''Get a single field of a single tile
+
+        Args:
+            ``index`` (``int``): The index of the tile
+
+            ``name`` (``str``): The name of the field
+
+        Returns:
+            ``int`` or ``bytes``: The value of the field
+        '''
+        w = self.width[name]
+        if name not in SECTION9_TILE_SCHEMA.raw:
+            return self.columns[name][index]
+        return self.columns[name][index*w:(index+1)*w].tobytes()
+
+    def set_value(self, index, name, value):
+        '''Set a single field of a single tile
+
+        Args:
+            ``index`` (``int``): The index of the tile
+
+            ``name`` (``str``): The name of the field
+
+            ``value`` (``int`` or ``bytes``): The new value of the field
+        '''
+        w = self.width[name]
+        if name not in SECTION9_TILE_SCHEMA.raw:
+            self.columns[name][index] = value
+        elif len(value) != w:
+            raise ValueError("Field %s must be %d bytes" % (name, w))
+        else:
+            self.columns[name][index*w:(index+1)*w] = array('B', value)
+
+    def append(self, tile):
+        '''Add a tile to the end of this table
+
+        Args:
+            ``tile`` (``dict``): The tile to add (must have every tile field)
+        '''
+        for name in self.names:
+            if name not in SECTION9_TILE_SCHEMA.raw:
+                self.columns[name].append(tile[name])
+            elif len(tile[name]) != self.width[name]:
+                raise ValueError("Field %s must be %d bytes" % (name, self.width[name]))
+            else:
+                self.columns[name].frombytes(tile[name])
+        self.num_tiles += 1
+
+    def column(self, name):
+        '''Get a field of every tile, as a (zero-copy) NumPy array if NumPy is available
+
+        Args:
+            ``name`` (``str``): The name of the field
+
+        Returns:
+            ``numpy.ndarray``: The values of the field (shape: tiles, or tiles x bytes for raw ``bytes`` fields), or the underlying ``array`` without NumPy
+        '''
+        col = self.columns[name]
+        if not HAS_NUMPY:
+            return col
+        values = np.frombuffer(col, dtype=col.typecode) if len(col) != 0 else np.zeros(0, dtype=col.typecode)
+        return values.reshape(-1, self.width[name]) if name in SECTION9_TILE_SCHEMA.raw else values
+
+    def get_range(self, name):
+        '''Get the smallest and largest value of a field across all tiles
+
+        Args:
+            ``name`` (``str``): The name of the field
+
+        Returns:
+            ``int``: The smallest value (``None`` if there are no tiles)
+
+            ``int``: The largest value (``None`` if there are no tiles)
+        '''
+        if self.num_tiles == 0:
+            return None,None
+        col = self.column(name)
+        if HAS_NUMPY:
+            return int(col.min()), int(col.max())
+        return min(col), max(col)
+
+    def get_bytes(self):
+        '''Return the bytes encoding the tiles in this table to repack into a Background
+
+        Returns:
+            ``bytes``: The data to repack into a Background
+        '''
+        if HAS_NUMPY:
+            records = np.zeros(self.num_tiles, dtype=SECTION9_TILE_SCHEMA.dtype)
+            for name in self.names:
+                records[name] = self.column(name).reshape(records[name].shape)
+            for big,small in [('_src_x_big','src_x'), ('_src_y_big','src_y')]:
+                records[big] = (self.column(small) / 16 * 625000).astype(records.dtype[big])
+            return records.tobytes()
+        fields = list()
+        for name, count in SECTION9_TILE_SCHEMA.fields:
+            if name in {'_src_x_big','_src_y_big'}:
+                fields.append([int(v / 16 * 625000) for v in self.columns[{'_src_x_big':'src_x', '_src_y_big':'src_y'}[name]]])
+            elif name in SECTION9_TILE_SCHEMA.raw:
+                w = self.width[name]; col = self.columns[name].tobytes(); fields.append([col[i:i+w] for i in range(0, len(col), w)])
+            else:
+                fields.append(self.columns[name])
+        data = bytearray(self.num_tiles * SECTION9_TILE_SCHEMA.size); pack_tile = SECTION9_TILE_SCHEMA.struct.pack_into
+        for i,values in enumerate(zip(*fields)):
+            pack_tile(data, i*SECTION9_TILE_SCHEMA.size, *values)
+        return bytes(data)
+
 class Background:
     '''Background class'''
     def __init__(self, data):
@@ -976,230 +1780,33 @@ class Background:
         Args:
             ``data`` (``bytes``): The Background (Section 9) data
         '''
-        ind = 0
-
         # read header
-        self.header = dict()
-        self.header['unknown1'] = unpack('H', data[ind:ind+SIZE['SECTION9-HEADER_UNKNOWN1']])[0]; ind += SIZE['SECTION9-HEADER_UNKNOWN1']
-        self.header['depth'] = unpack('H', data[ind:ind+SIZE['SECTION9-HEADER_DEPTH']])[0]; ind += SIZE['SECTION9-HEADER_DEPTH']
-        self.header['unknown2'] = unpack('B', data[ind:ind+SIZE['SECTION9-HEADER_UNKNOWN2']])[0]; ind += SIZE['SECTION9-HEADER_UNKNOWN2']
+        self.header = SECTION9_HEADER_SCHEMA.unpack_from(data); ind = SECTION9_HEADER_SCHEMA.size
 
         # read palette
-        self.palette = dict()
-        title = data[ind:ind+SIZE['SECTION9-PAL_TITLE']].decode().strip(); ind += SIZE['SECTION9-PAL_TITLE'] # the string "PALETTE"
-        if title != SECTION9_PAL_TITLE:
+        self.palette = SECTION9_PAL_SCHEMA.unpack_from(data, ind, derived=True); ind += SECTION9_PAL_SCHEMA.size
+        if self.palette.pop('_title').decode().strip() != SECTION9_PAL_TITLE: # the string "PALETTE"
             raise ValueError(ERROR_INVALID_FIELD_FILE)
-        self.palette['size'] = unpack('I', data[ind:ind+SIZE['SECTION9-PAL_SIZE']])[0]; ind += SIZE['SECTION9-PAL_SIZE']
-        self.palette['palX'] = unpack('H', data[ind:ind+SIZE['SECTION9-PAL_PALX']])[0]; ind += SIZE['SECTION9-PAL_PALX']
-        self.palette['palY'] = unpack('H', data[ind:ind+SIZE['SECTION9-PAL_PALY']])[0]; ind += SIZE['SECTION9-PAL_PALY']
-        self.palette['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-PAL_WIDTH']])[0]; ind += SIZE['SECTION9-PAL_WIDTH']
-        self.palette['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-PAL_HEIGHT']])[0]; ind += SIZE['SECTION9-PAL_HEIGHT']
-        self.palette['colors'] = list()
-        for _ in range(SECTION9_PAL_NUM_COLORS):
-            color = unpack('H', data[ind:ind+SIZE['SECTION9-PAL_COLOR']])[0]; ind += SIZE['SECTION9-PAL_COLOR']
-            self.palette['colors'].append(color_to_rgba(color)) # I read them as ABGR, but I like saving them as RGBA
+        self.palette['colors'] = [color_to_rgba(color) for color in self.palette['colors']] # I read them as ABGR, but I like saving them as RGBA
 
         # read background tiles
         self.back = dict()
         title = data[ind:ind+SIZE['SECTION9-BACK_TITLE']].decode().strip(); ind += SIZE['SECTION9-BACK_TITLE']
         if title != SECTION9_BACK_TITLE:
             raise ValueError(ERROR_INVALID_FIELD_FILE)
-
-        # read layer 1
-        self.back['layer_1'] = dict()
-        self.back['layer_1']['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-L1_WIDTH']
-        self.back['layer_1']['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-L1_HEIGHT']
-        num_l1_tiles = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_NUM-TILES']])[0]; ind += SIZE['SECTION9-BACK-L1_NUM-TILES']
-        self.back['layer_1']['depth'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_DEPTH']])[0]; ind += SIZE['SECTION9-BACK-L1_DEPTH']
-        blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_BLANK']])[0]; ind += SIZE['SECTION9-BACK-L1_BLANK']
-        self.back['layer_1']['tiles'] = list()
-        for _ in range(num_l1_tiles):
-            tile = dict()
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK']
-            tile['dst_x'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-X']
-            tile['dst_y'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-Y']
-            tile['unknown_1'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-1']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-1']
-            tile['src_x'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X']
-            tile['unknown_2'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-2']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-2']
-            tile['src_y'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y']
-            tile['unknown_3'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-3']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-3']
-            tile['src_x2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X2']
-            tile['unknown_4'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-4']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-4']
-            tile['src_y2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y2']
-            tile['unknown_5'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-5']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-5']
-            tile['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_WIDTH']
-            tile['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-TILE_HEIGHT']
-            tile['palette_ID'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PALETTE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_PALETTE-ID']
-            tile['unknown_6'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-6']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-6']
-            tile['ID'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID']
-            tile['param'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PARAM']])[0]; ind += SIZE['SECTION9-BACK-TILE_PARAM']
-            tile['state'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_STATE']])[0]; ind += SIZE['SECTION9-BACK-TILE_STATE']
-            tile['blending'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLENDING']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLENDING']
-            tile['unknown_7'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-7']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-7']
-            tile['type_trans'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TYPE-TRANS']])[0]; ind += SIZE['SECTION9-BACK-TILE_TYPE-TRANS']
-            tile['unknown_8'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-8']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-8']
-            tile['texture_id'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID']
-            tile['unknown_9'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-9']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-9']
-            tile['texture_id2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']
-            tile['unknown_10'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-10']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-10']
-            tile['depth'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_DEPTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_DEPTH']
-            tile['unknown_11'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-11']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-11']
-            tile['ID_big'] = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID-BIG']
-            src_x_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X-BIG']
-            src_y_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK-2']
-            self.back['layer_1']['tiles'].append(tile)
-        blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L1_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-L1_BLANK-2']
-
-        # read layer 2
-        l2_flag = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-L2_FLAG']])[0]; ind += SIZE['SECTION9-BACK-L2_FLAG']
-        self.back['layer_2'] = dict()
-        if l2_flag != 0:
-            if l2_flag != 1:
-                raise ValueError(ERROR_INVALID_FIELD_FILE)
-            self.back['layer_2']['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L2_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-L2_WIDTH']
-            self.back['layer_2']['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L2_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-L2_HEIGHT']
-            num_l2_tiles = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L2_NUM-TILES']])[0]; ind += SIZE['SECTION9-BACK-L2_NUM-TILES']
-            self.back['layer_2']['unknown'] = data[ind:ind+SIZE['SECTION9-BACK-L2_UNKNOWN']]; ind += SIZE['SECTION9-BACK-L2_UNKNOWN']
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L2_BLANK']])[0]; ind += SIZE['SECTION9-BACK-L2_BLANK']
-            self.back['layer_2']['tiles'] = list()
-            for _ in range(num_l2_tiles):
-                tile = dict()
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK']
-                tile['dst_x'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-X']
-                tile['dst_y'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-Y']
-                tile['unknown_1'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-1']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-1']
-                tile['src_x'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X']
-                tile['unknown_2'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-2']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-2']
-                tile['src_y'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y']
-                tile['unknown_3'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-3']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-3']
-                tile['src_x2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X2']
-                tile['unknown_4'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-4']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-4']
-                tile['src_y2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y2']
-                tile['unknown_5'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-5']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-5']
-                tile['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_WIDTH']
-                tile['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-TILE_HEIGHT']
-                tile['palette_ID'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PALETTE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_PALETTE-ID']
-                tile['unknown_6'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-6']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-6']
-                tile['ID'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID']
-                tile['param'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PARAM']])[0]; ind += SIZE['SECTION9-BACK-TILE_PARAM']
-                tile['state'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_STATE']])[0]; ind += SIZE['SECTION9-BACK-TILE_STATE']
-                tile['blending'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLENDING']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLENDING']
-                tile['unknown_7'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-7']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-7']
-                tile['type_trans'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TYPE-TRANS']])[0]; ind += SIZE['SECTION9-BACK-TILE_TYPE-TRANS']
-                tile['unknown_8'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-8']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-8']
-                tile['texture_id'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID']
-                tile['unknown_9'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-9']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-9']
-                tile['texture_id2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']
-                tile['unknown_10'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-10']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-10']
-                tile['depth'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_DEPTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_DEPTH']
-                tile['unknown_11'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-11']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-11']
-                tile['ID_big'] = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID-BIG']
-                src_x_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X-BIG']
-                src_y_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK-2']
-                self.back['layer_2']['tiles'].append(tile)
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L2_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-L2_BLANK-2']
-
-        # read layer 3
-        l3_flag = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-L3_FLAG']])[0]; ind += SIZE['SECTION9-BACK-L3_FLAG']
-        self.back['layer_3'] = dict()
-        if l3_flag != 0:
-            if l3_flag != 1:
-                raise ValueError(ERROR_INVALID_FIELD_FILE)
-            self.back['layer_3']['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L3_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-L3_WIDTH']
-            self.back['layer_3']['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L3_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-L3_HEIGHT']
-            num_l3_tiles = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L3_NUM-TILES']])[0]; ind += SIZE['SECTION9-BACK-L3_NUM-TILES']
-            self.back['layer_3']['unknown'] = data[ind:ind+SIZE['SECTION9-BACK-L3_UNKNOWN']]; ind += SIZE['SECTION9-BACK-L3_UNKNOWN']
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L3_BLANK']])[0]; ind += SIZE['SECTION9-BACK-L3_BLANK']
-            self.back['layer_3']['tiles'] = list()
-            for _ in range(num_l3_tiles):
-                tile = dict()
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK']
-                tile['dst_x'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-X']
-                tile['dst_y'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-Y']
-                tile['unknown_1'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-1']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-1']
-                tile['src_x'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X']
-                tile['unknown_2'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-2']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-2']
-                tile['src_y'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y']
-                tile['unknown_3'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-3']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-3']
-                tile['src_x2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X2']
-                tile['unknown_4'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-4']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-4']
-                tile['src_y2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y2']
-                tile['unknown_5'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-5']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-5']
-                tile['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_WIDTH']
-                tile['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-TILE_HEIGHT']
-                tile['palette_ID'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PALETTE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_PALETTE-ID']
-                tile['unknown_6'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-6']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-6']
-                tile['ID'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID']
-                tile['param'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PARAM']])[0]; ind += SIZE['SECTION9-BACK-TILE_PARAM']
-                tile['state'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_STATE']])[0]; ind += SIZE['SECTION9-BACK-TILE_STATE']
-                tile['blending'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLENDING']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLENDING']
-                tile['unknown_7'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-7']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-7']
-                tile['type_trans'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TYPE-TRANS']])[0]; ind += SIZE['SECTION9-BACK-TILE_TYPE-TRANS']
-                tile['unknown_8'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-8']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-8']
-                tile['texture_id'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID']
-                tile['unknown_9'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-9']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-9']
-                tile['texture_id2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']
-                tile['unknown_10'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-10']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-10']
-                tile['depth'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_DEPTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_DEPTH']
-                tile['unknown_11'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-11']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-11']
-                tile['ID_big'] = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID-BIG']
-                src_x_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X-BIG']
-                src_y_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK-2']
-                self.back['layer_3']['tiles'].append(tile)
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L3_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-L3_BLANK-2']
-
-        # read layer 4
-        l4_flag = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-L4_FLAG']])[0]; ind += SIZE['SECTION9-BACK-L4_FLAG']
-        self.back['layer_4'] = dict()
-        if l4_flag != 0:
-            if l4_flag != 1:
-                raise ValueError(ERROR_INVALID_FIELD_FILE)
-            self.back['layer_4']['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L4_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-L4_WIDTH']
-            self.back['layer_4']['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L4_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-L4_HEIGHT']
-            num_l4_tiles = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L4_NUM-TILES']])[0]; ind += SIZE['SECTION9-BACK-L4_NUM-TILES']
-            self.back['layer_4']['unknown'] = data[ind:ind+SIZE['SECTION9-BACK-L4_UNKNOWN']]; ind += SIZE['SECTION9-BACK-L4_UNKNOWN']
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L4_BLANK']])[0]; ind += SIZE['SECTION9-BACK-L4_BLANK']
-            self.back['layer_4']['tiles'] = list()
-            for _ in range(num_l4_tiles):
-                tile = dict()
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK']
-                tile['dst_x'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-X']
-                tile['dst_y'] = unpack('h', data[ind:ind+SIZE['SECTION9-BACK-TILE_DST-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_DST-Y']
-                tile['unknown_1'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-1']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-1']
-                tile['src_x'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X']
-                tile['unknown_2'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-2']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-2']
-                tile['src_y'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y']
-                tile['unknown_3'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-3']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-3']
-                tile['src_x2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X2']
-                tile['unknown_4'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-4']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-4']
-                tile['src_y2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y2']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y2']
-                tile['unknown_5'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-5']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-5']
-                tile['width'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_WIDTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_WIDTH']
-                tile['height'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_HEIGHT']])[0]; ind += SIZE['SECTION9-BACK-TILE_HEIGHT']
-                tile['palette_ID'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PALETTE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_PALETTE-ID']
-                tile['unknown_6'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-6']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-6']
-                tile['ID'] = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID']
-                tile['param'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_PARAM']])[0]; ind += SIZE['SECTION9-BACK-TILE_PARAM']
-                tile['state'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_STATE']])[0]; ind += SIZE['SECTION9-BACK-TILE_STATE']
-                tile['blending'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLENDING']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLENDING']
-                tile['unknown_7'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-7']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-7']
-                tile['type_trans'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TYPE-TRANS']])[0]; ind += SIZE['SECTION9-BACK-TILE_TYPE-TRANS']
-                tile['unknown_8'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-8']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-8']
-                tile['texture_id'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID']
-                tile['unknown_9'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-9']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-9']
-                tile['texture_id2'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']])[0]; ind += SIZE['SECTION9-BACK-TILE_TEXTURE-ID2']
-                tile['unknown_10'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-10']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-10']
-                tile['depth'] = unpack('B', data[ind:ind+SIZE['SECTION9-BACK-TILE_DEPTH']])[0]; ind += SIZE['SECTION9-BACK-TILE_DEPTH']
-                tile['unknown_11'] = data[ind:ind+SIZE['SECTION9-BACK-TILE_UNKNOWN-11']]; ind += SIZE['SECTION9-BACK-TILE_UNKNOWN-11']
-                tile['ID_big'] = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_ID-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_ID-BIG']
-                src_x_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-X-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-X-BIG']
-                src_y_big = unpack('I', data[ind:ind+SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']])[0]; ind += SIZE['SECTION9-BACK-TILE_SRC-Y-BIG']
-                blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-TILE_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-TILE_BLANK-2']
-                self.back['layer_4']['tiles'].append(tile)
-            blank = unpack('H', data[ind:ind+SIZE['SECTION9-BACK-L4_BLANK-2']])[0]; ind += SIZE['SECTION9-BACK-L4_BLANK-2']
+        for k in SECTION9_LAYERS:
+            # layers 2-4 start with a flag saying if they exist (layer 1 always exists)
+            if k != 'layer_1':
+                flag = data[ind]; ind += SIZE['SECTION9-BACK-L2_FLAG']
+                if flag == 0:
+                    self.back[k] = dict(); continue
+                elif flag != 1:
+                    raise ValueError(ERROR_INVALID_FIELD_FILE)
+            layer_schema = SECTION9_LAYER_SCHEMA[k]
+            self.back[k] = layer_schema.unpack_from(data, ind, derived=True); ind += layer_schema.size
+            num_tiles = self.back[k].pop('_num_tiles')
+            self.back[k]['tiles'] = TileTable.from_bytes(data, ind, num_tiles); ind += num_tiles*SECTION9_TILE_SCHEMA.size
+            ind += SIZE['SECTION9-BACK-L1_BLANK-2']
 
         # read textures
         self.textures = list()
@@ -1207,11 +1814,10 @@ class Background:
         if title != SECTION9_TEX_TITLE:
             raise ValueError(ERROR_INVALID_FIELD_FILE)
         for _ in range(SECTION9_TEX_MAX_NUM):
-            exists = unpack('H', data[ind:ind+SIZE['SECTION9-TEX_TEX-EXISTS']])[0]; ind += SIZE['SECTION9-TEX_TEX-EXISTS']
+            exists = unpack_from('H', data, ind)[0]; ind += SIZE['SECTION9-TEX_TEX-EXISTS']
             if bool(exists):
                 tex = dict()
-                tex['size'] = unpack('H', data[ind:ind+SIZE['SECTION9-TEX_TEX-SIZE']])[0]; ind += SIZE['SECTION9-TEX_TEX-SIZE']
-                tex['depth'] = unpack('H', data[ind:ind+SIZE['SECTION9-TEX_TEX-DEPTH']])[0]; ind += SIZE['SECTION9-TEX_TEX-DEPTH']
+                tex['size'], tex['depth'] = unpack_from('HH', data, ind); ind += SIZE['SECTION9-TEX_TEX-SIZE'] + SIZE['SECTION9-TEX_TEX-DEPTH']
                 data_size = tex['depth'] * SECTION9_TEX_BYTES_PER_DEPTH
                 tex['data'] = data[ind:ind+data_size]; ind += data_size
                 self.textures.append(tex)
@@ -1234,222 +1840,73 @@ class Background:
         Returns:
             ``bytes``: The data to repack into a Field File
         '''
-        data = bytearray()
+        layers = [dict(self.back[k], tiles=self.get_tiles(k)) if len(self.back[k]) != 0 else self.back[k] for k in SECTION9_LAYERS]
+        size = SECTION9_HEADER_SCHEMA.size + SECTION9_PAL_SCHEMA.size + SIZE['SECTION9-BACK_TITLE'] + (len(SECTION9_LAYERS)-1)*SIZE['SECTION9-BACK-L2_FLAG']
+        size += sum(SECTION9_LAYER_SCHEMA[k].size + len(layer['tiles'])*SECTION9_TILE_SCHEMA.size + SIZE['SECTION9-BACK-L1_BLANK-2'] for k,layer in zip(SECTION9_LAYERS,layers) if len(layer) != 0)
+        size += SIZE['SECTION9-TEX_TITLE'] + SIZE['EOF_END-STRING'] + SIZE['EOF_FILE-TERMINATOR']
+        size += sum(SIZE['SECTION9-TEX_TEX-EXISTS'] + (0 if tex is None else SIZE['SECTION9-TEX_TEX-SIZE'] + SIZE['SECTION9-TEX_TEX-DEPTH'] + len(tex['data'])) for tex in self.textures)
+        data = bytearray(size)
 
         # write header
-        data += pack('H', self.header['unknown1'])
-        data += pack('H', self.header['depth'])
-        data += pack('B', self.header['unknown2'])
+        SECTION9_HEADER_SCHEMA.pack_into(data, 0, self.header); ind = SECTION9_HEADER_SCHEMA.size
 
         # write palette
-        data += SECTION9_PAL_TITLE.encode()
-        data += pack('I', self.palette['size'])
-        data += pack('H', self.palette['palX'])
-        data += pack('H', self.palette['palY'])
-        data += pack('H', self.palette['width'])
-        data += pack('H', self.palette['height'])
-        for c in self.palette['colors']:
-            data += pack('H', rgba_to_color(c))
+        SECTION9_PAL_SCHEMA.pack_into(data, ind, dict(self.palette, colors=[rgba_to_color(c) for c in self.palette['colors']]), _title=SECTION9_PAL_TITLE.encode()); ind += SECTION9_PAL_SCHEMA.size
 
         # write background tiles
-        data += SECTION9_BACK_TITLE.encode()
-
-        # write layer 1
-        data += pack('H', self.back['layer_1']['width'])
-        data += pack('H', self.back['layer_1']['height'])
-        data += pack('H', len(self.back['layer_1']['tiles']))
-        data += pack('H', self.back['layer_1']['depth'])
-        data += 2 * NULL_BYTE
-        for tile in self.back['layer_1']['tiles']:
-            data += 2 * NULL_BYTE
-            data += pack('h', tile['dst_x'])
-            data += pack('h', tile['dst_y'])
-            data += tile['unknown_1']
-            data += pack('B', tile['src_x'])
-            data += tile['unknown_2']
-            data += pack('B', tile['src_y'])
-            data += tile['unknown_3']
-            data += pack('B', tile['src_x2'])
-            data += tile['unknown_4']
-            data += pack('B', tile['src_y2'])
-            data += tile['unknown_5']
-            data += pack('H', tile['width'])
-            data += pack('H', tile['height'])
-            data += pack('B', tile['palette_ID'])
-            data += tile['unknown_6']
-            data += pack('H', tile['ID'])
-            data += pack('B', tile['param'])
-            data += pack('B', tile['state'])
-            data += pack('B', tile['blending'])
-            data += tile['unknown_7']
-            data += pack('B', tile['type_trans'])
-            data += tile['unknown_8']
-            data += pack('B', tile['texture_id'])
-            data += tile['unknown_9']
-            data += pack('B', tile['texture_id2'])
-            data += tile['unknown_10']
-            data += pack('B', tile['depth'])
-            data += tile['unknown_11']
-            data += pack('I', tile['ID_big'])
-            data += pack('I', int(tile['src_x'] / 16 * 625000))
-            data += pack('I', int(tile['src_y'] / 16 * 625000))
-            data += 2 * NULL_BYTE
-        data += 2 * NULL_BYTE
-
-        # write layer 2
-        if len(self.back['layer_2']) == 0:
-            data += pack('B', 0) # False
-        else:
-            data += pack('B', 1) # True
-            data += pack('H', self.back['layer_2']['width'])
-            data += pack('H', self.back['layer_2']['height'])
-            data += pack('H', len(self.back['layer_2']['tiles']))
-            data += self.back['layer_2']['unknown']
-            data += 2 * NULL_BYTE
-            for tile in self.back['layer_2']['tiles']:
-                data += 2 * NULL_BYTE
-                data += pack('h', tile['dst_x'])
-                data += pack('h', tile['dst_y'])
-                data += tile['unknown_1']
-                data += pack('B', tile['src_x'])
-                data += tile['unknown_2']
-                data += pack('B', tile['src_y'])
-                data += tile['unknown_3']
-                data += pack('B', tile['src_x2'])
-                data += tile['unknown_4']
-                data += pack('B', tile['src_y2'])
-                data += tile['unknown_5']
-                data += pack('H', tile['width'])
-                data += pack('H', tile['height'])
-                data += pack('B', tile['palette_ID'])
-                data += tile['unknown_6']
-                data += pack('H', tile['ID'])
-                data += pack('B', tile['param'])
-                data += pack('B', tile['state'])
-                data += pack('B', tile['blending'])
-                data += tile['unknown_7']
-                data += pack('B', tile['type_trans'])
-                data += tile['unknown_8']
-                data += pack('B', tile['texture_id'])
-                data += tile['unknown_9']
-                data += pack('B', tile['texture_id2'])
-                data += tile['unknown_10']
-                data += pack('B', tile['depth'])
-                data += tile['unknown_11']
-                data += pack('I', tile['ID_big'])
-                data += pack('I', int(tile['src_x'] / 16 * 625000))
-                data += pack('I', int(tile['src_y'] / 16 * 625000))
-                data += 2 * NULL_BYTE
-            data += 2 * NULL_BYTE
-
-        # write layer 3
-        if len(self.back['layer_3']) == 0:
-            data += pack('B', 0) # False
-        else:
-            data += pack('B', 1) # True
-            data += pack('H', self.back['layer_3']['width'])
-            data += pack('H', self.back['layer_3']['height'])
-            data += pack('H', len(self.back['layer_3']['tiles']))
-            data += self.back['layer_3']['unknown']
-            data += 2 * NULL_BYTE
-            for tile in self.back['layer_3']['tiles']:
-                data += 2 * NULL_BYTE
-                data += pack('h', tile['dst_x'])
-                data += pack('h', tile['dst_y'])
-                data += tile['unknown_1']
-                data += pack('B', tile['src_x'])
-                data += tile['unknown_2']
-                data += pack('B', tile['src_y'])
-                data += tile['unknown_3']
-                data += pack('B', tile['src_x2'])
-                data += tile['unknown_4']
-                data += pack('B', tile['src_y2'])
-                data += tile['unknown_5']
-                data += pack('H', tile['width'])
-                data += pack('H', tile['height'])
-                data += pack('B', tile['palette_ID'])
-                data += tile['unknown_6']
-                data += pack('H', tile['ID'])
-                data += pack('B', tile['param'])
-                data += pack('B', tile['state'])
-                data += pack('B', tile['blending'])
-                data += tile['unknown_7']
-                data += pack('B', tile['type_trans'])
-                data += tile['unknown_8']
-                data += pack('B', tile['texture_id'])
-                data += tile['unknown_9']
-                data += pack('B', tile['texture_id2'])
-                data += tile['unknown_10']
-                data += pack('B', tile['depth'])
-                data += tile['unknown_11']
-                data += pack('I', tile['ID_big'])
-                data += pack('I', int(tile['src_x'] / 16 * 625000))
-                data += pack('I', int(tile['src_y'] / 16 * 625000))
-                data += 2 * NULL_BYTE
-            data += 2 * NULL_BYTE
-
-        # write layer 4
-        if len(self.back['layer_4']) == 0:
-            data += pack('B', 0) # False
-        else:
-            data += pack('B', 1) # True
-            data += pack('H', self.back['layer_4']['width'])
-            data += pack('H', self.back['layer_4']['height'])
-            data += pack('H', len(self.back['layer_4']['tiles']))
-            data += self.back['layer_4']['unknown']
-            data += 2 * NULL_BYTE
-            for tile in self.back['layer_4']['tiles']:
-                data += 2 * NULL_BYTE
-                data += pack('h', tile['dst_x'])
-                data += pack('h', tile['dst_y'])
-                data += tile['unknown_1']
-                data += pack('B', tile['src_x'])
-                data += tile['unknown_2']
-                data += pack('B', tile['src_y'])
-                data += tile['unknown_3']
-                data += pack('B', tile['src_x2'])
-                data += tile['unknown_4']
-                data += pack('B', tile['src_y2'])
-                data += tile['unknown_5']
-                data += pack('H', tile['width'])
-                data += pack('H', tile['height'])
-                data += pack('B', tile['palette_ID'])
-                data += tile['unknown_6']
-                data += pack('H', tile['ID'])
-                data += pack('B', tile['param'])
-                data += pack('B', tile['state'])
-                data += pack('B', tile['blending'])
-                data += tile['unknown_7']
-                data += pack('B', tile['type_trans'])
-                data += tile['unknown_8']
-                data += pack('B', tile['texture_id'])
-                data += tile['unknown_9']
-                data += pack('B', tile['texture_id2'])
-                data += tile['unknown_10']
-                data += pack('B', tile['depth'])
-                data += tile['unknown_11']
-                data += pack('I', tile['ID_big'])
-                data += pack('I', int(tile['src_x'] / 16 * 625000))
-                data += pack('I', int(tile['src_y'] / 16 * 625000))
-                data += 2 * NULL_BYTE
-            data += 2 * NULL_BYTE
+        data[ind:ind+SIZE['SECTION9-BACK_TITLE']] = SECTION9_BACK_TITLE.encode(); ind += SIZE['SECTION9-BACK_TITLE']
+        for k,layer in zip(SECTION9_LAYERS,layers):
+            if k != 'layer_1':
+                data[ind] = int(len(layer) != 0); ind += SIZE['SECTION9-BACK-L2_FLAG']
+                if len(layer) == 0:
+                    continue
+            layer_schema = SECTION9_LAYER_SCHEMA[k]
+            layer_schema.pack_into(data, ind, layer, _num_tiles=len(layer['tiles'])); ind += layer_schema.size
+            tiles = layer['tiles'].get_bytes(); data[ind:ind+len(tiles)] = tiles; ind += len(tiles)
+            ind += SIZE['SECTION9-BACK-L1_BLANK-2'] # already NULL
 
         # write textures
-        data += SECTION9_TEX_TITLE.encode()
+        data[ind:ind+SIZE['SECTION9-TEX_TITLE']] = SECTION9_TEX_TITLE.encode(); ind += SIZE['SECTION9-TEX_TITLE']
         for tex in self.textures:
             if tex is None:
-                data += pack('H', 0) # False
+                ind += SIZE['SECTION9-TEX_TEX-EXISTS'] # False (already NULL)
             else:
-                data += pack('H', 1) # True
-                data += pack('H', tex['size'])
-                data += pack('H', tex['depth'])
-                data += tex['data']
+                pack_into('HHH', data, ind, 1, tex['size'], tex['depth']); ind += SIZE['SECTION9-TEX_TEX-EXISTS'] + SIZE['SECTION9-TEX_TEX-SIZE'] + SIZE['SECTION9-TEX_TEX-DEPTH']
+                data[ind:ind+len(tex['data'])] = tex['data']; ind += len(tex['data'])
 
         # write end of file
-        data += EOF_END_STRING.encode()
-        data += EOF_FILE_TERMINATOR.encode()
+        data[ind:] = (EOF_END_STRING + EOF_FILE_TERMINATOR).encode()
         return data
 
+    def get_tiles(self, layer):
+        '''Get the tiles of a layer of this Background as a ``TileTable`` (a ``list`` of tile ``dict`` objects assigned to the layer is converted in place)
+
+        Args:
+            ``layer`` (``str``): The layer (``'layer_1'``, ``'layer_2'``, ``'layer_3'``, or ``'layer_4'``)
+
+        Returns:
+            ``TileTable``: The tiles of the layer (empty if the layer does not exist)
+        '''
+        if 'tiles' not in self.back[layer]:
+            return TileTable()
+        if not isinstance(self.back[layer]['tiles'], TileTable):
+            self.back[layer]['tiles'] = TileTable(self.back[layer]['tiles'])
+        return self.back[layer]['tiles']
+
+    def get_bg_states(self):
+        '''Get the animation states used by the tiles of this Background
+
+        Returns:
+            ``dict``: Map each animation ``param`` (other than 0, which is always shown) to a sorted ``list`` of its ``state`` values
+        '''
+        states = dict()
+        for k in SECTION9_LAYERS:
+            tiles = self.get_tiles(k)
+            for param,state in zip(tiles.columns['param'], tiles.columns['state']):
+                if param != 0:
+                    states.setdefault(param, set()).add(state)
+        return {param:sorted(states[param]) for param in sorted(states)}
+
     def get_dimensions(self):
         '''Get the width and height of the image in this Background
 
@@ -1458,36 +1915,76 @@ class Background:
 
             ``int``: The height of the image
         '''
-        min_width = 0; max_width = 0
-        min_height = 0; max_height = 0
-        for k in ['layer_1', 'layer_2', 'layer_3', 'layer_4']:
-            if 'tiles' not in self.back[k]:
+        min_x = 0; max_x = 0
+        min_y = 0; max_y = 0
+        for k in SECTION9_LAYERS:
+            tiles = self.get_tiles(k)
+            if len(tiles) == 0:
                 continue
-            for tile in self.back[k]['tiles']:
-                if tile['dst_x'] >= 0 and tile['dst_x'] > max_width:
-                    max_width = tile['dst_x']
-                elif tile['dst_x'] < 0 and -tile['dst_x'] > min_width:
-                    min_width = -tile['dst_x']
-                if tile['dst_y'] >= 0 and tile['dst_y'] > max_height:
-                    max_height = tile['dst_y']
-                elif tile['dst_y'] < 0 and -tile['dst_y'] > min_height:
-                    min_height = -tile['dst_y']
-        width = min_width + max_width + 16; height = min_height + max_height + 16
+            lo,hi = tiles.get_range('dst_x'); min_x = min(min_x, lo); max_x = max(max_x, hi)
+            lo,hi = tiles.get_range('dst_y'); min_y = min(min_y, lo); max_y = max(max_y, hi)
+        width = max_x - min_x + 16; height = max_y - min_y + 16
         return width,height
 
+# section classes (in file order)
+SECTION_CLASS = [FieldScript, CameraMatrix, ModelLoader, Palette, Walkmesh, TileMap, Encounter, Triggers, Background]
+
+def read_field_data(stream):
+    '''Read the (decompressed) data of a Field File from a stream. LZSS-compressed Field Files are decompressed as they are read, so the compressed data is never held in memory in full
+
+    Args:
+        ``stream`` (file object): A readable binary stream of a (possibly LZSS-compressed) Field File
+
+    Returns:
+        ``bytes``: The decompressed data of the Field File
+    '''
+    data = stream.read(SIZE['HEADER_BLANK'])
+    if data == NULL_BYTE*SIZE['HEADER_BLANK']: # uncompressed
+        return data + stream.read()
+    out = bytearray(); decompressor = LZSSDecompressor()
+    try:
+        while len(data) != 0:
+            out += decompressor.feed(data); data = stream.read(DEFAULT_STREAM_CHUNK_SIZE)
+        out += decompressor.flush()
+    except ValueError:
+        raise ValueError(ERROR_INVALID_FIELD_FILE)
+    if out[:SIZE['HEADER_BLANK']] != NULL_BYTE*SIZE['HEADER_BLANK']:
+        raise ValueError(ERROR_INVALID_FIELD_FILE)
+    return out
+
+def field_section_property(sec_num):
+    '''Create a property for a Field File section that is parsed on first access (see ``FieldFile.get_section``)
+
+    Args:
+        ``sec_num`` (``int``): The section number (0-8)
+
+    Returns:
+        ``property``: The property
+    '''
+    def getter(self):
+        return self.get_section(sec_num)
+    def setter(self, section):
+        self.sections[sec_num] = section
+    return property(getter, setter, doc="%s (Section %d), parsed on first access" % (SECTION_NAME[sec_num], sec_num+1))
+
 class FieldFile:
     '''Field File class'''
-    def __init__(self, data):
+    def __init__(self, data, lazy=True):
         '''``FieldFile`` constructor
 
         Args:
-            ``data`` (``bytes``): The data of the Field File
+            ``data`` (``bytes``): The data of the Field File (or a filename or readable binary stream)
+
+            ``lazy`` (``bool``): Only read the section offset table now, and parse each section on first access
         '''
         if isinstance(data,str):
-            f = open(data,'rb'); data = f.read(); f.close()
+            with open(data,'rb') as f:
+                data = read_field_data(f)
+        elif hasattr(data,'read'):
+            data = read_field_data(data)
         if data[:SIZE['HEADER_BLANK']] != NULL_BYTE*SIZE['HEADER_BLANK']:
             try:
-                data = decompress_lzss(data); assert data[:SIZE['HEADER_BLANK']] == NULL_BYTE*SIZE['HEADER_BLANK']
+                data = decompress_lzss_fast(data); assert data[:SIZE['HEADER_BLANK']] == NULL_BYTE*SIZE['HEADER_BLANK']
             except:
                 raise ValueError(ERROR_INVALID_FIELD_FILE)
 
@@ -1498,16 +1995,63 @@ class FieldFile:
             raise ValueError("Expected %d sections, but file has %d" % (len(SECTION_NAME),num_sections))
         starts = [unpack('I', data[ind + i*SIZE['HEADER_SECTION-START'] : ind + (i+1)*SIZE['HEADER_SECTION-START']])[0] for i in range(num_sections)]
 
-        # read sections (ignore section length 4-byte chunk at beginning of each)
-        self.field_script = FieldScript(data[starts[0]+SIZE['SECTION-LENGTH']:starts[1]])
-        self.camera_matrix = CameraMatrix(data[starts[1]+SIZE['SECTION-LENGTH']:starts[2]])
-        self.model_loader = ModelLoader(data[starts[2]+SIZE['SECTION-LENGTH']:starts[3]])
-        self.palette = Palette(data[starts[3]+SIZE['SECTION-LENGTH']:starts[4]])
-        self.walkmesh = Walkmesh(data[starts[4]+SIZE['SECTION-LENGTH']:starts[5]])
-        self.tile_map = TileMap(data[starts[5]+SIZE['SECTION-LENGTH']:starts[6]])
-        self.encounter = Encounter(data[starts[6]+SIZE['SECTION-LENGTH']:starts[7]])
-        self.triggers = Triggers(data[starts[7]+SIZE['SECTION-LENGTH']:starts[8]])
-        self.background = Background(data[starts[8]+SIZE['SECTION-LENGTH']:])
+        # keep (zero-copy) views of the raw sections (ignore section length 4-byte chunk at beginning of each), which are parsed on first access
+        self.data = data; view = memoryview(data)
+        self.raw_sections = [view[start+SIZE['SECTION-LENGTH']:end] for start,end in zip(starts, starts[1:]+[len(data)])]
+        self.sections = [None]*num_sections
+        if not lazy:
+            for sec_num in range(num_sections):
+                self.get_section(sec_num)
+
+    # sections (parsed on first access)
+    field_script = field_section_property(0)
+    camera_matrix = field_section_property(1)
+    model_loader = field_section_property(2)
+    palette = field_section_property(3)
+    walkmesh = field_section_property(4)
+    tile_map = field_section_property(5)
+    encounter = field_section_property(6)
+    triggers = field_section_property(7)
+    background = field_section_property(8)
+
+    def get_section(self, sec_num):
+        '''Return a section of this Field file, parsing it from the raw data if it hasn't been accessed yet
+
+        Args:
+            ``sec_num`` (``int``): The section number (0-8)
+
+        Returns:
+            The section object (e.g. ``FieldScript`` for section 0)
+        '''
+        if self.sections[sec_num] is None:
+            self.sections[sec_num] = SECTION_CLASS[sec_num](bytes(self.raw_sections[sec_num]))
+        return self.sections[sec_num]
+
+    def get_byte_pieces(self):
+        '''Return the pieces of the (uncompressed) bytes encoding this Field file, in order
+
+        Returns:
+            ``list`` of ``bytes``: The header, followed by the size and data of each section
+        '''
+        # convert all sections to bytes first (sections that were never accessed are reused verbatim)
+        section_bytes = list()
+        for sec_num,section in enumerate(self.sections):
+            if section is None:
+                section_bytes.append(self.raw_sections[sec_num])
+            else:
+                section_bytes.append(section.get_bytes())
+
+        # header
+        header = bytearray()
+        header += NULL_BYTE*SIZE['HEADER_BLANK']
+        header += pack('I', len(SECTION_NAME))
+        start_ind = len(header) + SIZE['HEADER_SECTION-START']*len(SECTION_NAME)
+        for sec in section_bytes:
+            header += pack('I', start_ind); start_ind += len(sec) + SIZE['HEADER_SECTION-START']
+        pieces = [header]
+        for sec in section_bytes:
+            pieces.append(pack('I', len(sec))); pieces.append(sec)
+        return pieces
 
     def get_bytes(self, lzss_compress=False):
         '''Return the bytes encoding this Field file
@@ -1518,36 +2062,83 @@ class FieldFile:
         Returns:
             ``bytes``: The data encoding this Field file
         '''
-        # convert all sections to bytes first
-        section_bytes = [
-            self.field_script.get_bytes(),
-            self.camera_matrix.get_bytes(),
-            self.model_loader.get_bytes(),
-            self.palette.get_bytes(),
-            self.walkmesh.get_bytes(),
-            self.tile_map.get_bytes(),
-            self.encounter.get_bytes(),
-            self.triggers.get_bytes(),
-            self.background.get_bytes(),
-        ]
-
-        # merge into output
         data = bytearray()
-        data += NULL_BYTE*SIZE['HEADER_BLANK']
-        data += pack('I', len(SECTION_NAME))
-        start_ind = len(data) + SIZE['HEADER_SECTION-START']*len(SECTION_NAME)
-        for sec in section_bytes:
-            data += pack('I', start_ind); start_ind += len(sec) + SIZE['HEADER_SECTION-START']
-        for sec in section_bytes:
-            data += pack('I', len(sec)); data += sec
+        for piece in self.get_byte_pieces():
+            data += piece
         if lzss_compress:
-            return compress_lzss(data)
+            return compress_lzss_fast(data)
         else:
             return data
 
+    def write(self, outfile, lzss_compress=False):
+        '''Write the bytes encoding this Field file to a file, compressing on the fly (no full-size compressed buffer is built)
+
+        Args:
+            ``outfile`` (``str`` or file object): The output filename or writable binary stream
+
+            ``lzss_compress`` (``bool``): ``True`` to LZSS-compress the data, otherwise ``False`` to write the uncompressed data
+
+        Returns:
+            ``int``: The number of bytes written
+        '''
+        pieces = self.get_byte_pieces()
+        if lzss_compress:
+            return compress_lzss_stream(pieces, outfile)
+        if isinstance(outfile,str):
+            with open(outfile,'wb') as f:
+                return self.write(f)
+        return sum(outfile.write(piece) for piece in pieces)
+
     def get_bg_image(self):
         '''Return a Pillow Image object of this Field file's Background
 
+        Returns:
+            ``Image``: A Pillow Image object of this Field file's Background
+        '''
+        if not HAS_NUMPY:
+            return self.get_bg_image_slow()
+        from PIL import Image
+        width,height = self.background.get_dimensions()
+        center_x = int(width/2); center_y = int(height/2)
+        canvas = np.zeros((height,width,3), dtype=np.uint8)
+        tiles = [self.background.get_tiles(k) for k in SECTION9_LAYERS]
+        tiles = [t for t in tiles if len(t) != 0]
+        if len(tiles) == 0:
+            return Image.fromarray(canvas, 'RGB')
+        col = lambda name: np.concatenate([t.column(name) for t in tiles]).astype(np.int64)
+        dst_x = col('dst_x'); dst_y = col('dst_y'); src_x = col('src_x'); src_y = col('src_y'); palette_ID = col('palette_ID'); texture_id = col('texture_id')
+
+        # expand each palette page to 8-bit RGB once (and flag the transparent colors: black and pure green)
+        pages = expand_color_pages(self.palette.color_pages)
+        transparent = ((pages[:,:,0] == 0) & (pages[:,:,2] == 0) & ((pages[:,:,1] == 0) | (pages[:,:,1] == 255)))
+
+        # gather the 16x16 palette indices of every tile from its texture page
+        tex_ids = np.unique(texture_id); tex_data = dict()
+        for t in tex_ids.tolist():
+            if t >= len(self.background.textures) or self.background.textures[t] is None:
+                raise ValueError("Tile uses missing texture %d" % t)
+            tex_data[t] = np.frombuffer(bytes(self.background.textures[t]['data']), dtype=np.uint8)
+        offsets = ((src_y[:,None,None] + np.arange(16)[None,:,None]) * 256 + src_x[:,None,None] + np.arange(16)[None,None,:]) # (tile, dy, dx)
+        indices = np.empty(offsets.shape, dtype=np.int64)
+        for t, raw in tex_data.items():
+            sel = texture_id == t
+            if offsets[sel].max() >= len(raw):
+                raise IndexError("Tile source lies outside texture %d" % t)
+            indices[sel] = raw[offsets[sel]]
+        if indices.max() >= pages.shape[1] or palette_ID.max() >= pages.shape[0]:
+            raise IndexError("Tile color lies outside its palette page")
+
+        # later tiles are drawn over earlier ones, so keep the last opaque pixel drawn at each position (pixels outside the image are dropped)
+        img_x = dst_x[:,None,None] + center_x + np.arange(16)[None,None,:]; img_y = dst_y[:,None,None] + center_y + np.arange(16)[None,:,None]
+        opaque = ~transparent[palette_ID[:,None,None], indices] & (img_x >= 0) & (img_x < width) & (img_y >= 0) & (img_y < height)
+        pixel = (img_y * width + img_x)[opaque]; colors = pages[np.broadcast_to(palette_ID[:,None,None], opaque.shape)[opaque], indices[opaque]]
+        pixel, last = np.unique(pixel[::-1], return_index=True)
+        canvas.reshape(-1,3)[pixel] = colors[::-1][last]
+        return Image.fromarray(canvas, 'RGB')
+
+    def get_bg_image_slow(self):
+        '''Return a Pillow Image object of this Field file's Background, drawing one pixel at a time (used when NumPy is not available)
+
         Returns:
             ``Image``: A Pillow Image object of this Field file's Background
         '''
@@ -1558,16 +2149,15 @@ class FieldFile:
 
         # build Pillow image
         img = Image.new('RGB', (width,height), (0,0,0))
-        for k in ['layer_1', 'layer_2', 'layer_3', 'layer_4']:
-            if 'tiles' not in self.background.back[k]:
-                continue
-            for tile in self.background.back[k]['tiles']:
+        for k in SECTION9_LAYERS:
+            for tile in self.background.get_tiles(k):
                 color_page = self.palette.color_pages[tile['palette_ID']]
                 raw = self.background.textures[tile['texture_id']]['data']
                 for dx in range(0, 16):
                     for dy in range(0, 16):
                         img_x = tile['dst_x']+dx+center_x; img_y = tile['dst_y']+dy+center_y
-                        curr_color = img.getpixel((img_x,img_y))
+                        if img_x < 0 or img_x >= width or img_y < 0 or img_y >= height: # outside the image
+                            continue
                         color_ind = raw[(tile['src_y']+dy)*256 + tile['src_x'] + dx]
                         color = color_convert_bit(color_page[color_ind],5,8)[:3]
                         if color == [0,255,0] or color == [0,0,0]:
@@ -1575,12 +2165,156 @@ class FieldFile:
                         img.putpixel((img_x,img_y), tuple(color))
         return img
 
-    def change_bg_image(self, img):
-        '''Change this TEX file's image
+    def get_bg_tile_order(self, states=None):
+        '''Get the tiles of this Field file's Background that are visible, in drawing order (back to front)
+
+        Tiles are drawn by decreasing ``ID`` (larger IDs are further back), then by layer, then by their order within their layer. Tiles with ``param`` 0 are always visible.
+
+        Args:
+            ``states`` (``dict``): Map each animation ``param`` to the ``state`` values that are on (``None`` to show every tile)
+
+        Returns:
+            ``list`` of ``dict``: The visible tiles in drawing order
+        '''
+        tiles = [tile for k in SECTION9_LAYERS for tile in self.background.get_tiles(k)]
+        if states is not None:
+            tiles = [tile for tile in tiles if tile['param'] == 0 or tile['state'] in states.get(tile['param'], ())]
+        return sorted(tiles, key=lambda tile: -tile['ID']) # sorted() is stable, so ties keep layer/file order
+
+    def render_bg_image(self, states=None):
+        '''Return a Pillow Image object of this Field file's Background, compositing tiles by depth with their blending modes
+
+        Unlike ``get_bg_image``, tiles are drawn back to front by ``ID`` (see ``get_bg_tile_order``), blended tiles (``blending`` set) are mixed into what is behind them with the PSX mode given by ``type_trans`` (see ``SECTION9_BLEND_MODES``), and read from their second source rectangle (``texture_id2``/``src_x2``/``src_y2``) when it is set. Tiles with depth ``SECTION9_TILE_DEPTH_DIRECT`` are 16-bit direct color (transparent where 0), and the other tiles index their color page (transparent where black or pure green).
+
+        Args:
+            ``states`` (``dict``): Map each animation ``param`` to the ``state`` values that are on (``None`` to show every tile), e.g. to render animation frames (see ``Background.get_bg_states``)
+
+        Returns:
+            ``Image``: A Pillow Image object of this Field file's Background
+        '''
+        from PIL import Image
+        width,height = self.background.get_dimensions()
+        center_x = int(width/2); center_y = int(height/2)
+        if not HAS_NUMPY:
+            return self.render_bg_image_slow(states)
+        canvas = np.zeros((height*width,3), dtype=np.int32)
+        tiles = [self.background.get_tiles(k) for k in SECTION9_LAYERS]
+        tiles = [t for t in tiles if len(t) != 0]
+        if len(tiles) == 0:
+            return Image.fromarray(canvas.reshape(height,width,3).astype(np.uint8), 'RGB')
+        cols = {name: np.concatenate([t.column(name) for t in tiles]).astype(np.int64) for name in ['dst_x','dst_y','src_x','src_y','src_x2','src_y2','texture_id','texture_id2','palette_ID','ID','param','state','blending','type_trans','depth']}
+
+        # pick the visible tiles, and sort them back to front (stable, so ties keep layer/file order)
+        visible = np.ones(len(cols['ID']), dtype=bool) if states is None else (cols['param'] == 0)
+        for param, on in ({} if states is None else states).items():
+            visible |= (cols['param'] == param) & np.isin(cols['state'], list(on))
+        order = np.flatnonzero(visible)[np.argsort(-cols['ID'][visible], kind='stable')]
+        cols = {name: col[order] for name,col in cols.items()}
+        use2 = (cols['blending'] != 0) & (cols['texture_id2'] != 0)
+        tex_id = np.where(use2, cols['texture_id2'], cols['texture_id'])
+        src_x = np.where(use2, cols['src_x2'], cols['src_x']); src_y = np.where(use2, cols['src_y2'], cols['src_y'])
+        direct = cols['depth'] == SECTION9_TILE_DEPTH_DIRECT
+
+        # gather the 8-bit RGB color and opacity of every tile pixel
+        pages = expand_color_pages(self.palette.color_pages)
+        lut = np.array([color_convert_bit(c,5,8) for c in range(COLOR_MASK+1)], dtype=np.uint8)
+        dy = np.arange(16)[None,:,None]; dx = np.arange(16)[None,None,:]
+        colors = np.zeros((len(order),16,16,3), dtype=np.int32); opaque = np.zeros((len(order),16,16), dtype=bool)
+        for t in np.unique(tex_id).tolist():
+            if t >= len(self.background.textures) or self.background.textures[t] is None:
+                raise ValueError("Tile uses missing texture %d" % t)
+            raw = np.frombuffer(bytes(self.background.textures[t]['data']), dtype=np.uint8)
+            for is_direct in (False, True):
+                sel = np.flatnonzero((tex_id == t) & (direct == is_direct))
+                if len(sel) == 0:
+                    continue
+                if is_direct: # 2 bytes per pixel
+                    offsets = ((src_y[sel,None,None] + dy) * 256 + src_x[sel,None,None] + dx) * 2
+                    if offsets.max()+1 >= len(raw):
+                        raise IndexError("Tile source lies outside texture %d" % t)
+                    value = raw[offsets].astype(np.int64) | (raw[offsets+1].astype(np.int64) << 8)
+                    for c,shift in enumerate([COLOR_SHIFT_R, COLOR_SHIFT_G, COLOR_SHIFT_B]):
+                        colors[sel,:,:,c] = lut[(value >> shift) & COLOR_MASK]
+                    opaque[sel] = value != 0
+                else: # 1 palette index per pixel
+                    offsets = (src_y[sel,None,None] + dy) * 256 + src_x[sel,None,None] + dx
+                    if offsets.max() >= len(raw):
+                        raise IndexError("Tile source lies outside texture %d" % t)
+                    indices = raw[offsets]; page = np.broadcast_to(cols['palette_ID'][sel,None,None], indices.shape)
+                    if page.max() >= pages.shape[0] or indices.max() >= pages.shape[1]:
+                        raise IndexError("Tile color lies outside its palette page")
+                    rgb = pages[page, indices]; colors[sel] = rgb
+                    opaque[sel] = ~((rgb[...,0] == 0) & (rgb[...,2] == 0) & ((rgb[...,1] == 0) | (rgb[...,1] == 255)))
+
+        # number each pixel by how many earlier pixels land on the same position, so each pass of equal rank touches every position at most once (pixels outside the image are dropped)
+        img_x = cols['dst_x'][:,None,None] + center_x + dx; img_y = cols['dst_y'][:,None,None] + center_y + dy
+        opaque &= (img_x >= 0) & (img_x < width) & (img_y >= 0) & (img_y < height)
+        pixel = (img_y * width + img_x)[opaque]
+        mode = np.broadcast_to(np.where(cols['blending'] != 0, cols['type_trans'] & 3, -1)[:,None,None], opaque.shape)[opaque]
+        colors = colors[opaque]
+        by_pixel = np.argsort(pixel, kind='stable'); sorted_pixel = pixel[by_pixel]
+        first = np.flatnonzero(np.r_[True, sorted_pixel[1:] != sorted_pixel[:-1]])
+        rank = np.empty(len(pixel), dtype=np.int64)
+        rank[by_pixel] = np.arange(len(pixel)) - np.repeat(first, np.diff(np.r_[first, len(pixel)]))
+
+        # draw (and blend) one rank at a time
+        for r in range(int(rank.max())+1 if len(rank) != 0 else 0):
+            sel = rank == r; p = pixel[sel]; front = colors[sel]; back = canvas[p]; m = mode[sel][:,None]
+            canvas[p] = np.select([m == -1, m == 0, m == 1, m == 2], [front, back//2 + front//2, back + front, back - front], back + front//4).clip(0, 255)
+        return Image.fromarray(canvas.reshape(height,width,3).astype(np.uint8), 'RGB')
+
+    def render_bg_image_slow(self, states=None):
+        '''Return a Pillow Image object of this Field file's Background like ``render_bg_image``, but drawing one pixel at a time (used when NumPy is not available)
+
+        Args:
+            ``states`` (``dict``): Map each animation ``param`` to the ``state`` values that are on (``None`` to show every tile)
+
+        Returns:
+            ``Image``: A Pillow Image object of this Field file's Background
+        '''
+        from PIL import Image
+        width,height = self.background.get_dimensions()
+        center_x = int(width/2); center_y = int(height/2)
+        img = Image.new('RGB', (width,height), (0,0,0))
+        for tile in self.get_bg_tile_order(states):
+            if tile['blending'] != 0 and tile['texture_id2'] != 0:
+                raw = self.background.textures[tile['texture_id2']]['data']; src_x = tile['src_x2']; src_y = tile['src_y2']
+            else:
+                raw = self.background.textures[tile['texture_id']]['data']; src_x = tile['src_x']; src_y = tile['src_y']
+            mode = (tile['type_trans'] & 3) if tile['blending'] != 0 else None
+            for dx in range(0, 16):
+                for dy in range(0, 16):
+                    ind = (src_y+dy)*256 + src_x + dx
+                    if tile['depth'] == SECTION9_TILE_DEPTH_DIRECT:
+                        value = raw[2*ind] | (raw[2*ind+1] << 8)
+                        if value == 0:
+                            continue
+                        color = color_convert_bit(color_to_rgba(value),5,8)[:3]
+                    else:
+                        color = color_convert_bit(self.palette.color_pages[tile['palette_ID']][raw[ind]],5,8)[:3]
+                        if color == [0,255,0] or color == [0,0,0]:
+                            continue
+                    img_x = tile['dst_x']+dx+center_x; img_y = tile['dst_y']+dy+center_y
+                    if img_x < 0 or img_x >= width or img_y < 0 or img_y >= height: # outside the image
+                        continue
+                    img.putpixel((img_x,img_y), blend_color(img.getpixel((img_x,img_y)), color, mode))
+        return img
+
+    def change_bg_image(self, img, dedup=True):
+        '''Change this Field file's background image
+
+        The image is quantized to 15-bit color in one step and cut into 16x16 tiles. Identical tiles (found by hashing their quantized colors) share a single source rectangle, the unique tiles are laid out consecutively in the texture pages, and their color sets (as bitsets) are packed into as few color pages as possible (see ``pack_color_sets``)
 
         Args:
             ``img`` (``Image``): The image to set this Field file's background to
+
+            ``dedup`` (``bool``): ``True`` to let identical tiles share a single source rectangle, otherwise ``False``
+
+        Returns:
+            ``dict``: Import statistics (``num_tiles``, ``num_unique_tiles``, ``dedup_ratio``, ``num_textures``, and ``num_color_pages``)
         '''
+        if not HAS_NUMPY:
+            return self.change_bg_image_slow(img)
         from PIL import Image
 
         # set things up
@@ -1593,6 +2327,92 @@ class FieldFile:
         width_ratio = float(width)/orig_width; height_ratio = float(height)/orig_height
         orig_layer1_width = self.background.back['layer_1']['width']; orig_layer1_height = self.background.back['layer_1']['height']
 
+        # quantize every pixel to a 15-bit color (plus the alpha bit), and give each distinct color an ID
+        rgb = (np.asarray(img, dtype=np.int64) * COLOR_MASK) // 255 # same as color_convert_bit(c,8,5)
+        color = (rgb[...,0] << COLOR_SHIFT_R) | (rgb[...,1] << COLOR_SHIFT_G) | (rgb[...,2] << COLOR_SHIFT_B) | (1 << COLOR_SHIFT_A)
+
+        # cut into 16x16 tiles: texture pages in row-major order, and tiles column-major within each page
+        page_y, page_x, tile_x, tile_y = [a.ravel() for a in np.meshgrid(np.arange(height//256), np.arange(width//256), np.arange(16), np.arange(16), indexing='ij')]
+        tile_x += page_x*16; tile_y += page_y*16
+        tile_colors = color.reshape(height//16, 16, width//16, 16).transpose(0,2,1,3)[tile_y, tile_x].reshape(len(tile_x), 256)
+
+        # deduplicate identical tiles: the unique tiles are numbered in order of first appearance
+        if dedup:
+            unique_of = dict(); tile_unique = np.empty(len(tile_x), dtype=np.int64)
+            for i,row in enumerate(tile_colors):
+                tile_unique[i] = unique_of.setdefault(row.tobytes(), len(unique_of))
+            unique_colors = tile_colors[np.unique(tile_unique, return_index=True)[1]]
+        else:
+            tile_unique = np.arange(len(tile_x)); unique_colors = tile_colors
+        num_unique = len(unique_colors); num_textures = (num_unique + 255) // 256
+        if num_textures > SECTION9_TEX_MAX_NUM:
+            raise ValueError("Image needs %d texture pages (%d unique 16x16 tiles), but a Field file can only have %d" % (num_textures, num_unique, SECTION9_TEX_MAX_NUM))
+        colors, color_ids = np.unique(unique_colors, return_inverse=True); color_ids = color_ids.reshape(unique_colors.shape)
+
+        # pack the color set of each unique tile (as a bitset) into color pages
+        color_sets = list()
+        for start in range(0, num_unique, 256):
+            present = np.zeros((min(256, num_unique-start), len(colors)), dtype=bool)
+            present[np.arange(present.shape[0]).repeat(256), color_ids[start:start+256].ravel()] = True
+            color_sets += [int.from_bytes(row.tobytes(), 'little') for row in np.packbits(present, axis=1, bitorder='little')]
+        tile_page, num_pages = pack_color_sets(color_sets); tile_page = np.array(tile_page, dtype=np.int64)
+        if num_pages > SECTION9_PAL_MAX_NUM_PAGES:
+            raise ValueError("Image needs %d color pages, but a Field file can only have %d" % (num_pages, SECTION9_PAL_MAX_NUM_PAGES))
+
+        # write the color pages (each page lists its colors in increasing 15-bit order, not in the order the pixels are visited), and the palette index of every pixel into the texture pages (256 tiles per page, column-major)
+        self.palette.color_pages = list(); indices = np.empty(color_ids.shape, dtype=np.uint8)
+        for p in range(num_pages):
+            on_page = tile_page == p; page_ids = np.unique(color_ids[on_page])
+            indices[on_page] = np.searchsorted(page_ids, color_ids[on_page])
+            self.palette.color_pages.append([tuple(rgba) for rgba in (color_to_rgba(c) for c in colors[page_ids].tolist())])
+            self.palette.color_pages[-1] += [(0,0,0,1)] * (256 - len(self.palette.color_pages[-1])) # fill up the color pages
+        slot = np.arange(num_unique); slot_page = slot // 256; slot_x = (slot % 256) // 16; slot_y = slot % 16
+        texture = np.zeros((num_textures,256,256), dtype=np.uint8)
+        texture.reshape(num_textures, 16, 16, 16, 16)[slot_page, slot_y, :, slot_x, :] = indices.reshape(-1,16,16)
+        self.background.textures = [{'size':0, 'depth':1, 'data':bytearray(page.tobytes())} for page in texture]
+        while len(self.background.textures) < SECTION9_TEX_MAX_NUM: # background textures section needs to be filled to specific length
+            self.background.textures.append(None)
+
+        # write tiles
+        for k in ['layer_2', 'layer_3', 'layer_4']:
+            self.background.back[k] = dict()
+        self.background.back['layer_1'] = {'width':int(orig_layer1_width*width_ratio), 'height':int(orig_layer1_height*height_ratio), 'depth':1, 'tiles':TileTable.from_columns(len(tile_x), {
+            'dst_x': (tile_x*16 - center_x).tolist(),
+            'dst_y': (tile_y*16 - center_y).tolist(),
+            'src_x': (slot_x[tile_unique] * 16).tolist(),
+            'src_y': (slot_y[tile_unique] * 16).tolist(),
+            'texture_id': slot_page[tile_unique].tolist(),
+            'palette_ID': tile_page[tile_unique].tolist(),
+            'depth': [1]*len(tile_x),
+            'width': [16]*len(tile_x),
+            'height': [16]*len(tile_x),
+            'ID': [4095]*len(tile_x),
+        })}
+        return {'num_tiles':len(tile_x), 'num_unique_tiles':num_unique, 'dedup_ratio':len(tile_x)/num_unique, 'num_textures':num_textures, 'num_color_pages':num_pages}
+
+    def change_bg_image_slow(self, img):
+        '''Change this Field file's background image one pixel at a time, packing color pages greedily (used when NumPy is not available)
+
+        Args:
+            ``img`` (``Image``): The image to set this Field file's background to
+
+        Returns:
+            ``dict``: Import statistics (see ``change_bg_image``), with no tile deduplication
+        '''
+        from PIL import Image
+
+        # set things up
+        if isinstance(img,str):
+            img = Image.open(img)
+        img = img.convert('RGB'); width,height = img.size; center_x = int(width/2); center_y = int(height/2)
+        if width % 256 != 0 or height % 256 != 0:
+            raise ValueError("Width and height of desired image must be multiples of 256")
+        if (width//256) * (height//256) > SECTION9_TEX_MAX_NUM:
+            raise ValueError("Image needs %d texture pages, but a Field file can only have %d" % ((width//256) * (height//256), SECTION9_TEX_MAX_NUM))
+        orig_width,orig_height = self.background.get_dimensions()
+        width_ratio = float(width)/orig_width; height_ratio = float(height)/orig_height
+        orig_layer1_width = self.background.back['layer_1']['width']; orig_layer1_height = self.background.back['layer_1']['height']
+
         ''' # TODO Need to figure out how to fix the zooming issue
         # fix relevant values elsewhere in the Field file
         self.field_script.scale = width
@@ -1619,7 +2439,7 @@ class FieldFile:
         self.palette.color_pages = [list()]
         for k in ['layer_2', 'layer_3', 'layer_4']:
             self.background.back[k] = dict()
-        self.background.back['layer_1'] = {'width':int(orig_layer1_width*width_ratio), 'height':int(orig_layer1_height*height_ratio), 'depth':1, 'tiles':list()}
+        self.background.back['layer_1'] = {'width':int(orig_layer1_width*width_ratio), 'height':int(orig_layer1_height*height_ratio), 'depth':1, 'tiles':TileTable()}
         self.background.textures = list()
 
         # write tiles and colors
@@ -1673,6 +2493,8 @@ class FieldFile:
                         best_page = pages_sorted[0]
                         if need_to_add[best_page]+len(self.palette.color_pages[best_page]) > 256: # no color page can fit all of them, so make a new page
                             best_page = len(self.palette.color_pages); self.palette.color_pages.append(list()); color_to_page_ind.append(dict())
+                            if best_page >= SECTION9_PAL_MAX_NUM_PAGES:
+                                raise ValueError("Image needs more than %d color pages, which a Field file can't have" % SECTION9_PAL_MAX_NUM_PAGES)
                         for c in unique_colors:
                             color_to_pages[c].add(best_page)
                             if c not in color_to_page_ind[best_page]:
@@ -1698,3 +2520,54 @@ class FieldFile:
         for i in range(len(self.palette.color_pages)):
             while len(self.palette.color_pages[i]) < 256: # fill up the color pages
                 self.palette.color_pages[i].append((0,0,0,1))
+        num_tiles = len(self.background.back['layer_1']['tiles']); num_textures = len([tex for tex in self.background.textures if tex is not None])
+        return {'num_tiles':num_tiles, 'num_unique_tiles':num_tiles, 'dedup_ratio':1., 'num_textures':num_textures, 'num_color_pages':len(self.palette.color_pages)}
+
+def disassemble_lgp(lgp_filename, out_dir):
+    '''Disassemble the Field Script of every Field file in an LGP archive into ``<out_dir>/<filename>.asm`` (files that aren't Field files are skipped)
+
+    Args:
+        ``lgp_filename`` (``str``): The filename of the LGP archive
+
+        ``out_dir`` (``str``): The output directory (created if it doesn't exist)
+
+    Returns:
+        ``list`` of ``str``: The filenames (in the archive) of the Field files that were disassembled
+    '''
+    makedirs(out_dir, exist_ok=True); done = list()
+    with LGP(lgp_filename) as lgp:
+        for filename,data in lgp.load_files():
+            try:
+                text = FieldFile(data).field_script.disassemble_text()
+            except Exception:
+                continue
+            with open(join(out_dir, '%s.asm' % filename), 'w') as f:
+                f.write(text)
+            done.append(filename)
+    return done
+
+def assemble_lgp(lgp_filename, asm_dir):
+    '''Assemble the ``<filename>.asm`` files in a directory (see ``disassemble_lgp``) into the Field Scripts of the corresponding Field files of an LGP archive, and update the archive in place with the Field files whose scripts changed (see ``update_lgp``)
+
+    Args:
+        ``lgp_filename`` (``str``): The filename of the LGP archive
+
+        ``asm_dir`` (``str``): The directory containing the disassembly files
+
+    Returns:
+        ``list`` of ``str``: The filenames (in the archive) of the Field files that were updated
+    '''
+    files = list()
+    with LGP(lgp_filename) as lgp:
+        for filename,data in lgp.load_files():
+            asm_filename = join(asm_dir, '%s.asm' % filename)
+            if not isfile(asm_filename):
+                continue
+            ff = FieldFile(data); script = ff.field_script; old = (bytes(script.script_code), script.actor_scripts)
+            with open(asm_filename) as f:
+                script.assemble_text(f.read())
+            if (bytes(script.script_code), script.actor_scripts) != old:
+                files.append((filename, ff.get_bytes(lzss_compress=True)))
+    if len(files) != 0:
+        update_lgp(lgp_filename, files=files)
+    return [filename for filename,data in files]
@@ -4,8 +4,30 @@ Functions and classes for handling LGP archives
 Niema Moshiri 2019
 '''
 from . import MAX_UNSIGNED_INT,MAX_UNSIGNED_SHORT,NULL_BYTE,NULL_STR
+from concurrent.futures import ProcessPoolExecutor,ThreadPoolExecutor
+from itertools import chain,repeat
+from mmap import mmap,ACCESS_READ
+from os import lseek,makedirs,read,replace,write,SEEK_SET
 from os.path import getsize
-from struct import pack,unpack
+from struct import iter_unpack,pack,unpack,unpack_from
+from time import time
+from warnings import warn
+try:
+    from os import copy_file_range; HAS_COPY_FILE_RANGE = True
+except ImportError: # only on Linux (Python 3.8+)
+    HAS_COPY_FILE_RANGE = False
+try:
+    from os import pread,pwrite; HAS_PWRITE = True
+except ImportError: # not on Windows: emulate with seek (not thread-safe, so data is then copied by a single thread)
+    HAS_PWRITE = False
+    def pread(fd, n, offset):
+        lseek(fd, offset, SEEK_SET); return read(fd, n)
+    def pwrite(fd, data, offset):
+        lseek(fd, offset, SEEK_SET); return write(fd, data)
+try:
+    from os import posix_fallocate; HAS_FALLOCATE = True
+except ImportError: # not on Windows or macOS
+    HAS_FALLOCATE = False
 
 # constants
 LOOKUP_VALUE_MAX = 30
@@ -46,6 +68,13 @@ SIZE['TOC-ENTRY'] = sum(SIZE[k] for k in SIZE if k.startswith('TOC-ENTRY_')) # 2
 SIZE['LOOKTAB-ENTRY'] = sum(SIZE[k] for k in SIZE if k.startswith('LOOKTAB-ENTRY_')) # 4 bytes
 SIZE['LOOKTAB'] = NUM_LOOKTAB_ENTRIES*SIZE['LOOKTAB-ENTRY'] # 3600 bytes
 SIZE['DATA-ENTRY_HEADER'] = sum(SIZE[k] for k in SIZE if k.startswith('DATA-ENTRY_')) # 24 bytes
+SIZE['CONTAB-ENTRY'] = SIZE['CONTAB-ENTRY_FOLDER-NAME'] + SIZE['CONTAB-ENTRY_TOC-INDEX'] # 130 bytes (after the number of locations)
+
+# struct formats of fixed-size records (for parsing with iter_unpack)
+TOC_ENTRY_FORMAT = '<%dsIBH' % SIZE['TOC-ENTRY_FILENAME']              # filename, data start, check, conflict index
+LOOKTAB_ENTRY_FORMAT = '<HH'                                            # ToC index, file count
+CONTAB_ENTRY_FORMAT = '<%dsH' % SIZE['CONTAB-ENTRY_FOLDER-NAME']        # folder name, ToC index
+DATA_ENTRY_HEADER_FORMAT = '<%dsI' % SIZE['DATA-ENTRY_FILENAME']        # filename, file size
 
 # start positions of various items in an LGP archive (in bytes)
 START = {
@@ -68,6 +97,8 @@ START['DATA-ENTRY_FILESIZE'] = START['DATA-ENTRY_FILENAME'] + SIZE['DATA-ENTRY_F
 # other defaults
 DEFAULT_CREATOR = "SQUARESOFT"
 DEFAULT_TERMINATOR = "FINAL FANTASY7"
+COPY_CHUNK_SIZE = 0x100000 # copy file data in 1 MiB chunks (if kernel-side copying isn't available)
+UNPACK_BATCHES_PER_WORKER = 4 # number of batches per worker when unpacking in parallel (to balance the load)
 
 # error messages
 ERROR_CHAR_INPUT = "Input must be a single character"
@@ -141,16 +172,94 @@ def toc_to_lookup_table(toc):
     return [(toc_index[i], file_count[i]) for i in range(NUM_LOOKTAB_ENTRIES)]
 
 
-def pack_lgp(files, lgp_filename, creator=DEFAULT_CREATOR, terminator=DEFAULT_TERMINATOR):
-    '''Pack the files in ``files`` into an LGP archive ``lgp_filename``. Note that we specify the number of files just in case ``files`` streams data for memory purposes.
+def pack_lgp_metadata(toc, conflict_table, creator=DEFAULT_CREATOR):
+    '''Build the metadata of an LGP archive (header, Table of Contents, Lookup Table, and Conflict Table), i.e., everything before the file data
+
+    Args:
+        ``toc`` (``list`` of ``dict``): The Table of Contents (each entry needs ``filename``, ``data_start``, ``check``, and ``conflict_index``)
+
+        ``conflict_table`` (``list`` of ``list`` of ``tuple``): The Conflict Table as a list of (folder name, ToC index) lists
+
+        ``creator`` (``str``): The file creator
+
+    Returns:
+        ``bytearray``: The metadata of the LGP archive
+    '''
+    data = bytearray()
+
+    # write header
+    data += (SIZE['HEADER_FILE-CREATOR']-len(creator))*NULL_BYTE; data += creator.encode() # file creator (12 bytes)
+    data += pack('I', len(toc)) # number of files (4 bytes)
+
+    # write table of contents
+    for e in toc:
+        data += pack(TOC_ENTRY_FORMAT, e['filename'].split('/')[-1].encode(), e['data_start'], e['check'], e['conflict_index']) # filename (20 bytes), data start position (4 bytes), check code (1 byte), conflict table index (2 bytes)
+
+    # write lookup table
+    for pair in toc_to_lookup_table(toc):
+        data += pack(LOOKTAB_ENTRY_FORMAT, *pair) # lookup table index and count (2 bytes each)
+
+    # write conflict table
+    data += pack('H', len(conflict_table))
+    for locations in conflict_table:
+        data += pack('H', len(locations)) # number of locations (2 bytes)
+        for p,i in locations:
+            data += pack(CONTAB_ENTRY_FORMAT, p.encode(), i) # location path (128 bytes) and ToC index (2 bytes)
+    return data
+
+def copy_file_data(src_filename, dst_fd, dst_offset, size, src_offset=0):
+    '''Copy the data of file ``src_filename`` into open file descriptor ``dst_fd`` at position ``dst_offset``, using kernel-side copying (``copy_file_range``) if possible, otherwise large buffered chunks written with ``pwrite``
+
+    Args:
+        ``src_filename`` (``str``): The file to copy
+
+        ``dst_fd`` (``int``): The file descriptor of the output file
+
+        ``dst_offset`` (``int``): The position in the output file to copy to
+
+        ``size`` (``int``): The number of bytes to copy
+
+        ``src_offset`` (``int``): The position in ``src_filename`` to copy from
+    '''
+    with open(src_filename, 'rb') as src_f:
+        src_fd = src_f.fileno(); copied = 0
+        if HAS_COPY_FILE_RANGE:
+            try:
+                while copied < size:
+                    n = copy_file_range(src_fd, dst_fd, size-copied, src_offset+copied, dst_offset+copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError: # e.g. unsupported across these filesystems: fall back to buffered copying
+                pass
+        while copied < size:
+            buf = pread(src_fd, min(COPY_CHUNK_SIZE, size-copied), src_offset+copied)
+            if len(buf) == 0:
+                raise RuntimeError("File %s is shorter than expected (%d bytes)" % (src_filename, size))
+            copied += pwrite(dst_fd, buf, dst_offset+copied)
+
+def pack_lgp(files, lgp_filename, creator=DEFAULT_CREATOR, terminator=DEFAULT_TERMINATOR, workers=1):
+    '''Pack the files in ``files`` into an LGP archive ``lgp_filename``. The full layout is computed up front, the output file is preallocated, and each file's data is copied directly to its final position (optionally by multiple threads)
 
     Args:
         ``files`` (iterable of tuple of ``str``): The filenames to pack as (full path in archive, full path on disk) tuples
 
         ``lgp_filename`` (``str``): The filename to write the packed LGP archive
+
+        ``creator`` (``str``): The file creator
+
+        ``terminator`` (``str``): The file terminator
+
+        ``workers`` (``int``): The number of threads to use to stat and copy the files
     '''
     if len(creator) > SIZE['HEADER_FILE-CREATOR']:
         raise ValueError("Creator name longer than %d characters: %s" % (SIZE['HEADER_FILE-CREATOR'],creator))
+    files = list(files)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            filesizes = list(executor.map(getsize, (disk_path for archive_path, disk_path in files)))
+    else:
+        filesizes = [getsize(disk_path) for archive_path, disk_path in files]
 
     # check filenames for validity and start building ToC
     toc = list(); file2path = dict()
@@ -165,7 +274,7 @@ def pack_lgp(files, lgp_filename, creator=DEFAULT_CREATOR, terminator=DEFAULT_TE
         if f not in file2path:
             file2path[f] = list()
         file2path[f].append((path,i)) # (location, ToC index) tuple
-        entry = {'filename':f, 'path':path, 'diskpath':disk_path, 'filesize': getsize(disk_path)}
+        entry = {'filename':f, 'path':path, 'diskpath':disk_path, 'filesize': filesizes[i]}
         entry['check'] = 14 # It seems like most programs just give 14 (the most common value) and FF7 doesn't care. Hopefully somebody can figure out a correct way some day. I thought it might be User+Group file permissions (7+7=14)
         toc.append(entry)
     if len(toc) > MAX_UNSIGNED_INT:
@@ -184,123 +293,111 @@ def pack_lgp(files, lgp_filename, creator=DEFAULT_CREATOR, terminator=DEFAULT_TE
         e['conflict_index'] = file2conflict[e['filename']]
     if len(conflict2file) > MAX_UNSIGNED_SHORT:
         raise ValueError("Number of conflicting filenames (%d) exceeds maximum allowed (%d)" % (len(conflict2file),MAX_UNSIGNED_SHORT))
+    conflict_table = [file2path[f] for f in conflict2file]
 
     # compute data start positions
     toc_size = len(toc) * SIZE['TOC-ENTRY']
-    contab_size = SIZE['CONTAB_NUM-CONFLICTS'] + sum((SIZE['CONTAB-ENTRY_NUM-LOCATIONS'] + len(file2path[f])*(SIZE['CONTAB-ENTRY_FOLDER-NAME']+SIZE['CONTAB-ENTRY_TOC-INDEX'])) for f in file2conflict if file2conflict[f] != 0)
+    contab_size = SIZE['CONTAB_NUM-CONFLICTS'] + sum((SIZE['CONTAB-ENTRY_NUM-LOCATIONS'] + len(locations)*SIZE['CONTAB-ENTRY']) for locations in conflict_table)
     data_start = SIZE['HEADER'] + toc_size + SIZE['LOOKTAB'] + contab_size
     curr_start = data_start
     for e in toc:
-        e['data_start'] = curr_start; curr_start += (SIZE['DATA-ENTRY_FILENAME'] + SIZE['DATA-ENTRY_FILESIZE'] + e['filesize'])
+        e['data_start'] = curr_start; curr_start += (SIZE['DATA-ENTRY_HEADER'] + e['filesize'])
+    metadata = pack_lgp_metadata(toc, conflict_table, creator=creator)
+    if len(metadata) != data_start:
+        raise RuntimeError("Metadata should be %d bytes, but it is %d bytes" % (data_start, len(metadata)))
 
-    # build LGP file
+    # build LGP file (preallocated, with each piece written at its final position)
+    terminator = terminator.encode()
     with open(lgp_filename, 'wb') as outfile:
-        # write header
-        outfile.write((SIZE['HEADER_FILE-CREATOR']-len(creator))*NULL_BYTE); outfile.write(creator.encode()) # file creator (12 bytes)
-        outfile.write(pack('I', len(toc))) # number of files (4 bytes)
-
-        # write table of contents
-        for e in toc:
-            outfile.write(e['filename'].encode()); outfile.write((SIZE['TOC-ENTRY_FILENAME']-len(e['filename']))*NULL_BYTE) # filename (20 bytes)
-            outfile.write(pack('I', e['data_start'])) # data start position (4 bytes)
-            outfile.write(bytes([e['check']])) # check code (1 byte)
-            outfile.write(pack('H', e['conflict_index'])) # conflict table index (2 bytes)
-        
-        # write lookup table
-        for pair in toc_to_lookup_table(toc):
-            for e in pair:
-                outfile.write(pack('H', e)) # lookup table index and count (2 bytes each)
-
-        # write conflict table
-        outfile.write(pack('H', len(conflict2file)))
-        for f in conflict2file:
-            outfile.write(pack('H', len(file2path[f]))) # number of locations (2 bytes)
-            for p,i in file2path[f]:
-                outfile.write(p.encode()); outfile.write((SIZE['CONTAB-ENTRY_FOLDER-NAME']-len(p))*NULL_BYTE) # location path (128 bytes)
-                outfile.write(pack('H', i)) # ToC index (2 bytes)
-
-        # write file data
-        for e in toc:
-            if outfile.tell() != e['data_start']:
-                raise RuntimeError("File %s should be written at offset %d, but file is currently at offset %d" % (e['diskpath'],e['data_start'],outfile.tell()))
-            outfile.write(e['filename'].encode()); outfile.write((SIZE['DATA-ENTRY_FILENAME']-len(e['filename']))*NULL_BYTE) # filename (20 bytes)
-            outfile.write(pack('I', e['filesize'])) # filesize (4 bytes)
-            with open(e['diskpath'],'rb') as tmpfile:
-                outfile.write(tmpfile.read())
-
-        # write file terminator
-        outfile.write(terminator.encode())
+        fd = outfile.fileno(); total_size = curr_start + len(terminator)
+        outfile.truncate(total_size)
+        if HAS_FALLOCATE:
+            try:
+                posix_fallocate(fd, 0, total_size)
+            except OSError: # e.g. unsupported by this filesystem
+                pass
+        pwrite(fd, metadata, 0)
+        def write_entry(e):
+            pwrite(fd, pack(DATA_ENTRY_HEADER_FORMAT, e['filename'].encode(), e['filesize']), e['data_start']) # filename (20 bytes) and filesize (4 bytes)
+            copy_file_data(e['diskpath'], fd, e['data_start']+SIZE['DATA-ENTRY_HEADER'], e['filesize'])
+        if workers > 1 and HAS_PWRITE:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(write_entry, toc):
+                    pass
+        else:
+            for e in toc:
+                write_entry(e)
+        pwrite(fd, terminator, curr_start) # write file terminator
 
 class LGP:
     '''LGP Archive class'''
-    def __init__(self, filename, check=False):
+    def __init__(self, filename, check=False, use_mmap=False):
         '''``LGP`` constructor
 
         Args:
             ``filename`` (``str``): The filename of the LGP archive
 
             ``check`` (``bool``): ``True`` to check the Lookup Table vs. Table of Contents for validity, otherwise ``False``
+
+            ``use_mmap`` (``bool``): ``True`` to memory-map the archive (file data is then returned as zero-copy ``memoryview`` slices), otherwise ``False`` to read it with regular file reads
         '''
         self.filename = filename; self.file = open(filename, 'rb'); total_filesize = getsize(self.filename)
+        self.mmap = None; self.view = None
+        if use_mmap:
+            self.mmap = mmap(self.file.fileno(), 0, access=ACCESS_READ); self.view = memoryview(self.mmap)
 
         # read header
-        tmp = self.file.read(SIZE['HEADER'])
+        tmp = self.load_bytes(0, SIZE['HEADER'])
         self.header = {
-            'file_creator': tmp[START['HEADER_FILE-CREATOR']:START['HEADER_FILE-CREATOR']+SIZE['HEADER_FILE-CREATOR']].decode().strip(NULL_STR),
+            'file_creator': bytes(tmp[START['HEADER_FILE-CREATOR']:START['HEADER_FILE-CREATOR']+SIZE['HEADER_FILE-CREATOR']]).decode().strip(NULL_STR),
             'num_files': unpack('I', tmp[START['HEADER_NUM-FILES']:START['HEADER_NUM-FILES']+SIZE['HEADER_NUM-FILES']])[0],
         }
 
-        # read table of contents
+        # read table of contents and lookup table (3600 bytes)
+        toc_size = self.header['num_files']*SIZE['TOC-ENTRY']
+        tmp = self.load_bytes(START['TOC'], toc_size + SIZE['LOOKTAB'])
         self.toc = list(); self.conflicting_filenames = set()
-        for i in range(self.header['num_files']):
-            tmp = self.file.read(SIZE['TOC-ENTRY'])
-            tmp_filename = tmp[START['TOC-ENTRY_FILENAME']:START['TOC-ENTRY_FILENAME']+SIZE['TOC-ENTRY_FILENAME']].decode().strip(NULL_STR)
-            tmp_data_start = unpack('I', tmp[START['TOC-ENTRY_DATA-START']:START['TOC-ENTRY_DATA-START']+SIZE['TOC-ENTRY_DATA-START']])[0]
-            tmp_check = ord(tmp[START['TOC-ENTRY_CHECK']:START['TOC-ENTRY_CHECK']+SIZE['TOC-ENTRY_CHECK']])
-            tmp_conflict_index = unpack('H', tmp[START['TOC-ENTRY_CONFLICT-INDEX']:START['TOC-ENTRY_CONFLICT-INDEX']+SIZE['TOC-ENTRY_CONFLICT-INDEX']])[0]
+        for tmp_filename, tmp_data_start, tmp_check, tmp_conflict_index in iter_unpack(TOC_ENTRY_FORMAT, tmp[:toc_size]):
+            tmp_filename = tmp_filename.decode().strip(NULL_STR)
             self.toc.append({'filename':tmp_filename, 'data_start':tmp_data_start, 'check':tmp_check, 'conflict_index':tmp_conflict_index})
             if tmp_conflict_index != 0:
                 self.conflicting_filenames.add(tmp_filename)
-
-        # read lookup table (3600 bytes)
-        tmp = self.file.read(SIZE['LOOKTAB'])
-        self.lookup_table = list()
-        for i in range(NUM_LOOKTAB_ENTRIES):
-            start = i*SIZE['LOOKTAB-ENTRY']
-            tmp_toc_index = unpack('H', tmp[start : start + SIZE['LOOKTAB-ENTRY_INDEX']])[0]
-            tmp_file_count = unpack('H', tmp[start + SIZE['LOOKTAB-ENTRY_INDEX'] : start + SIZE['LOOKTAB-ENTRY']])[0]
-            self.lookup_table.append((tmp_toc_index,tmp_file_count))
+        self.lookup_table = list(iter_unpack(LOOKTAB_ENTRY_FORMAT, tmp[toc_size:]))
 
         # read conflict table (2 bytes for number of conflicts, and for files with num_conflicts != 0, the actual table)
-        self.num_conflicting_filenames = unpack('H', self.file.read(SIZE['CONTAB_NUM-CONFLICTS']))[0] # the first 2 bytes of the conflict table are the number of conflicts
+        pos = START['TOC'] + toc_size + SIZE['LOOKTAB']
+        self.num_conflicting_filenames = unpack('H', self.load_bytes(pos, SIZE['CONTAB_NUM-CONFLICTS']))[0]; pos += SIZE['CONTAB_NUM-CONFLICTS'] # the first 2 bytes of the conflict table are the number of conflicts
+        self.conflict_table = list() # list of (folder name, ToC index) lists (ToC entries' conflict indices are 1-based indices into this)
         for i in range(self.num_conflicting_filenames): # if there were conflicts, handle them (e.g. magic.lgp); other files work properly (num_conflicting = 0)
-            curr_num_conflicts = unpack('H', self.file.read(SIZE['CONTAB-ENTRY_NUM-LOCATIONS']))[0]
-            for j in range(curr_num_conflicts):
-                curr_folder_name = self.file.read(SIZE['CONTAB-ENTRY_FOLDER-NAME']).decode().strip(NULL_STR)
-                curr_toc_index = unpack('H', self.file.read(SIZE['CONTAB-ENTRY_TOC-INDEX']))[0] #- 1 # it's 1-based, so subtract 1 to get indexing into self.toc
+            curr_num_conflicts = unpack('H', self.load_bytes(pos, SIZE['CONTAB-ENTRY_NUM-LOCATIONS']))[0]; pos += SIZE['CONTAB-ENTRY_NUM-LOCATIONS']
+            tmp = self.load_bytes(pos, curr_num_conflicts*SIZE['CONTAB-ENTRY']); pos += len(tmp); self.conflict_table.append(list())
+            for curr_folder_name, curr_toc_index in iter_unpack(CONTAB_ENTRY_FORMAT, tmp): # ToC index: #- 1 # it's 1-based, so subtract 1 to get indexing into self.toc
+                curr_folder_name = curr_folder_name.decode().strip(NULL_STR); self.conflict_table[-1].append((curr_folder_name, curr_toc_index))
                 self.toc[curr_toc_index]['filename'] = "%s/%s" % (curr_folder_name, self.toc[curr_toc_index]['filename']) # update filename in Table of Contents
 
+        self.index = None # lowercase filename to entry (built on first lookup)
+
         # read file sizes
-        for entry in self.toc:
-            self.file.seek(entry['data_start']+SIZE['DATA-ENTRY_FILENAME'], 0); entry['filesize'] = unpack('I', self.file.read(SIZE['DATA-ENTRY_FILESIZE']))[0]
+        if self.mmap is None:
+            for entry in self.toc:
+                entry['filesize'] = unpack('I', self.load_bytes(entry['data_start']+SIZE['DATA-ENTRY_FILENAME'], SIZE['DATA-ENTRY_FILESIZE']))[0]
+        else:
+            for entry in self.toc:
+                entry['filesize'] = unpack_from('I', self.mmap, entry['data_start']+SIZE['DATA-ENTRY_FILENAME'])[0]
 
         # read any remaining files that weren't in Table of Contents (e.g. in battle.lgp)
         self.non_toc_files = list()
-        self.file.seek(self.toc[-1]['data_start']+SIZE['DATA-ENTRY_FILENAME'], 0) # move to filesize of last file
-        self.file.seek(unpack('I', self.file.read(SIZE['DATA-ENTRY_FILESIZE']))[0], 1) # move forward to end of last file's data
+        pos = max((entry['data_start'] + SIZE['DATA-ENTRY_HEADER'] + entry['filesize'] for entry in self.toc), default=pos) # move to end of last file's data (the last ToC entry isn't necessarily the last file in an updated archive)
         stopping_point = total_filesize - SIZE['TERMINATOR']
-        while self.file.tell() < stopping_point:
-            entry = dict()
-            entry['data_start'] = self.file.tell()
-            entry['filename'] = self.file.read(SIZE['TOC-ENTRY_FILENAME']).decode().strip(NULL_STR)
-            entry['filesize'] = unpack('I', self.file.read(SIZE['DATA-ENTRY_FILESIZE']))[0]
-            self.file.seek(self.file.tell()+entry['filesize'])
-            self.non_toc_files.append(entry)
+        while pos < stopping_point:
+            tmp_filename, tmp_filesize = unpack(DATA_ENTRY_HEADER_FORMAT, self.load_bytes(pos, SIZE['DATA-ENTRY_HEADER']))
+            self.non_toc_files.append({'data_start':pos, 'filename':tmp_filename.decode().strip(NULL_STR), 'filesize':tmp_filesize})
+            pos += SIZE['DATA-ENTRY_HEADER'] + tmp_filesize
 
         # read terminator
-        if total_filesize - self.file.tell() != SIZE['TERMINATOR']:
+        if total_filesize - pos != SIZE['TERMINATOR']:
             raise ValueError(ERROR_TERMINATOR_SIZE)
-        self.terminator = self.file.read().decode().strip(NULL_STR)
+        self.terminator = bytes(self.load_bytes(pos, SIZE['TERMINATOR'])).decode().strip(NULL_STR)
 
         # check lookup table for validity
         if check and not self.valid_lookup():
@@ -308,6 +405,24 @@ class LGP:
 
     def __del__(self):
         '''``LGP`` destructor'''
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        '''Close this LGP archive (and release its memory map, if any). In ``mmap`` mode, the mapping is only released once all ``memoryview`` slices returned by this archive have also been released'''
+        if getattr(self, 'view', None) is not None:
+            self.view.release(); self.view = None
+        if getattr(self, 'mmap', None) is not None:
+            try:
+                self.mmap.close()
+            except BufferError: # slices still exported: the mapping is released when they are
+                pass
+            self.mmap = None
         if hasattr(self, 'file'):
             self.file.close()
 
@@ -321,8 +436,93 @@ class LGP:
 
     def __iter__(self):
         '''Iterate over the file entires in this LGP'''
-        for entry in self.toc+self.non_toc_files:
-            yield entry
+        return chain(self.toc, self.non_toc_files)
+
+    def __contains__(self, filename):
+        '''Check if a file is in this LGP (case-insensitive)
+
+        Args:
+            ``filename`` (``str``): The filename (with folder, for filenames in the Conflict Table)
+
+        Returns:
+            ``bool``: ``True`` if ``filename`` is in this LGP, otherwise ``False``
+        '''
+        return self.find_entry(filename) is not None
+
+    def __getitem__(self, filename):
+        '''Load the data of a file in this LGP (case-insensitive)
+
+        Args:
+            ``filename`` (``str``): The filename (with folder, for filenames in the Conflict Table)
+
+        Returns:
+            ``bytes``: The data of the file (a ``memoryview`` in ``mmap`` mode)
+        '''
+        entry = self.find_entry(filename)
+        if entry is None:
+            raise KeyError(filename)
+        return self.load_toc_entry(entry)
+
+    def get(self, filename, default=None):
+        '''Load the data of a file in this LGP (case-insensitive), or return ``default`` if it doesn't exist
+
+        Args:
+            ``filename`` (``str``): The filename (with folder, for filenames in the Conflict Table)
+
+            ``default``: The value to return if ``filename`` is not in this LGP
+
+        Returns:
+            ``bytes``: The data of the file (a ``memoryview`` in ``mmap`` mode), or ``default``
+        '''
+        entry = self.find_entry(filename)
+        if entry is None:
+            return default
+        return self.load_toc_entry(entry)
+
+    def find_entry(self, filename):
+        '''Find the entry of a file in this LGP (case-insensitive) using a hash index (built on first use). If an earlier entry has the same name, the earlier entry is returned (same as the game)
+
+        Args:
+            ``filename`` (``str``): The filename (with folder, for filenames in the Conflict Table)
+
+        Returns:
+            ``dict``: The entry of ``filename``, or ``None`` if it doesn't exist
+        '''
+        if self.index is None:
+            self.index = dict()
+            for entry in self:
+                self.index.setdefault(entry['filename'].lower().lstrip('/'), entry) # files in the root folder have an empty Conflict Table folder name
+        filename = filename.lower().lstrip('/'); entry = self.index.get(filename)
+        if entry is None and '/' in filename: # the folder only matters for filenames in the Conflict Table
+            entry = self.index.get(filename.split('/')[-1])
+            if entry is not None and entry.get('conflict_index',0) != 0:
+                entry = None
+        return entry
+
+    def lookup_entry(self, filename):
+        '''Find the entry of a file in the Table of Contents the same way the game does: scan the Lookup Table bucket of its first two characters, and resolve filenames in the Conflict Table by folder name
+
+        Args:
+            ``filename`` (``str``): The filename (with folder, for filenames in the Conflict Table)
+
+        Returns:
+            ``dict``: The entry of ``filename``, or ``None`` if it doesn't exist
+        '''
+        filename = filename.lower().lstrip('/'); folder = '/'.join(filename.split('/')[:-1]); name = filename.split('/')[-1]
+        try:
+            toc_index, count = self.lookup_table[filename_to_lookup_index(name)]
+        except (IndexError,ValueError):
+            return None
+        for i in range(toc_index-1, toc_index-1+count): # Lookup Table ToC index is 1-based
+            entry = self.toc[i]
+            if entry['filename'].split('/')[-1].lower() != name:
+                continue
+            if entry['conflict_index'] == 0:
+                return entry
+            for curr_folder_name, curr_toc_index in self.conflict_table[entry['conflict_index']-1]:
+                if curr_toc_index == i and curr_folder_name.lower() == folder:
+                    return entry
+        return None
 
     def load_bytes(self, start, size):
         '''Load the first ``size`` bytes starting with position ``start``
@@ -333,8 +533,10 @@ class LGP:
             ``size`` (``int``): The number of bytes to read
 
         Returns:
-            ``bytes``: The first ``size`` bytes starting with position ``start``
+            ``bytes``: The first ``size`` bytes starting with position ``start`` (a ``memoryview`` in ``mmap`` mode)
         '''
+        if self.view is not None:
+            return self.view[start:start+size]
         self.file.seek(start, 0)
         return self.file.read(size)
 
@@ -345,7 +547,7 @@ class LGP:
             ``entry`` (``dict``): The Table of Contents entry to load
 
         Returns:
-            ``bytes``: The data corresponding to the given Table of Contents entry
+            ``bytes``: The data corresponding to the given Table of Contents entry (a ``memoryview`` in ``mmap`` mode)
         '''
         if 'data_start' not in entry or 'filesize' not in entry:
             raise TypeError(ERROR_INVALID_TOC_ENTRY)
@@ -353,7 +555,7 @@ class LGP:
 
     def load_files(self):
         '''Load each file contained in the LGP archive, yielding (filename, data) tuples'''
-        for entry in self.toc+self.non_toc_files:
+        for entry in self:
             yield (entry['filename'], self.load_toc_entry(entry))
 
     def valid_lookup(self):
@@ -363,3 +565,232 @@ class LGP:
             ``bool``: ``True`` if Lookup Table is valid with respect to Table of Contents, otherwise ``False``
         '''
         return self.lookup_table == toc_to_lookup_table(self.toc)
+
+def unpack_lgp_batch(lgp_filename, batch):
+    '''Extract a batch of files from an LGP archive (run by each worker of ``unpack_lgp``)
+
+    Args:
+        ``lgp_filename`` (``str``): The filename of the LGP archive
+
+        ``batch`` (``list`` of ``tuple``): The (data_start, filesize, output_filename) tuples of the files to extract
+
+    Returns:
+        ``int``: The number of bytes written
+    '''
+    written = 0
+    with open(lgp_filename, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+        view = memoryview(mm)
+        for data_start, filesize, out_filename in batch:
+            start = data_start + SIZE['DATA-ENTRY_HEADER']
+            with open(out_filename, 'wb') as out_f:
+                written += out_f.write(view[start:start+filesize])
+        view.release()
+    return written
+
+def unpack_lgp(lgp_filename, out_dir, workers=1, batch_size=None):
+    '''Extract all files in an LGP archive into ``out_dir``, optionally in parallel. The files are sorted by position in the archive and split into batches of contiguous byte ranges, each of which is extracted by a worker process with its own memory map of the archive
+
+    Args:
+        ``lgp_filename`` (``str``): The filename of the LGP archive
+
+        ``out_dir`` (``str``): The output directory (created if it doesn't exist)
+
+        ``workers`` (``int``): The number of worker processes (1 = extract in this process)
+
+        ``batch_size`` (``int``): The approximate number of bytes per batch (default: split the files evenly into ``UNPACK_BATCHES_PER_WORKER`` batches per worker)
+
+    Returns:
+        ``dict``: Statistics of the extraction (``num_files``, ``num_duplicates``, ``num_bytes``, and ``seconds``)
+    '''
+    start_time = time()
+    with LGP(lgp_filename) as lgp:
+        entries = list(lgp); num_files = len(entries)
+
+    # plan output filenames (if a filename appears multiple times, the last one wins)
+    plan = dict()
+    for entry in entries:
+        filename = entry['filename']
+        if NULL_STR in filename: # weird characters in filename, so truncate extension
+            filename = filename[:filename.index('.')+4]
+        out_filename = "%s/%s" % (out_dir, filename)
+        if out_filename in plan:
+            warn("Duplicate file overwritten: %s" % out_filename)
+        plan[out_filename] = entry
+
+    # create all output directories up front
+    for folder in {'/'.join(out_filename.split('/')[:-1]) for out_filename in plan}:
+        makedirs(folder, exist_ok=True)
+
+    # split files into batches of contiguous byte ranges
+    if batch_size is None:
+        batch_size = sum(entry['filesize'] for entry in plan.values()) // (max(workers,1)*UNPACK_BATCHES_PER_WORKER)
+    batches = [list()]; curr_batch_size = 0
+    for out_filename, entry in sorted(plan.items(), key=lambda x: x[1]['data_start']):
+        if curr_batch_size >= batch_size and curr_batch_size != 0:
+            batches.append(list()); curr_batch_size = 0
+        batches[-1].append((entry['data_start'], entry['filesize'], out_filename)); curr_batch_size += entry['filesize']
+
+    # extract files
+    if workers <= 1:
+        num_bytes = sum(unpack_lgp_batch(lgp_filename, batch) for batch in batches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            num_bytes = sum(executor.map(unpack_lgp_batch, repeat(lgp_filename), batches))
+    return {'num_files': num_files, 'num_duplicates': num_files-len(plan), 'num_bytes': num_bytes, 'seconds': time()-start_time}
+
+def update_lgp(lgp_filename, files=None, remove=None, compact=False):
+    '''Update an LGP archive in place: replace or add the files in ``files`` and remove the files in ``remove``. Only the metadata (header, Table of Contents, Lookup Table, and Conflict Table) is rewritten, and only new/changed file data is written (into holes left by removed/replaced files if they fit, otherwise at the end). Files whose data would be overwritten by a larger Table of Contents are relocated the same way, and files that aren't in the Table of Contents are moved to the end. Existing files without a Conflict Table entry are assumed to be in the root folder
+
+    Args:
+        ``lgp_filename`` (``str``): The filename of the LGP archive to update
+
+        ``files`` (iterable of tuple): The files to add or replace as (full path in archive, full path on disk or ``bytes``) tuples (``None`` = no files)
+
+        ``remove`` (iterable of ``str``): The files to remove (full paths in archive) (``None`` = no files)
+
+        ``compact`` (``bool``): ``True`` to rewrite the whole archive without holes afterwards (i.e., a full repack), otherwise ``False``
+
+    Returns:
+        ``dict``: Statistics of the update (``added``, ``replaced``, ``removed``, ``relocated``, and the final ``filesize``)
+    '''
+    if files is None:
+        files = list()
+    if remove is None:
+        remove = list()
+    stats = {'added':0, 'replaced':0, 'removed':0, 'relocated':0}
+    with LGP(lgp_filename) as lgp:
+        creator = bytes(lgp.load_bytes(START['HEADER_FILE-CREATOR'], SIZE['HEADER_FILE-CREATOR']))
+        terminator = bytes(lgp.load_bytes(getsize(lgp_filename)-SIZE['TERMINATOR'], SIZE['TERMINATOR']))
+        toc = [dict(entry) for entry in lgp.toc]; non_toc = [dict(entry) for entry in lgp.non_toc_files]
+        path2entry = dict() # lowercase full path in archive to entry (files without a Conflict Table entry are in the root folder)
+        for entry in toc + non_toc:
+            path2entry.setdefault(entry['filename'].lower().lstrip('/'), entry)
+
+        # remove files
+        removed = set()
+        for archive_path in remove:
+            entry = path2entry.pop(archive_path.lower().lstrip('/'), None)
+            if entry is None:
+                raise KeyError(archive_path)
+            removed.add(id(entry)); stats['removed'] += 1
+
+        # replace/add files (new data is either a filename on disk or bytes)
+        for archive_path, src in files:
+            filesize = len(src) if isinstance(src,bytes) or isinstance(src,bytearray) else getsize(src)
+            key = archive_path.lower().lstrip('/')
+            if key in path2entry:
+                entry = path2entry[key]; stats['replaced'] += 1
+            else:
+                name = archive_path.split('/')[-1]; folder = '/'.join(archive_path.split('/')[:-1])
+                if len(name) > SIZE['TOC-ENTRY_FILENAME']:
+                    raise ValueError("File name longer than %d characters: %s" % (SIZE['TOC-ENTRY_FILENAME'],name))
+                if len(folder) > SIZE['CONTAB-ENTRY_FOLDER-NAME']:
+                    raise ValueError("Path name longer than %d characters: %s" % (SIZE['CONTAB-ENTRY_FOLDER-NAME'],folder))
+                entry = {'filename':archive_path, 'check':14}; toc.append(entry); path2entry[key] = entry; stats['added'] += 1
+            entry['src'] = src; entry['filesize'] = filesize
+        toc = [entry for entry in toc if id(entry) not in removed]; non_toc = [entry for entry in non_toc if id(entry) not in removed]
+        if stats['added'] != 0: # keep each Lookup Table bucket contiguous (the game scans them)
+            toc.sort(key=lambda entry: filename_to_lookup_index(entry['filename'].split('/')[-1]))
+        if len(toc) > MAX_UNSIGNED_INT:
+            raise ValueError("Number of files (%d) exceeds maximum allowed (%d)" % (len(toc),MAX_UNSIGNED_INT))
+
+        # rebuild conflict table
+        file2path = dict()
+        for i,entry in enumerate(toc):
+            name = entry['filename'].split('/')[-1]; folder = '/'.join(entry['filename'].split('/')[:-1])
+            if name not in file2path:
+                file2path[name] = list()
+            file2path[name].append((folder,i)) # (location, ToC index) tuple
+        conflict_table = list(); file2conflict = dict()
+        for entry in toc:
+            name = entry['filename'].split('/')[-1]
+            if len(file2path[name]) > 1:
+                if name not in file2conflict:
+                    conflict_table.append(file2path[name]); file2conflict[name] = len(conflict_table)
+                entry['conflict_index'] = file2conflict[name]
+            else:
+                entry['conflict_index'] = 0
+        if len(conflict_table) > MAX_UNSIGNED_SHORT:
+            raise ValueError("Number of conflicting filenames (%d) exceeds maximum allowed (%d)" % (len(conflict_table),MAX_UNSIGNED_SHORT))
+        metadata_size = SIZE['HEADER'] + len(toc)*SIZE['TOC-ENTRY'] + SIZE['LOOKTAB'] + SIZE['CONTAB_NUM-CONFLICTS'] + sum(SIZE['CONTAB-ENTRY_NUM-LOCATIONS'] + len(locations)*SIZE['CONTAB-ENTRY'] for locations in conflict_table)
+
+        # compaction: repack everything into a new file
+        if compact:
+            for entry in toc:
+                if 'src' not in entry:
+                    entry['src_offset'] = entry['data_start']
+            for entry in non_toc:
+                entry['src'] = bytes(lgp.load_toc_entry(entry)) if 'src' not in entry else entry['src']
+            curr_start = metadata_size
+            for entry in toc:
+                entry['data_start'] = curr_start; curr_start += SIZE['DATA-ENTRY_HEADER'] + entry['filesize']
+            tmp_filename = "%s.tmp" % lgp_filename
+            with open(tmp_filename, 'wb') as outfile:
+                fd = outfile.fileno()
+                for entry in toc:
+                    pwrite(fd, pack(DATA_ENTRY_HEADER_FORMAT, entry['filename'].split('/')[-1].encode(), entry['filesize']), entry['data_start'])
+                    if 'src' in entry:
+                        write_entry_data(entry['src'], fd, entry['data_start']+SIZE['DATA-ENTRY_HEADER'], entry['filesize'])
+                    else:
+                        copy_file_data(lgp_filename, fd, entry['data_start']+SIZE['DATA-ENTRY_HEADER'], entry['filesize'], src_offset=entry['src_offset']+SIZE['DATA-ENTRY_HEADER'])
+                end = write_lgp_tail(fd, curr_start, non_toc, terminator)
+                write_lgp_metadata(fd, toc, conflict_table, creator); outfile.truncate(end)
+            lgp.close(); replace(tmp_filename, lgp_filename); stats['filesize'] = end
+            return stats
+
+        # relocate files whose data would be overwritten by the new metadata
+        for entry in toc:
+            if 'src' not in entry and entry['data_start'] < metadata_size:
+                entry['src'] = bytes(lgp.load_toc_entry(entry)); stats['relocated'] += 1
+        for entry in non_toc: # files after the Table of Contents data are rewritten at the end
+            if 'src' not in entry:
+                entry['src'] = bytes(lgp.load_toc_entry(entry))
+
+    # find holes between the data of the files that stay in place, and place new data in them (first fit) or at the end
+    kept = sorted((entry['data_start'], entry['data_start']+SIZE['DATA-ENTRY_HEADER']+entry['filesize']) for entry in toc if 'src' not in entry)
+    holes = list(); curr_end = metadata_size
+    for start, end in kept:
+        if start > curr_end:
+            holes.append([curr_end, start])
+        curr_end = max(curr_end, end)
+    for entry in toc:
+        if 'src' not in entry:
+            continue
+        needed = SIZE['DATA-ENTRY_HEADER'] + entry['filesize']
+        for hole in holes:
+            if hole[1] - hole[0] >= needed:
+                entry['data_start'] = hole[0]; hole[0] += needed; break
+        else:
+            entry['data_start'] = curr_end; curr_end += needed
+
+    # write the changes
+    with open(lgp_filename, 'r+b') as outfile:
+        fd = outfile.fileno()
+        for entry in toc:
+            if 'src' in entry:
+                pwrite(fd, pack(DATA_ENTRY_HEADER_FORMAT, entry['filename'].split('/')[-1].encode(), entry['filesize']), entry['data_start'])
+                write_entry_data(entry['src'], fd, entry['data_start']+SIZE['DATA-ENTRY_HEADER'], entry['filesize'])
+        end = write_lgp_tail(fd, curr_end, non_toc, terminator)
+        write_lgp_metadata(fd, toc, conflict_table, creator); outfile.truncate(end)
+    stats['filesize'] = end
+    return stats
+
+def write_lgp_metadata(fd, toc, conflict_table, creator):
+    '''Write the metadata of an LGP archive into open file descriptor ``fd``, keeping the raw 12-byte file creator ``creator`` of the original archive'''
+    metadata = pack_lgp_metadata(toc, conflict_table); metadata[:SIZE['HEADER_FILE-CREATOR']] = creator
+    pwrite(fd, metadata, 0)
+
+def write_entry_data(src, fd, offset, size):
+    '''Write the data of a file (a filename on disk or ``bytes``) into open file descriptor ``fd`` at position ``offset``'''
+    if isinstance(src,bytes) or isinstance(src,bytearray):
+        pwrite(fd, src, offset)
+    else:
+        copy_file_data(src, fd, offset, size)
+
+def write_lgp_tail(fd, offset, non_toc, terminator):
+    '''Write the files that aren't in the Table of Contents (which must have ``src`` data) followed by the terminator, starting at position ``offset``, and return the end position'''
+    for entry in non_toc:
+        pwrite(fd, pack(DATA_ENTRY_HEADER_FORMAT, entry['filename'].encode(), entry['filesize']), offset); offset += SIZE['DATA-ENTRY_HEADER']
+        write_entry_data(entry['src'], fd, offset, entry['filesize']); offset += entry['filesize']
+    pwrite(fd, terminator, offset)
+    return offset + len(terminator)
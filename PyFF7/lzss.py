@@ -14,6 +14,8 @@ RIGHT_NIBBLE_MASK = 0b00001111
 WINDOW_MASK = 0x0FFF
 WINDOW_SIZE = 0x1000
 BITS_PER_BYTE = 8
+DECOMPRESS_ESTIMATE_RATIO = 4 # initial guess of (decompressed size / compressed size) when the decompressed size is unknown
+DEFAULT_STREAM_CHUNK_SIZE = 0x10000 # number of bytes to read at a time when streaming
 
 # sizes
 SIZE = {
@@ -24,6 +26,12 @@ SIZE = {
 # error messages
 ERROR_NOT_FILENAME_OR_BYTES = "Input must be a filename (str) or bytes"
 ERROR_REF_SIZE = "Reference must be %d bytes" % SIZE['REF']
+ERROR_NOT_FILENAME_OR_STREAM = "Input must be a filename (str) or a readable binary stream"
+ERROR_MISSING_HEADER = "Compressed data ended before the %d-byte header" % SIZE['HEADER']
+ERROR_DECOMPRESSOR_FINISHED = "Decompressor has already been flushed"
+ERROR_COMPRESSOR_FINISHED = "Compressor has already been flushed"
+ERROR_NOT_FILENAME_BYTES_OR_STREAM = "Input must be a filename (str), bytes, a list of bytes, or a readable binary stream"
+ERROR_NOT_SEEKABLE = "Header can only be written if the output is seekable or the input can be re-read"
 
 def control_to_flags(control):
     '''Convert a Control Byte to 8 flags (``True`` = literal data, ``False`` = reference)
@@ -68,6 +76,30 @@ def correct_offset(raw_offset, tail):
     '''
     return tail - ((tail - 18 - raw_offset) & WINDOW_MASK)
 
+def control_to_runs(control):
+    '''Convert a Control Byte to a sequence of runs (``n > 0`` = ``n`` consecutive pieces of literal data, ``0`` = reference)
+
+    Args:
+        ``control`` (``int``): The control byte
+
+    Returns:
+        ``tuple`` of ``int``: The runs described by the control byte (in order)
+    '''
+    runs = list()
+    for flag in control_to_flags(control):
+        if not flag:
+            runs.append(0)
+        elif len(runs) == 0 or runs[-1] == 0:
+            runs.append(1)
+        else:
+            runs[-1] += 1
+    return tuple(runs)
+
+# lookup tables for all 256 possible control bytes
+CONTROL_FLAGS = tuple(control_to_flags(c) for c in range(256))
+CONTROL_RUNS = tuple(control_to_runs(c) for c in range(256))
+CONTROL_GROUP_SIZE = tuple(1 + sum(1 if flag else SIZE['REF'] for flag in flags) for flags in CONTROL_FLAGS) # bytes in a full group (including the control byte)
+
 def decompress_lzss(data, includes_header=True):
     '''Decompress an LZSS file
 
@@ -117,6 +149,189 @@ def decompress_lzss(data, includes_header=True):
                         out.append(chunk[i%len(chunk)])
     return out
 
+def decompress_lzss_fast(data, includes_header=True, size_hint=None):
+    '''Decompress an LZSS file. This produces the exact same output as ``decompress_lzss`` (the reference implementation), but it decodes each control byte with a lookup table, copies runs of literals and references with a single slice assignment, and writes into a preallocated buffer
+
+    Args:
+        ``data`` (``bytes``): The input LZSS-compressed file
+
+        ``includes_header`` (``bool``): ``True`` if ``data`` includes the 4-byte header (the compressed data size), otherwise ``False``
+
+        ``size_hint`` (``int``): The size of the decompressed data (if known), used to preallocate the output buffer
+
+    Returns:
+        ``bytes``: The resulting decompressed file
+    '''
+    # prepare and read header
+    if isinstance(data,str): # if filename instead of bytes, read bytes
+        with open(data,'rb') as f:
+            data = f.read()
+    elif not isinstance(data, bytes) and not isinstance(data, bytearray):
+        raise TypeError(ERROR_NOT_FILENAME_OR_BYTES)
+    if includes_header:
+        datasize = unpack('I', data[:SIZE['HEADER']])[0]
+        if len(data) - 4 != datasize:
+            raise ValueError("Size of compressed data (%d) does not match header size (%d)" % (len(data)-4, datasize))
+        inpos = SIZE['HEADER'] # already read the header
+    else:
+        inpos = 0
+
+    # decompress file
+    end = len(data)
+    if size_hint is None:
+        size_hint = DECOMPRESS_ESTIMATE_RATIO * end
+    out = bytearray(size_hint)
+    tail = decode_lzss_groups(data, inpos, end, out, 0)
+    del out[tail:]
+    return out
+
+def decode_lzss_groups(data, inpos, end, out, tail, base=0):
+    '''Decode the LZSS groups (control byte + up to 8 pieces of data) in ``data[inpos:end]`` into ``out``, starting at position ``tail``. Everything past ``tail`` in ``out`` must be NULL bytes (so NULL runs only need to move ``tail``), and ``out`` is grown in place as needed
+
+    Args:
+        ``data`` (``bytes``): The LZSS-compressed data (without header)
+
+        ``inpos`` (``int``): The position in ``data`` to start decoding
+
+        ``end`` (``int``): The position in ``data`` to stop decoding
+
+        ``out`` (``bytearray``): The output buffer (which must contain at least the last 4 KiB of decompressed data before ``tail``)
+
+        ``tail`` (``int``): The position in ``out`` to start writing
+
+        ``base`` (``int``): The number of decompressed bytes that have been dropped from the start of ``out``
+
+    Returns:
+        ``int``: The new ``tail`` (i.e., the end of the decompressed data in ``out``)
+    '''
+    while inpos < end:
+        runs = CONTROL_RUNS[data[inpos]]; inpos += 1 # read control byte
+        for run in runs:
+            if inpos >= end:
+                break
+            if run != 0: # literal data
+                run = min(run, end-inpos)
+                if tail + run > len(out):
+                    out += bytes(max(len(out), run))
+                out[tail:tail+run] = data[inpos:inpos+run]; inpos += run; tail += run
+            else:        # reference
+                if inpos + 1 < end:
+                    length = (data[inpos+1] & RIGHT_NIBBLE_MASK) + MIN_REF_LEN
+                    offset = ((data[inpos+1] & LEFT_NIBBLE_MASK) << 4) | data[inpos]
+                else:
+                    offset, length = ref_to_offset_len(data[inpos:inpos+1])
+                inpos += SIZE['REF']
+                if tail + length > len(out):
+                    out += bytes(max(len(out), length))
+                pos = tail - ((tail + base - 18 - offset) & WINDOW_MASK)
+                if pos < 0: # negative index = NULL byte
+                    nulls = min(-pos, length); pos += nulls
+                else:
+                    nulls = 0
+                chunk = out[pos:min(pos+length-nulls, tail)]
+                if nulls != 0 and len(chunk) != 0:
+                    chunk = bytes(nulls) + chunk
+                if len(chunk) == length:
+                    out[tail:tail+length] = chunk
+                elif len(chunk) != 0: # out-of-bounds offset = repeated runs
+                    out[tail:tail+length] = (chunk * (length // len(chunk) + 1))[:length]
+                tail += length # empty chunk = NULL bytes (already in place)
+    return tail
+
+class LZSSDecompressor:
+    '''Streaming LZSS decompressor: ``feed`` it compressed data in pieces, and it returns decompressed data as soon as it is available (only the 4-KiB sliding window and any incomplete group are kept in memory)'''
+    def __init__(self, includes_header=True):
+        '''``LZSSDecompressor`` constructor
+
+        Args:
+            ``includes_header`` (``bool``): ``True`` if the compressed data includes the 4-byte header (the compressed data size), otherwise ``False``
+        '''
+        self.includes_header = includes_header
+        self.datasize = None     # compressed data size from the header
+        self.consumed = 0        # number of compressed bytes consumed (excluding the header)
+        self.pending = bytearray() # compressed bytes that don't yet form a complete group
+        self.out = bytearray(WINDOW_SIZE); self.tail = 0; self.base = 0; self.emitted = 0
+        self.finished = False
+
+    def feed(self, data):
+        '''Feed compressed data to this decompressor
+
+        Args:
+            ``data`` (``bytes``): The next piece of the compressed data
+
+        Returns:
+            ``bytes``: The decompressed data that became available
+        '''
+        if self.finished:
+            raise ValueError(ERROR_DECOMPRESSOR_FINISHED)
+        self.pending += data
+        if self.includes_header and self.datasize is None:
+            if len(self.pending) < SIZE['HEADER']:
+                return b''
+            self.datasize = unpack('I', self.pending[:SIZE['HEADER']])[0]; del self.pending[:SIZE['HEADER']]
+        end = 0; num_pending = len(self.pending)
+        while end < num_pending and end + CONTROL_GROUP_SIZE[self.pending[end]] <= num_pending:
+            end += CONTROL_GROUP_SIZE[self.pending[end]]
+        return self._decode(end)
+
+    def flush(self):
+        '''Finish decompressing (the last group may be incomplete)
+
+        Returns:
+            ``bytes``: The remaining decompressed data
+        '''
+        if self.finished:
+            return b''
+        if self.includes_header and self.datasize is None:
+            raise ValueError(ERROR_MISSING_HEADER)
+        out = self._decode(len(self.pending)); self.finished = True
+        if self.includes_header and self.consumed != self.datasize:
+            raise ValueError("Size of compressed data (%d) does not match header size (%d)" % (self.consumed, self.datasize))
+        return out
+
+    def _decode(self, end):
+        '''Decode the first ``end`` pending bytes, and return the new decompressed data'''
+        if end != 0:
+            self.tail = decode_lzss_groups(self.pending, 0, end, self.out, self.tail, self.base)
+            del self.pending[:end]; self.consumed += end
+        new = bytes(self.out[self.emitted:self.tail])
+        drop = self.tail - WINDOW_SIZE # only keep the sliding window
+        if drop > 0:
+            del self.out[:drop]; self.base += drop; self.tail -= drop
+        self.emitted = self.tail
+        return new
+
+def decompress_lzss_stream(stream, includes_header=True, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    '''Decompress an LZSS file from a stream, yielding the decompressed data in pieces
+
+    Args:
+        ``stream`` (``str`` or file object): The input LZSS-compressed file (filename or readable binary stream)
+
+        ``includes_header`` (``bool``): ``True`` if the data includes the 4-byte header (the compressed data size), otherwise ``False``
+
+        ``chunk_size`` (``int``): The number of compressed bytes to read at a time
+
+    Returns:
+        ``generator`` of ``bytes``: The pieces of the decompressed file
+    '''
+    if isinstance(stream,str): # if filename instead of stream, open it
+        with open(stream,'rb') as f:
+            yield from decompress_lzss_stream(f, includes_header=includes_header, chunk_size=chunk_size)
+        return
+    elif not hasattr(stream, 'read'):
+        raise TypeError(ERROR_NOT_FILENAME_OR_STREAM)
+    decompressor = LZSSDecompressor(includes_header=includes_header)
+    while True:
+        data = stream.read(chunk_size)
+        if len(data) == 0:
+            break
+        out = decompressor.feed(data)
+        if len(out) != 0:
+            yield out
+    out = decompressor.flush()
+    if len(out) != 0:
+        yield out
+
 class Dictionary:
     '''Dictionary for LZSS compression'''
     def __init__(self, ptr):
@@ -183,6 +398,7 @@ def compress_lzss(data, include_header=True, merge_chunks=True):
             data = f.read()
     elif not isinstance(data, bytes) and not isinstance(data, bytearray):
         raise TypeError(ERROR_NOT_FILENAME_OR_BYTES)
+    data = bytes(data) # dictionary keys must be hashable
     dictionary = Dictionary(WINDOW_SIZE - 2*MAX_REF_LEN)
 
     # Prime the dictionary
@@ -225,3 +441,264 @@ def compress_lzss(data, include_header=True, merge_chunks=True):
         else:
             output = [header] + output
     return output
+
+class HashChain:
+    '''Hash-chain match finder for LZSS compression (keys on 3-byte prefixes over the 4-KiB window)'''
+    def __init__(self, max_chain=WINDOW_SIZE):
+        '''``HashChain`` constructor
+
+        Args:
+            ``max_chain`` (``int``): The maximum number of candidate positions to check per search (lower = faster, but possibly worse compression)
+        '''
+        self.max_chain = max_chain
+        self.head = dict()           # 3-byte prefix to most recent position with that prefix
+        self.prev = [-1]*WINDOW_SIZE # position (modulo window size) to previous position with the same prefix
+
+    def insert(self, buf, pos, base=0):
+        '''Insert position ``pos`` of the data into the hash chains
+
+        Args:
+            ``buf`` (``bytes``): The data being compressed
+
+            ``pos`` (``int``): The position to insert
+
+            ``base`` (``int``): The position of ``buf[0]`` in the data (if earlier data has been dropped from ``buf``)
+        '''
+        key = buf[pos-base:pos-base+MIN_REF_LEN]
+        if len(key) == MIN_REF_LEN:
+            self.prev[pos & WINDOW_MASK] = self.head.get(key, -1); self.head[key] = pos
+
+    def find(self, buf, pos, end, base=0):
+        '''Find the longest match for position ``pos`` of the data among the previously-inserted positions in the window
+
+        Args:
+            ``buf`` (``bytes``): The data being compressed
+
+            ``pos`` (``int``): The position to find a match for
+
+            ``end`` (``int``): The end of the data that can be matched
+
+            ``base`` (``int``): The position of ``buf[0]`` in the data (if earlier data has been dropped from ``buf``)
+
+        Returns:
+            ``tuple`` of ``int``: The (match_position, length) of the longest match, or ``None`` if there is no match
+        '''
+        max_len = min(MAX_REF_LEN, end - pos)
+        if max_len < MIN_REF_LEN:
+            return None
+        i = pos - base
+        cand = self.head.get(buf[i:i+MIN_REF_LEN], -1); limit = max(pos - WINDOW_SIZE, -1) # match at distance WINDOW_SIZE would have offset == ptr, which the FF7 LZSS decompressor can't handle
+        best_pos = -1; best_len = 0; chain = self.max_chain
+        while cand > limit and chain > 0:
+            c = cand - base
+            if best_len == 0 or buf[c+best_len] == buf[i+best_len]:
+                length = MIN_REF_LEN # the first 3 bytes match (same hash chain key)
+                while length < max_len and buf[c+length] == buf[i+length]:
+                    length += 1
+                if length > best_len:
+                    best_pos = cand; best_len = length
+                    if length == max_len:
+                        break
+            cand = self.prev[cand & WINDOW_MASK]; chain -= 1
+        if best_len == 0:
+            return None
+        return (best_pos, best_len)
+
+class LZSSCompressor:
+    '''Streaming LZSS compressor: ``feed`` it data in pieces, and it returns each compressed group (control byte + up to 8 pieces of data) as soon as it is final. The 4-byte header is not included (see ``compress_lzss_stream``)'''
+    def __init__(self, merge_chunks=True, lazy=False, max_chain=WINDOW_SIZE):
+        '''``LZSSCompressor`` constructor
+
+        Args:
+            ``merge_chunks`` (``bool``): ``True`` to return the compressed groups merged into a single ``bytes`` object, otherwise ``False`` to return a ``list`` of (uncompressed_offset_end, compressed_data) ``tuple`` objects
+
+            ``lazy`` (``bool``): ``True`` to use lazy matching (emit a literal if the next position has a match at least 2 bytes longer), otherwise ``False`` to use greedy matching (the default: lazy matching is usually, but not always, smaller than greedy matching and the reference compressor)
+
+            ``max_chain`` (``int``): The maximum number of candidate positions to check per search
+        '''
+        self.merge_chunks = merge_chunks; self.lazy = lazy
+        self.matcher = HashChain(max_chain=max_chain)
+        self.buf = NULL_BYTE*MAX_REF_LEN; self.base = 0 # positions are relative to MAX_REF_LEN NULL bytes preceding the data (same as priming the dictionary)
+        self.pos = MAX_REF_LEN; self.inserted = 0; self.next_match = None
+        self.chunk = bytearray(); self.flags = 0; self.bit = 0 # current (incomplete) group
+        self.size = 0 # number of compressed bytes returned so far
+        self.finished = False
+
+    def feed(self, data):
+        '''Feed data to this compressor
+
+        Args:
+            ``data`` (``bytes``): The next piece of the data to compress
+
+        Returns:
+            ``bytes``: The compressed groups that became final
+        '''
+        if self.finished:
+            raise ValueError(ERROR_COMPRESSOR_FINISHED)
+        drop = min(self.pos, self.inserted) - WINDOW_SIZE - self.base # only keep the sliding window
+        if drop > 0:
+            self.buf = self.buf[drop:] + data; self.base += drop
+        else:
+            self.buf += data
+        return self._compress(False)
+
+    def flush(self):
+        '''Finish compressing
+
+        Returns:
+            ``bytes``: The remaining compressed groups
+        '''
+        out = self._compress(True); self.finished = True
+        return out
+
+    def _compress(self, final):
+        '''Compress as much of the buffered data as possible (all of it if ``final``), and return the completed groups'''
+        buf = self.buf; base = self.base; end = base + len(buf); matcher = self.matcher; lazy = self.lazy
+        pos = self.pos; inserted = self.inserted; next_match = self.next_match
+        chunk = self.chunk; flags = self.flags; bit = self.bit
+        if final:
+            stop = end
+        else:
+            stop = end - MAX_REF_LEN # need MAX_REF_LEN bytes after the next position for lazy matching
+        if self.merge_chunks:
+            output = bytearray()
+        else:
+            output = list()
+        while pos < stop:
+            while inserted < pos:
+                matcher.insert(buf, inserted, base); inserted += 1
+            if next_match is not None and next_match[0] == pos:
+                match = next_match[1]
+            else:
+                match = matcher.find(buf, pos, end, base)
+            next_match = None
+            if lazy and match is not None and match[1] < MAX_REF_LEN:
+                matcher.insert(buf, pos, base); inserted += 1
+                next_match = (pos+1, matcher.find(buf, pos+1, end, base))
+                if next_match[1] is not None and next_match[1][1] > match[1]+1:
+                    match = None # defer: a longer match starts at the next position
+            if match is None:
+                chunk.append(buf[pos-base]); flags |= (1 << bit); length = 1
+            else:
+                match_pos, length = match; offset = (match_pos + WINDOW_SIZE - 2*MAX_REF_LEN) & WINDOW_MASK
+                chunk.append(offset & 0xFF); chunk.append(((offset >> 4) & 0xF0) | (length-MIN_REF_LEN))
+            pos += length; bit += 1
+            if bit == BITS_PER_BYTE or (final and pos >= stop): # group complete: add flags and add to output
+                self._add_group(output, pos, flags, chunk)
+                chunk = bytearray(); flags = 0; bit = 0
+        if final and bit != 0: # data ended in the previous call
+            self._add_group(output, pos, flags, chunk)
+            chunk = bytearray(); flags = 0; bit = 0
+        self.pos = pos; self.inserted = inserted; self.next_match = next_match
+        self.chunk = chunk; self.flags = flags; self.bit = bit
+        return output
+
+    def _add_group(self, output, pos, flags, chunk):
+        '''Add a complete group (ending at uncompressed position ``pos``) to ``output``'''
+        group = bytes([flags]) + chunk; self.size += len(group)
+        if self.merge_chunks:
+            output += group
+        else:
+            output.append((pos-MAX_REF_LEN, group))
+
+def compress_lzss_fast(data, include_header=True, merge_chunks=True, lazy=False, max_chain=WINDOW_SIZE):
+    '''
+    Compress binary data to LZSS format using a hash-chain match finder (much faster than ``compress_lzss``, with the same or better compression ratio)
+
+    Args:
+        ``data`` (``bytes``): The data to compress
+
+        ``include_header`` (``bool``): ``True`` to include the 4-byte header (the compressed data size), otherwise ``False``
+
+        ``merge_chunks`` (``bool``): ``True`` to merge the individul compressed chunks into a single ``bytes`` object, otherwise ``False`` to return a ``list`` of (uncompressed_offset_end, compressed_data) ``tuple`` objects
+
+        ``lazy`` (``bool``): ``True`` to use lazy matching (emit a literal if the next position has a match at least 2 bytes longer), otherwise ``False`` to use greedy matching (the default: lazy matching is usually, but not always, smaller than greedy matching and the reference compressor)
+
+        ``max_chain`` (``int``): The maximum number of candidate positions to check per search
+
+    Returns:
+        ``bytes``: The LZSS-compressed data
+    '''
+    if isinstance(data,str): # if filename instead of bytes, read bytes
+        with open(data,'rb') as f:
+            data = f.read()
+    elif not isinstance(data, bytes) and not isinstance(data, bytearray):
+        raise TypeError(ERROR_NOT_FILENAME_OR_BYTES)
+    compressor = LZSSCompressor(merge_chunks=merge_chunks, lazy=lazy, max_chain=max_chain)
+    output = compressor.feed(bytes(data)); output += compressor.flush()
+    if include_header:
+        header = pack('I', compressor.size)
+        if merge_chunks:
+            output = header + output
+        else:
+            output = [header] + output
+    return output
+
+def compress_lzss_stream(data, outfile, include_header=True, lazy=False, max_chain=WINDOW_SIZE, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    '''
+    Compress data to LZSS format, writing the compressed groups to ``outfile`` as soon as they are final. If ``include_header`` is ``True``, the 4-byte header is back-patched if ``outfile`` is seekable, otherwise the data is compressed twice (once to compute the header), which requires ``data`` to be re-readable
+
+    Args:
+        ``data`` (``bytes``, ``str``, ``list`` of ``bytes``, or file object): The data to compress (bytes, filename, list of pieces, or readable binary stream)
+
+        ``outfile`` (``str`` or file object): The output filename or writable binary stream
+
+        ``include_header`` (``bool``): ``True`` to include the 4-byte header (the compressed data size), otherwise ``False``
+
+        ``lazy`` (``bool``): ``True`` to use lazy matching, otherwise ``False`` to use greedy matching
+
+        ``max_chain`` (``int``): The maximum number of candidate positions to check per search
+
+        ``chunk_size`` (``int``): The number of bytes to read from ``data`` at a time (if it is a stream)
+
+    Returns:
+        ``int``: The number of bytes written (including the header)
+    '''
+    if isinstance(outfile,str):
+        with open(outfile,'wb') as f:
+            return compress_lzss_stream(data, f, include_header=include_header, lazy=lazy, max_chain=max_chain, chunk_size=chunk_size)
+    if isinstance(data,str): # if filename instead of bytes, open it
+        with open(data,'rb') as f:
+            return compress_lzss_stream(f, outfile, include_header=include_header, lazy=lazy, max_chain=max_chain, chunk_size=chunk_size)
+    if isinstance(data,bytes) or isinstance(data,bytearray):
+        data = [data]
+    if isinstance(data,list):
+        rereadable = True
+        def pieces():
+            return iter(data)
+    elif hasattr(data,'read'):
+        rereadable = data.seekable(); start = data.tell() if rereadable else None
+        def pieces():
+            if start is not None:
+                data.seek(start)
+            while True:
+                piece = data.read(chunk_size)
+                if len(piece) == 0:
+                    break
+                yield piece
+    else:
+        raise TypeError(ERROR_NOT_FILENAME_BYTES_OR_STREAM)
+
+    # write header (placeholder if it can be back-patched, otherwise compute it with a first pass)
+    header_pos = None
+    if include_header:
+        if outfile.seekable():
+            header_pos = outfile.tell(); outfile.write(pack('I', 0))
+        elif rereadable:
+            compressor = LZSSCompressor(lazy=lazy, max_chain=max_chain)
+            for piece in pieces():
+                compressor.feed(piece)
+            compressor.flush(); outfile.write(pack('I', compressor.size))
+        else:
+            raise ValueError(ERROR_NOT_SEEKABLE)
+
+    # compress and write data
+    compressor = LZSSCompressor(lazy=lazy, max_chain=max_chain)
+    for piece in pieces():
+        outfile.write(compressor.feed(piece))
+    outfile.write(compressor.flush())
+    if header_pos is not None:
+        end_pos = outfile.tell(); outfile.seek(header_pos); outfile.write(pack('I', compressor.size)); outfile.seek(end_pos)
+    if include_header:
+        return compressor.size + SIZE['HEADER']
+    return compressor.size
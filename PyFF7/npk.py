@@ -4,7 +4,9 @@ Functions and classes for handling NPK archives
 Niema Moshiri 2019
 '''
 from . import NULL_BYTE,NULL_STR
-from .lzss import compress_lzss,decompress_lzss
+from .lzss import DEFAULT_STREAM_CHUNK_SIZE,LZSSCompressor,LZSSDecompressor,compress_lzss_fast,decompress_lzss_fast
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from struct import pack,unpack
 
 # size of various items in an NPK archive (in bytes)
@@ -26,36 +28,201 @@ START = {
 # error messages
 ERROR_INVALID_NPK_FILE = "Invalid NPK file"
 
+def iter_npk_files(npk):
+    '''Iterate over the files contained in an NPK archive, reading (and decompressing) one block at a time
+
+    Args:
+        ``npk`` (``str`` or file object): The filename (or readable binary stream) of the NPK archive
+
+    Returns:
+        ``generator`` of ``bytes``: The decompressed data of each file in the NPK archive
+    '''
+    if isinstance(npk,str):
+        with open(npk,'rb') as f:
+            yield from iter_npk_files(f)
+        return
+    curr_file = bytearray(); curr_size = 0; decompressor = LZSSDecompressor(includes_header=False) # the data's LZSS-compressed, minus the file header (4-byte integer denoting its compressed size)
+    while True:
+        block = npk.read(SIZE['BLOCK'])
+        if len(block) == 0:
+            break
+        num_subblocks = unpack('I', block[START['BLOCK_NUM-SUBBLOCKS'] : START['BLOCK_NUM-SUBBLOCKS']+SIZE['BLOCK_NUM-SUBBLOCKS']])[0]
+        size_compressed = unpack('H', block[START['BLOCK_SIZE-COMPRESSED'] : START['BLOCK_SIZE-COMPRESSED']+SIZE['BLOCK_SIZE-COMPRESSED']])[0]
+        if num_subblocks != 0:
+            block_data = block[START['BLOCK_DATA'] : size_compressed]; curr_size += len(block_data)
+            curr_file += decompressor.feed(block_data)
+        if num_subblocks <= 1 and curr_size != 0:
+            curr_file += decompressor.flush()
+            yield curr_file
+            curr_file = bytearray(); curr_size = 0; decompressor = LZSSDecompressor(includes_header=False)
+
+def index_npk(npk):
+    '''Index the files contained in an NPK archive by scanning only the block headers (no data is decompressed)
+
+    Args:
+        ``npk`` (``str`` or file object): The filename (or readable binary stream) of the NPK archive
+
+    Returns:
+        ``list`` of ``dict``: The ``first_block``, ``num_blocks``, ``size_compressed``, and ``size_decompressed`` of each file (sizes exclude the block headers)
+    '''
+    if isinstance(npk,str):
+        with open(npk,'rb') as f:
+            return index_npk(f)
+    index = list(); curr = None; block_num = 0
+    while True:
+        npk.seek(block_num*SIZE['BLOCK'])
+        header = npk.read(START['BLOCK_DATA'])
+        if len(header) == 0:
+            break
+        num_subblocks, size_compressed, size_decompressed = unpack('IHH', header)
+        if num_subblocks != 0:
+            if curr is None:
+                curr = {'first_block':block_num, 'num_blocks':0, 'size_compressed':0, 'size_decompressed':0}
+            curr['num_blocks'] += 1; curr['size_compressed'] += max(size_compressed-START['BLOCK_DATA'],0); curr['size_decompressed'] += size_decompressed
+        if num_subblocks <= 1 and curr is not None:
+            if curr['size_compressed'] != 0:
+                index.append(curr)
+            curr = None
+        block_num += 1
+    return index
+
+def decompress_npk_file(npk_filename, first_block, num_blocks, size_decompressed=None):
+    '''Decompress a single file from an NPK archive
+
+    Args:
+        ``npk_filename`` (``str``): The filename of the NPK archive
+
+        ``first_block`` (``int``): The index of the first block of the file
+
+        ``num_blocks`` (``int``): The number of blocks of the file
+
+        ``size_decompressed`` (``int``): The size of the decompressed file (if known), used to preallocate the output
+
+    Returns:
+        ``bytes``: The decompressed file
+    '''
+    with open(npk_filename,'rb') as f:
+        f.seek(first_block*SIZE['BLOCK']); blocks = f.read(num_blocks*SIZE['BLOCK'])
+    curr_file = bytearray() # the data's LZSS-compressed, minus the file header (4-byte integer denoting its compressed size)
+    for block_start in range(0, len(blocks), SIZE['BLOCK']):
+        size_compressed = unpack('H', blocks[block_start+START['BLOCK_SIZE-COMPRESSED'] : block_start+START['BLOCK_SIZE-COMPRESSED']+SIZE['BLOCK_SIZE-COMPRESSED']])[0]
+        curr_file += blocks[block_start+START['BLOCK_DATA'] : block_start+size_compressed]
+    return decompress_lzss_fast(curr_file, includes_header=False, size_hint=size_decompressed)
+
 class NPK:
-    '''NPK archive class'''
+    '''NPK archive class (files are indexed when opened, and decompressed on demand)'''
     def __init__(self, filename):
         '''``NPK`` constructor
 
         Args:
             ``filename`` (``str``): The filename of the NPK archive
         '''
-        self.files = list()
-        f = open(filename,'rb'); data = f.read(); f.close(); block_start = 0; curr_file = bytearray()
-        while block_start < len(data):
-            block = data[block_start:block_start+SIZE['BLOCK']]; block_start += SIZE['BLOCK']
-            num_subblocks = unpack('I', block[START['BLOCK_NUM-SUBBLOCKS'] : START['BLOCK_NUM-SUBBLOCKS']+SIZE['BLOCK_NUM-SUBBLOCKS']])[0]
-            size_compressed = unpack('H', block[START['BLOCK_SIZE-COMPRESSED'] : START['BLOCK_SIZE-COMPRESSED']+SIZE['BLOCK_SIZE-COMPRESSED']])[0]
-            size_decompressed = unpack('H', block[START['BLOCK_SIZE-DECOMPRESSED'] : START['BLOCK_SIZE-DECOMPRESSED']+SIZE['BLOCK_SIZE-DECOMPRESSED']])[0]
-            if num_subblocks != 0:
-                curr_file += block[START['BLOCK_DATA'] : size_compressed]
-            if num_subblocks <= 1 and len(curr_file) != 0:
-                curr_file = pack('I', len(curr_file)) + curr_file # the data's LZSS-compressed, minus the file header (4-byte integer denoting its compressed size)
-                self.files.append(decompress_lzss(curr_file))
-                curr_file = bytearray()
+        self.filename = filename; self.index = index_npk(filename); self._files = None
 
     def __len__(self):
-        return len(self.files)
+        return len(self.index) if self._files is None else len(self._files)
+
+    def __getitem__(self, i):
+        '''Decompress the ``i``-th file in this NPK archive (or return it from ``files`` if it was already decompressed)
+
+        Args:
+            ``i`` (``int``): The index of the file
+
+        Returns:
+            ``bytes``: The decompressed file
+        '''
+        if self._files is not None:
+            return self._files[i]
+        entry = self.index[i]
+        return decompress_npk_file(self.filename, entry['first_block'], entry['num_blocks'], entry['size_decompressed'])
 
     def __iter__(self):
-        for f in self.files:
-            yield f
+        '''Iterate over the decompressed files in this NPK archive (the ones in ``files`` if they were already decompressed, otherwise reading the archive once from start to end, see ``iter_npk_files``)'''
+        if self._files is not None:
+            return iter(self._files)
+        return iter_npk_files(self.filename)
+
+    @property
+    def files(self):
+        '''All decompressed files in this NPK archive (decompressed on first access, and kept in memory afterwards)'''
+        if self._files is None:
+            self._files = self.extract_all()
+        return self._files
+
+    @files.setter
+    def files(self, files):
+        self._files = files
+
+    def extract_all(self, workers=1):
+        '''Decompress all files in this NPK archive, optionally in parallel
+
+        Args:
+            ``workers`` (``int``): The number of worker processes (1 = decompress in this process)
+
+        Returns:
+            ``list`` of ``bytes``: The decompressed files
+        '''
+        if workers <= 1: # single pass over the archive
+            return list(iter_npk_files(self.filename))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(decompress_npk_file, repeat(self.filename), (e['first_block'] for e in self.index), (e['num_blocks'] for e in self.index), (e['size_decompressed'] for e in self.index)))
+
+def compress_npk_member(disk_path):
+    '''LZSS-compress a single file to be packed into an NPK archive (run by each worker of ``pack_npk``)
+
+    Args:
+        ``disk_path`` (``str``): The file to compress
+
+    Returns:
+        ``list`` of ``tuple``: The (uncompressed_offset_end, compressed_data) tuples of the compressed groups
+    '''
+    with open(disk_path, 'rb') as curr_f:
+        return compress_lzss_fast(curr_f.read(), include_header=False, merge_chunks=False)
+
+def iter_npk_member_chunks(disk_path):
+    '''Compress a single file to be packed into an NPK archive incrementally, yielding its compressed groups as they become final
+
+    Args:
+        ``disk_path`` (``str``): The file to compress
+
+    Returns:
+        ``generator`` of ``tuple``: The (uncompressed_offset_end, compressed_data) tuples of the compressed groups
+    '''
+    compressor = LZSSCompressor(merge_chunks=False)
+    with open(disk_path, 'rb') as curr_f:
+        while True:
+            curr_data = curr_f.read(DEFAULT_STREAM_CHUNK_SIZE)
+            if len(curr_data) == 0:
+                break
+            yield from compressor.feed(curr_data)
+    yield from compressor.flush()
+
+def write_npk_member(npk_f, lzss_chunks):
+    '''Write the compressed groups of a single file into 1024-byte NPK blocks (keeping running totals of the block sizes), and back-patch the number of remaining sub-blocks of each block once the file is done
+
+    Args:
+        ``npk_f`` (file object): The NPK archive being written (must be seekable)
+
+        ``lzss_chunks`` (iterable of ``tuple``): The (uncompressed_offset_end, compressed_data) tuples of the file's compressed groups
 
-def pack_npk(files, npk_filename):
+    Returns:
+        ``int``: The number of blocks written
+    '''
+    block_starts = list(); block = list(); size_compressed = 0; size_decompressed = 0; prev_offset = 0 # current block is list of compressed chunks
+    for uncomp_offset, comp_chunk in lzss_chunks:
+        if size_compressed + len(comp_chunk) > SIZE['BLOCK'] - START['BLOCK_DATA']:
+            block_starts.append(npk_f.tell()); write_npk_block(npk_f, block, size_compressed, size_decompressed)
+            block = list(); size_compressed = 0; size_decompressed = 0
+        block.append(comp_chunk); size_compressed += len(comp_chunk); size_decompressed += uncomp_offset-prev_offset; prev_offset = uncomp_offset
+    block_starts.append(npk_f.tell()); write_npk_block(npk_f, block, size_compressed, size_decompressed)
+
+    # back-patch the number of remaining sub-blocks (only known once the whole file is compressed)
+    for npk_block_ind, block_start in enumerate(block_starts):
+        npk_f.seek(block_start + START['BLOCK_NUM-SUBBLOCKS']); npk_f.write(pack('I', len(block_starts)-npk_block_ind))
+    npk_f.seek(0, 2)
+    return len(block_starts)
+
+def pack_npk(files, npk_filename, workers=1, progress=None):
     '''
     Pack the files in ``files`` into an NPK archive ``npk_filename``
 
@@ -63,30 +230,44 @@ def pack_npk(files, npk_filename):
         ``files`` (iterable of ``str``): The filenames to pack
 
         ``npk_filename`` (``str``): The filename to write the packed NPK archive
+
+        ``workers`` (``int``): The number of worker processes to compress the files (1 = compress each file incrementally in this process)
+
+        ``progress`` (``function``): A function called as ``progress(num_done, num_files, disk_path)`` after each file is written
     '''
     files = list(files)
     with open(npk_filename, 'wb') as npk_f:
-        for file_num, disk_path in enumerate(files):
-            print("Compressing file %d of %d..." % (file_num+1, len(files)))
-            with open(disk_path, 'rb') as curr_f:
-                curr_data = curr_f.read()
-            lzss_chunks = compress_lzss(curr_data, include_header=False, merge_chunks=False)
-            npk_blocks = [list()] # list of blocks (each block is list of (uncomp_size, lzss_chunk) tuples)
-            for chunk_ind in range(len(lzss_chunks)):
-                uncomp_offset, comp_chunk = lzss_chunks[chunk_ind]
-                if chunk_ind == 0:
-                    uncomp_size = uncomp_offset
-                else:
-                    uncomp_size = uncomp_offset - lzss_chunks[chunk_ind-1][0]
-                if sum(len(lc) for us, lc in npk_blocks[-1]) + len(comp_chunk) > 1016:
-                    npk_blocks.append(list())
-                npk_blocks[-1].append((uncomp_size, comp_chunk))
-            for npk_block_ind, npk_block in enumerate(npk_blocks):
-                written = 0
-                written += npk_f.write(pack('I', len(npk_blocks)-npk_block_ind))
-                written += npk_f.write(pack('H', START['BLOCK_DATA'] + sum(len(lc) for us, lc in npk_block)))
-                written += npk_f.write(pack('H', sum(us for us, lc in npk_block)))
-                for us, lc in npk_block:
-                    written += npk_f.write(lc)
-                while written < 1024:
-                    written += npk_f.write(b'\00')
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for file_num, (disk_path, lzss_chunks) in enumerate(zip(files, executor.map(compress_npk_member, files))):
+                    write_npk_member(npk_f, lzss_chunks)
+                    if progress is not None:
+                        progress(file_num+1, len(files), disk_path)
+        else:
+            for file_num, disk_path in enumerate(files):
+                write_npk_member(npk_f, iter_npk_member_chunks(disk_path))
+                if progress is not None:
+                    progress(file_num+1, len(files), disk_path)
+
+def write_npk_block(npk_f, block, size_compressed, size_decompressed, num_subblocks=0):
+    '''
+    Write a single NPK block
+
+    Args:
+        ``npk_f`` (file object): The NPK archive being written
+
+        ``block`` (``list`` of ``bytes``): The compressed chunks in this block
+
+        ``size_compressed`` (``int``): The total size of the compressed chunks in this block
+
+        ``size_decompressed`` (``int``): The total size of the decompressed data in this block
+
+        ``num_subblocks`` (``int``): The number of sub-blocks remaining in the current file (including this one)
+    '''
+    written = 0
+    written += npk_f.write(pack('I', num_subblocks))
+    written += npk_f.write(pack('H', START['BLOCK_DATA'] + size_compressed))
+    written += npk_f.write(pack('H', size_decompressed))
+    for lc in block:
+        written += npk_f.write(lc)
+    npk_f.write(NULL_BYTE*(SIZE['BLOCK']-written))
@@ -3,11 +3,26 @@
 Functions and classes for handling TEX files
 Niema Moshiri 2019
 '''
-from . import BYTES_TO_FORMAT,NULL_BYTE
+from . import BYTES_TO_FORMAT,NULL_BYTE,NULL_STR
 from .field import color_to_rgba as two_byte_color_to_rgba
 from .field import color_convert_bit
+from .lgp import LGP
+from .lgp import SIZE as LGP_SIZE
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from hashlib import sha1
+from io import BytesIO
+from itertools import repeat
+from json import dump,load
+from os import makedirs,replace,walk
+from os.path import abspath,commonpath,dirname,getmtime,isdir,isfile,join,relpath,splitext
 from PIL import Image
-from struct import pack,unpack
+from struct import iter_unpack,pack,unpack
+from time import time
+try:
+    import numpy as np; HAS_NUMPY = True
+except ImportError: # fall back to the (much slower) pure-Python pixel loop
+    HAS_NUMPY = False
 
 # size of various items in an TEX file (in bytes)
 SIZE = {
@@ -85,86 +100,307 @@ SIZE = {
 }
 SIZE['HEADER'] = sum(SIZE[k] for k in SIZE if k.startswith('HEADER_')) # 108
 
+# header fields in file order (Header, Pixel Format, and Header 2, whose last field only exists in TEX version 2)
+HEADER_FIELDS = [k for k in SIZE if '_' in k and k.split('_')[0] in {'HEADER','PIXEL-FORMAT','HEADER-2'}]
+START = {k:sum(SIZE[f] for f in HEADER_FIELDS[:i]) for i,k in enumerate(HEADER_FIELDS)}
+START['PALETTE'] = {1: START['HEADER-2_UNKNOWN11'], 2: START['HEADER-2_UNKNOWN11'] + SIZE['HEADER-2_UNKNOWN11']} # 236 (version 1) or 240 (version 2)
+
 # other defaults
 DEFAULT_VERSION = 1
+MAX_PALETTE_COLORS = 256 # most colors that can be indexed with 1 byte per pixel
+DEFAULT_IMAGE_EXTENSION = 'png'
+IMAGE_EXTENSIONS = {'.bmp', '.gif', '.jpeg', '.jpg', '.png', '.tga', '.tif', '.tiff'} # images converted to TEX files in batch mode
+BATCH_MANIFEST_FILENAME = 'tex_manifest.json' # input hashes of a batch conversion (written in the output directory)
+BATCH_CHUNKS_PER_WORKER = 4 # number of chunks of files per worker in batch conversion
 
 # error messages
 ERROR_INVALID_TEX_FILE = "Invalid TEX file"
 
+def parse_tex_header(data):
+    '''Parse the header of a TEX file (without touching the palette or pixel data)
+
+    Args:
+        ``data`` (``bytes``): The input TEX file (or at least its first 240 bytes)
+
+    Returns:
+        ``dict``: The header fields (keys are the ``SIZE`` keys of the Header, Pixel Format, and Header 2 fields)
+    '''
+    version = unpack('I', data[0:0+SIZE['HEADER_VERSION']])[0]
+    if version not in {1,2}:
+        raise ValueError("Invalid version number: %d" % version)
+    fields = [k for k in HEADER_FIELDS if version == 2 or k != 'HEADER-2_UNKNOWN11']
+    if len(data) < START['PALETTE'][version]:
+        raise ValueError(ERROR_INVALID_TEX_FILE)
+    return {k:v for k,v in zip(fields, unpack('%dI' % len(fields), data[:START['PALETTE'][version]]))}
+
+def read_tex_header(filename):
+    '''Read the header of a TEX file from disk (only the header bytes are read)
+
+    Args:
+        ``filename`` (``str``): The TEX file
+
+    Returns:
+        ``dict``: The header fields (see ``parse_tex_header``)
+    '''
+    with open(filename,'rb') as f:
+        return parse_tex_header(f.read(START['PALETTE'][2]))
+
+def is_paletted(header):
+    '''Check if a TEX file's pixels are palette indices (rather than direct colors)
+
+    Args:
+        ``header`` (``dict``): The TEX header (see ``parse_tex_header``)
+
+    Returns:
+        ``bool``: ``True`` if the pixels are palette indices, otherwise ``False``
+    '''
+    return header['HEADER_PALETTE-FLAG'] == 1 and header['HEADER_NUM-PALETTES'] != 0
+
+def decode_tex_indices(data, header):
+    '''Read the palettes and (unexpanded) palette indices of a paletted TEX file
+
+    Args:
+        ``data`` (``bytes``): The input TEX file
+
+        ``header`` (``dict``): The TEX header (see ``parse_tex_header``)
+
+    Returns:
+        ``numpy.ndarray``: The palette indices (shape: height x width), or a flat typed ``memoryview`` without NumPy
+
+        ``numpy.ndarray``: The RGBA palettes (shape: palettes x colors x 4), or a ``list`` of ``list`` of RGBA ``tuple`` without NumPy
+    '''
+    width = header['HEADER_IMAGE-WIDTH']; height = header['HEADER_IMAGE-HEIGHT']; bytes_per_pixel = header['HEADER_BYTES-PER-PIXEL']
+    num_palettes = header['HEADER_NUM-PALETTES']; num_colors_per_palette = header['HEADER_NUM-COLORS-PER-PALETTE']
+    ind = START['PALETTE'][header['HEADER_VERSION']]; pal_len = num_palettes*num_colors_per_palette
+    ind_end = ind + 4*pal_len
+    if HAS_NUMPY:
+        palettes = np.frombuffer(data, dtype=np.uint8, count=4*pal_len, offset=ind).reshape(num_palettes, num_colors_per_palette, 4)
+        indices = np.frombuffer(data, dtype=BYTES_TO_FORMAT[bytes_per_pixel], count=width*height, offset=ind_end).reshape(height, width)
+        return indices, palettes[:,:,[2,1,0,3]] # stored as BGRA, but saved as RGBA
+    colors = [(r,g,b,a) for b,g,r,a in iter_unpack('BBBB', data[ind:ind_end])]
+    palettes = [colors[i:i+num_colors_per_palette] for i in range(0, pal_len, num_colors_per_palette)]
+    indices = memoryview(bytes(data[ind_end:ind_end+width*height*bytes_per_pixel])).cast(BYTES_TO_FORMAT[bytes_per_pixel])
+    return indices, palettes
+
+def decode_tex_direct(data, header):
+    '''Decode the pixels of a non-paletted TEX file into a Pillow image using NumPy
+
+    Args:
+        ``data`` (``bytes``): The input TEX file
+
+        ``header`` (``dict``): The TEX header (see ``parse_tex_header``)
+
+    Returns:
+        ``Image``: The RGBA image, or ``None`` if the pixel format is not supported by this path
+    '''
+    width = header['HEADER_IMAGE-WIDTH']; height = header['HEADER_IMAGE-HEIGHT']; bytes_per_pixel = header['HEADER_BYTES-PER-PIXEL']
+    ind = START['PALETTE'][header['HEADER_VERSION']]; num_pixels = width*height
+    if bytes_per_pixel == 2: # ABBBBBGG GGGRRRRR, with colors scaled from 5 to 8 bits and all non-zero pixels opaque
+        colors = np.frombuffer(data, dtype='H', count=num_pixels, offset=ind)
+        pixels = np.empty((num_pixels,4), dtype=np.uint8)
+        for i,shift in enumerate([0,5,10]):
+            pixels[:,i] = ((colors >> shift) & 0b11111) * 255 // 31
+        pixels[:,3] = np.where(colors == 0, 0, 255)
+    elif bytes_per_pixel == 4: # BGRA
+        pixels = np.frombuffer(data, dtype=np.uint8, count=4*num_pixels, offset=ind).reshape(num_pixels, 4)[:,[2,1,0,3]]
+    else:
+        return None
+    return Image.frombuffer('RGBA', (width,height), np.ascontiguousarray(pixels), 'raw', 'RGBA', 0, 1)
+
+def decode_tex_images_slow(data, header):
+    '''Decode all images of a TEX file pixel by pixel (used when NumPy is not available)
+
+    Args:
+        ``data`` (``bytes``): The input TEX file
+
+        ``header`` (``dict``): The TEX header (see ``parse_tex_header``)
+
+    Returns:
+        ``list`` of ``Image``: One RGBA image per palette (or a single image if not paletted)
+    '''
+    num_palettes = header['HEADER_NUM-PALETTES']; num_colors_per_palette = header['HEADER_NUM-COLORS-PER-PALETTE']
+    width = header['HEADER_IMAGE-WIDTH']; height = header['HEADER_IMAGE-HEIGHT']; bytes_per_pixel = header['HEADER_BYTES-PER-PIXEL']
+
+    # read palette data
+    palette = list(); ind = START['PALETTE'][header['HEADER_VERSION']]
+    if header['HEADER_PALETTE-FLAG'] == 1:
+        for _ in range(num_palettes):
+            palette.append(list())
+            for __ in range(num_colors_per_palette):
+                curr_blue = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_BLUE']])[0]; ind += SIZE['PALETTE-ENTRY_BLUE']
+                curr_green = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_GREEN']])[0]; ind += SIZE['PALETTE-ENTRY_GREEN']
+                curr_red = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_RED']])[0]; ind += SIZE['PALETTE-ENTRY_RED']
+                curr_alpha = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_ALPHA']])[0]; ind += SIZE['PALETTE-ENTRY_ALPHA']
+                palette[-1].append(tuple([curr_red, curr_green, curr_blue, curr_alpha])) # I read them as BGRA, but I like saving them as RGBA
+
+    # read pixel data
+    if len(palette) == 0:
+        images = [Image.new('RGBA', (width,height))]
+    else:
+        images = [Image.new('RGBA', (width,height)) for _ in range(num_palettes)]
+    bpp_over_4 = int(bytes_per_pixel/4) # for use with Pixel Format Specification
+    for y in range(height):
+        for x in range(width):
+            if len(palette) == 0:
+                if bytes_per_pixel == 2:
+                    tmp = color_convert_bit(two_byte_color_to_rgba(unpack('H', data[ind:ind+2])[0]), 5, 8); ind += 2
+                    if tuple(tmp) == (0,0,0,0):
+                        alpha = 0
+                    else:
+                        alpha = 255 # [255,0][tmp[3]] # just forcing no transparency for now
+                    color = (tmp[0], tmp[1], tmp[2], alpha)
+                else:
+                    cp = list()
+                    for _ in range(4): # BGRA format
+                        cp.append(unpack(BYTES_TO_FORMAT[bpp_over_4], data[ind:ind+bpp_over_4])[0]); ind += bpp_over_4
+                    color = (cp[2], cp[1], cp[0], cp[3])
+                images[0].putpixel((x,y), color)
+            else:
+                val = unpack(BYTES_TO_FORMAT[bytes_per_pixel], data[ind:ind+bytes_per_pixel])[0]; ind += bytes_per_pixel
+                for pal_num in range(num_palettes):
+                    images[pal_num].putpixel((x,y), palette[pal_num][val])
+    return images
+
+def quantize_image(img, max_colors=MAX_PALETTE_COLORS):
+    '''Reduce an image to at most ``max_colors`` RGBA colors (keeping alpha) using Pillow's fast octree quantizer
+
+    Args:
+        ``img`` (``Image``): The image to quantize
+
+        ``max_colors`` (``int``): The maximum number of colors in the resulting image
+
+    Returns:
+        ``Image``: The quantized RGBA image
+    '''
+    return img.convert('RGBA').quantize(colors=max_colors, method=Image.FASTOCTREE).convert('RGBA')
+
+def encode_tex_pixels(img, bmp_mode=False):
+    '''Encode the pixels of an RGBA image as TEX image data
+
+    Args:
+        ``img`` (``Image``): The RGBA image to encode
+
+        ``bmp_mode`` (``bool``): Encode BGRA pixels directly instead of a palette followed by palette indices
+
+    Returns:
+        ``int``: The number of palette colors (0 in BMP mode)
+
+        ``int``: The number of bytes per pixel
+
+        ``int``: The Color Key Flag (1 if the image has any non-opaque pixels or in BMP mode, otherwise 0)
+
+        ``bytes``: The image data (palette and palette indices, or BGRA pixels)
+    '''
+    if HAS_NUMPY:
+        rgba = np.asarray(img, dtype=np.uint8).reshape(-1, 4)
+        if bmp_mode:
+            return 0, 4, 1, rgba[:,[2,1,0,3]].tobytes()
+        colors, indices = np.unique(rgba.view(np.uint32).ravel(), return_inverse=True)
+        pal = colors.view(np.uint8).reshape(-1, 4); pal_len = len(pal)
+        bytes_per_pixel = [n for n in sorted(BYTES_TO_FORMAT) if pal_len <= 1 << (8*n)][0]
+        color_key_flag = int(bool((pal[:,3] != 255).any()))
+        return pal_len, bytes_per_pixel, color_key_flag, pal[:,[2,1,0,3]].tobytes() + indices.astype(BYTES_TO_FORMAT[bytes_per_pixel]).tobytes()
+    width, height = img.size; out = bytearray()
+    if bmp_mode:
+        for y in range(height):
+            for x in range(width):
+                r,g,b,a = img.getpixel((x,y))
+                out += pack('BBBB', b, g, r, a)
+        return 0, 4, 1, bytes(out)
+    pal = list(set(img.getdata())); pal_len = len(pal)
+    col_to_ind = {c:i for i,c in enumerate(pal)}
+    bytes_per_pixel = [n for n in sorted(BYTES_TO_FORMAT) if pal_len <= 1 << (8*n)][0]
+    color_key_flag = int(len({a for r,g,b,a in pal}-{255}) != 0)
+    for r,g,b,a in pal:
+        out += pack('BBBB', b, g, r, a)
+    for y in range(height):
+        for x in range(width):
+            out += pack(BYTES_TO_FORMAT[bytes_per_pixel], col_to_ind[img.getpixel((x,y))])
+    return pal_len, bytes_per_pixel, color_key_flag, bytes(out)
+
 class TEX:
     '''TEX file class'''
-    def __init__(self, data):
+    def __init__(self, data, lazy=True):
         '''``TEX`` constructor
 
         Args:
             ``data`` (``bytes``): The input TEX file
+
+            ``lazy`` (``bool``): Only parse the header now, and decode each palette's image on first access
         '''
         # if data is a PIL Image, just create TEX
         typestr = str(type(data)).lstrip("<class '").rstrip("'>")
         if typestr.startswith('PIL.') and 'Image' in typestr:
-            self.images = [data.convert('RGBA')]; return
+            self.data = None; self.header = None; self.indices = None; self._images = [data.convert('RGBA')]; return
 
         # if data is filename, load actual bytes
         if isinstance(data,str): # if filename instead of bytes, read bytes
             with open(data,'rb') as f:
                 data = f.read()
 
-        # parse header
-        version = unpack('I', data[0:0+SIZE['HEADER_VERSION']])[0]
-        if version not in {1,2}:
-            raise ValueError("Invalid version number: %d" % version)
-        num_palettes = unpack('I', data[48:48+SIZE['HEADER_NUM-PALETTES']])[0]
-        num_colors_per_palette = unpack('I', data[52:52+SIZE['HEADER_NUM-COLORS-PER-PALETTE']])[0]
-        width = unpack('I', data[60:60+SIZE['HEADER_IMAGE-WIDTH']])[0]
-        height = unpack('I', data[64:64+SIZE['HEADER_IMAGE-HEIGHT']])[0]
-        palette_flag = unpack('I', data[76:76+SIZE['HEADER_PALETTE-FLAG']])[0]
-        palette_size = unpack('I', data[88:88+SIZE['HEADER_PALETTE-SIZE']])[0]
-        bytes_per_pixel = unpack('I', data[104:104+SIZE['HEADER_BYTES-PER-PIXEL']])[0]
-
-        # read palette data
-        palette = list()
-        if version == 1:
-            ind = 236
-        else: # version 2 (e.g. FF8)
-            ind = 240
-        if palette_flag == 1:
-            for _ in range(num_palettes):
-                palette.append(list())
-                for __ in range(num_colors_per_palette):
-                    curr_blue = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_BLUE']])[0]; ind += SIZE['PALETTE-ENTRY_BLUE']
-                    curr_green = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_GREEN']])[0]; ind += SIZE['PALETTE-ENTRY_GREEN']
-                    curr_red = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_RED']])[0]; ind += SIZE['PALETTE-ENTRY_RED']
-                    curr_alpha = unpack('B', data[ind:ind+SIZE['PALETTE-ENTRY_ALPHA']])[0]; ind += SIZE['PALETTE-ENTRY_ALPHA']
-                    palette[-1].append(tuple([curr_red, curr_green, curr_blue, curr_alpha])) # I read them as BGRA, but I like saving them as RGBA
-
-        # read pixel data
-        if len(palette) == 0:
-            self.images = [Image.new('RGBA', (width,height))]
+        # parse header (palette and pixel data are decoded on demand)
+        self.data = data; self.header = parse_tex_header(data); self.indices = None
+        if is_paletted(self.header):
+            self._images = [None]*self.header['HEADER_NUM-PALETTES']
         else:
-            self.images = [Image.new('RGBA', (width,height)) for _ in range(num_palettes)]
-        bpp_over_4 = int(bytes_per_pixel/4) # for use with Pixel Format Specification
-        for y in range(height):
-            for x in range(width):
-                if len(palette) == 0:
-                    if bytes_per_pixel == 2:
-                        tmp = color_convert_bit(two_byte_color_to_rgba(unpack('H', data[ind:ind+2])[0]), 5, 8); ind += 2
-                        if tuple(tmp) == (0,0,0,0):
-                            alpha = 0
-                        else:
-                            alpha = 255 # [255,0][tmp[3]] # just forcing no transparency for now
-                        color = (tmp[0], tmp[1], tmp[2], alpha)
-                    else:
-                        cp = list()
-                        for _ in range(4): # BGRA format
-                            cp.append(unpack(BYTES_TO_FORMAT[bpp_over_4], data[ind:ind+bpp_over_4])[0]); ind += bpp_over_4
-                        color = (cp[2], cp[1], cp[0], cp[3])
-                    self.images[0].putpixel((x,y), color)
-                else:
-                    val = unpack(BYTES_TO_FORMAT[bytes_per_pixel], data[ind:ind+bytes_per_pixel])[0]; ind += bytes_per_pixel
-                    for pal_num in range(num_palettes):
-                        self.images[pal_num].putpixel((x,y), palette[pal_num][val])
+            self._images = [None]
+        if not lazy:
+            self.get_images()
+
+    @property
+    def images(self):
+        '''``list`` of ``Image``: The image of each palette (decoding any not yet decoded)'''
+        return self.get_images()
 
-    def get_bytes(self, bmp_mode=False, version=DEFAULT_VERSION):
+    @images.setter
+    def images(self, images):
+        self._images = list(images)
+
+    def get_image(self, pal_num=0):
+        '''Get the Pillow image of a single palette of this TEX file (decoded on first access and then cached)
+
+        Args:
+            ``pal_num`` (``int``): The palette number (0 if this TEX file is not paletted)
+
+        Returns:
+            ``Image``: Pillow image object
+        '''
+        if self._images[pal_num] is None:
+            img = None
+            if HAS_NUMPY and is_paletted(self.header) and self.header['HEADER_BYTES-PER-PIXEL'] in BYTES_TO_FORMAT:
+                indices, palettes = self.get_indices()
+                img = Image.frombuffer('RGBA', (self.get_width(),self.get_height()), np.ascontiguousarray(palettes[pal_num][indices]), 'raw', 'RGBA', 0, 1)
+            elif HAS_NUMPY and not is_paletted(self.header):
+                img = decode_tex_direct(self.data, self.header)
+            if img is None:
+                self._images = decode_tex_images_slow(self.data, self.header)
+            else:
+                self._images[pal_num] = img
+        return self._images[pal_num]
+
+    def get_indices(self):
+        '''Get the raw palette indices and palettes of this TEX file without expanding them into RGBA images
+
+        Returns:
+            ``numpy.ndarray``: The palette indices (shape: height x width), or a flat typed ``memoryview`` without NumPy
+
+            ``numpy.ndarray``: The RGBA palettes (shape: palettes x colors x 4), or a ``list`` of ``list`` of RGBA ``tuple`` without NumPy
+        '''
+        if self.header is None or not is_paletted(self.header):
+            raise ValueError("TEX file is not paletted")
+        if self.indices is None:
+            self.indices = decode_tex_indices(self.data, self.header)
+        return self.indices
+
+    def num_palettes(self):
+        '''Return the number of palettes (i.e., images) of this TEX file
+
+        Returns:
+            ``int``: The number of palettes of this TEX file (1 if not paletted)
+        '''
+        return len(self._images)
+
+    def get_bytes(self, bmp_mode=False, version=DEFAULT_VERSION, quantize=False):
         '''Return the bytes encoding this TEX file
 
         Args:
@@ -172,6 +408,8 @@ class TEX:
 
             ``version`` (``int``): 1 for Final Fantasy VII, but some Final Fantasy VIII TEX files have 2
 
+            ``quantize`` (``bool``): Reduce images with more than 256 colors to a 256-color palette (lossy) so that 1-byte palette indices can be used
+
         Returns:
             ``bytes``: The data encoding this TEX file
         '''
@@ -181,21 +419,18 @@ class TEX:
         if version not in {1,2}:
             raise ValueError("Invalid TEX version: %d" % version)
 
-        # BMP mode (larger sizes, but works for all transparency)
+        # quantize images with too many colors for 1-byte palette indices
+        img = self.get_image(0)
+        if quantize and not bmp_mode and img.getcolors(MAX_PALETTE_COLORS) is None:
+            img = quantize_image(img)
+
+        # encode pixels (BMP mode gives larger sizes, but works for all transparency)
+        pal_len, bytes_per_pixel, color_key_flag, pixel_data = encode_tex_pixels(img, bmp_mode=bmp_mode)
         if bmp_mode:
-            bytes_per_pixel = 4; num_pal = 0; pal_len = 0; pal_flag = 0; bits_per_index = 0
+            num_pal = 0; pal_flag = 0; bits_per_index = 0
         else:
-            pal = list(set(self.images[0].getdata())); num_pal = 1; pal_len = len(pal); pal_flag = 1
-            col_to_ind = {c:i for i,c in enumerate(pal)}
-            if pal_len <= 256:
-                bytes_per_pixel = 1; pal_index_format = 'B'
-            elif pal_len <= 65536:
-                bytes_per_pixel = 2; pal_index_format = 'H'
-            else:
-                bytes_per_pixel = 4; pal_index_format = 'I'
-            bits_per_index = 8 * bytes_per_pixel
+            num_pal = 1; pal_flag = 1; bits_per_index = 8 * bytes_per_pixel
         bits_per_pixel = 8 * bytes_per_pixel
-        color_key_flag = int(bmp_mode or len({a for r,g,b,a in pal}-{255}) != 0)
         bytes_per_row = bytes_per_pixel * self.get_width()
 
         # add header
@@ -259,34 +494,14 @@ class TEX:
         if version == 2:
             out += pack('I', 0)              # unknown 11
 
-        # image data (BMP Mode)
-        if bmp_mode:
-            for y in range(self.get_height()):
-                for x in range(self.get_width()):
-                    r,g,b,a = self.images[0].getpixel((x,y))
-                    for v in [b,g,r,a]:
-                        out += pack('B', v)
-
-        # image data (Palette Mode)
-        else:
-            # add palette
-            for r,g,b,a in pal:
-                out += pack('B', b)
-                out += pack('B', g)
-                out += pack('B', r)
-                out += pack('B', a)
-
-            # add pixels
-            for y in range(self.get_height()):
-                for x in range(self.get_width()):
-                    out += pack(pal_index_format, col_to_ind[self.images[0].getpixel((x,y))])
-            
+        # image data (BGRA pixels in BMP Mode, or palette followed by indices in Palette Mode)
+        out += pixel_data
         return out
     
     def __iter__(self):
         '''Iterate over this image's colors'''
-        for img in self.images:
-            yield img
+        for pal_num in range(len(self._images)):
+            yield self.get_image(pal_num)
 
     def get_height(self):
         '''Get the image height of this TEX file
@@ -294,7 +509,9 @@ class TEX:
         Returns:
             ``int``: The image height of this TEX file
         '''
-        return self.images[0].size[1]
+        if self.header is not None:
+            return self.header['HEADER_IMAGE-HEIGHT']
+        return self._images[0].size[1]
 
     def get_width(self):
         '''Get the image width of this TEX file
@@ -302,7 +519,9 @@ class TEX:
         Returns:
             ``int``: The image width of this TEX file
         '''
-        return self.images[0].size[0]
+        if self.header is not None:
+            return self.header['HEADER_IMAGE-WIDTH']
+        return self._images[0].size[0]
 
     def get_images(self):
         '''Get a Pillow image object from this TEX file
@@ -310,7 +529,9 @@ class TEX:
         Returns:
             ``list`` of ``Image``: Pillow image object(s)
         '''
-        return self.images
+        for pal_num in range(len(self._images)):
+            self.get_image(pal_num)
+        return self._images
 
     def show(self):
         '''Show this TEX file's image(s)'''
@@ -335,3 +556,156 @@ class TEX:
         for img in self.images:
             out |= set(img.getdata())
         return out
+
+def get_tex_batch_jobs(source, to_tex=False):
+    '''Find the files to convert in a batch TEX conversion
+
+    Args:
+        ``source`` (``str``): A directory (searched recursively), a glob pattern, or an LGP archive (TEX to image only)
+
+        ``to_tex`` (``bool``): Find images to convert to TEX files (instead of TEX files to convert to images)
+
+    Returns:
+        ``list`` of ``tuple``: The (relative name, source) tuples of the files to convert, where the source is either a filename or a (LGP filename, data start, file size) tuple
+    '''
+    if to_tex:
+        exts = IMAGE_EXTENSIONS
+    else:
+        exts = {'.tex'}
+    if source.lower().endswith('.lgp') and isfile(source):
+        if to_tex:
+            raise ValueError("Images can't be converted to TEX files directly from an LGP archive: %s" % source)
+        jobs = dict() # if a filename appears multiple times, the last one wins (as in unpack_lgp)
+        with LGP(source) as lgp:
+            for entry in lgp:
+                filename = entry['filename']
+                if NULL_STR in filename: # weird characters in filename, so truncate extension
+                    filename = filename[:filename.index('.')+4]
+                if splitext(filename)[1].lower() in exts:
+                    jobs[filename] = (source, entry['data_start']+LGP_SIZE['DATA-ENTRY_HEADER'], entry['filesize'])
+        return sorted(jobs.items())
+    if isdir(source):
+        root = source; filenames = [join(d,f) for d,_,fs in walk(source) for f in fs]
+    else:
+        filenames = [f for f in glob(source, recursive=True) if isfile(f)]
+        if len(filenames) == 0:
+            return list()
+        root = commonpath([dirname(abspath(f)) for f in filenames])
+    return sorted((relpath(abspath(f),abspath(root)), f) for f in filenames if splitext(f)[1].lower() in exts)
+
+def convert_tex_batch_job(name, src, out_dir, to_tex, out_ext, skip, prev_digest, bmp_mode, quantize):
+    '''Convert a single file of a batch TEX conversion (run by each worker of ``convert_tex_batch``)
+
+    Args:
+        ``name`` (``str``): The relative name of the file (also used for the output filename)
+
+        ``src`` (``str`` or ``tuple``): The filename, or the (LGP filename, data start, file size) tuple, of the file
+
+        See ``convert_tex_batch`` for the remaining arguments (``prev_digest`` is the file's hash in the previous manifest, or ``None``)
+
+    Returns:
+        ``str``: The hash of the file and conversion options (``None`` unless ``skip`` is ``'hash'``)
+
+        ``bool``: ``True`` if the file was converted, or ``False`` if it was skipped
+    '''
+    if isinstance(src, str):
+        src_mtime = getmtime(src)
+        with open(src,'rb') as f:
+            data = f.read()
+    else:
+        lgp_filename, start, size = src; src_mtime = getmtime(lgp_filename)
+        with open(lgp_filename,'rb') as f:
+            f.seek(start); data = f.read(size)
+
+    # determine output filename(s): one image per palette is written when converting multi-palette TEX files
+    out_base = join(out_dir, splitext(name)[0])
+    if to_tex:
+        out_filenames = ['%s.tex' % out_base]
+    else:
+        header = parse_tex_header(data)
+        num_images = header['HEADER_NUM-PALETTES'] if is_paletted(header) else 1
+        if num_images == 1:
+            out_filenames = ['%s.%s' % (out_base, out_ext)]
+        else:
+            numlen = len(str(num_images-1))
+            out_filenames = ['%s.pal%s.%s' % (out_base, str(i).zfill(numlen), out_ext) for i in range(num_images)]
+
+    # skip unchanged files
+    digest = None
+    if skip == 'hash':
+        options = (bmp_mode, quantize) if to_tex else (out_ext,) # conversion options that change the output
+        digest = sha1(data + repr(options).encode()).hexdigest()
+    if all(isfile(fn) for fn in out_filenames):
+        if skip == 'mtime' and min(getmtime(fn) for fn in out_filenames) >= src_mtime:
+            return digest, False
+        if skip == 'hash' and digest == prev_digest:
+            return digest, False
+
+    # convert file
+    makedirs(dirname(out_base) or '.', exist_ok=True)
+    if to_tex:
+        with open(out_filenames[0],'wb') as f:
+            f.write(TEX(Image.open(BytesIO(data))).get_bytes(bmp_mode=bmp_mode, quantize=quantize))
+    else:
+        for img, fn in zip(TEX(data).get_images(), out_filenames):
+            img.save(fn)
+    return digest, True
+
+def convert_tex_batch(source, out_dir, to_tex=False, out_ext=DEFAULT_IMAGE_EXTENSION, skip='mtime', workers=1, bmp_mode=False, quantize=False, progress=None):
+    '''Convert every TEX file in a directory, glob pattern, or LGP archive to an image (or every image to a TEX file), optionally in parallel. Each worker process writes its outputs directly to ``out_dir`` (keeping the relative paths of the inputs)
+
+    Args:
+        ``source`` (``str``): A directory (searched recursively), a glob pattern, or an LGP archive (TEX to image only)
+
+        ``out_dir`` (``str``): The output directory (created if it doesn't exist)
+
+        ``to_tex`` (``bool``): Convert images to TEX files (instead of TEX files to images)
+
+        ``out_ext`` (``str``): The file extension (i.e., format) of output images
+
+        ``skip`` (``str``): Skip files whose outputs are up to date, based on ``'mtime'`` (outputs newer than the input) or ``'hash'`` (input hash matches the manifest in ``out_dir``), or ``None`` to convert everything
+
+        ``workers`` (``int``): The number of worker processes (1 = convert in this process)
+
+        ``bmp_mode`` (``bool``): Use BMP mode when creating TEX files (see ``TEX.get_bytes``)
+
+        ``quantize`` (``bool``): Quantize images with more than 256 colors when creating TEX files (see ``TEX.get_bytes``)
+
+        ``progress`` (``function``): A function called as ``progress(num_done, num_files, name)`` after each file is converted or skipped
+
+    Returns:
+        ``dict``: Statistics of the conversion (``num_files``, ``num_converted``, ``num_skipped``, and ``seconds``)
+    '''
+    start_time = time()
+    if skip not in {None, 'mtime', 'hash'}:
+        raise ValueError("Invalid skip mode: %s" % skip)
+    jobs = get_tex_batch_jobs(source, to_tex=to_tex)
+    makedirs(out_dir, exist_ok=True)
+    manifest_filename = join(out_dir, BATCH_MANIFEST_FILENAME); manifest = dict()
+    if skip == 'hash' and isfile(manifest_filename):
+        with open(manifest_filename) as f:
+            manifest = load(f)
+
+    # convert files (results are yielded in order as workers finish them)
+    args = ([name for name,src in jobs], [src for name,src in jobs], repeat(out_dir), repeat(to_tex), repeat(out_ext.lstrip('.')), repeat(skip), [manifest.get(name) for name,src in jobs], repeat(bmp_mode), repeat(quantize))
+    num_converted = 0
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(convert_tex_batch_job, *args, chunksize=max(1, len(jobs)//(workers*BATCH_CHUNKS_PER_WORKER)))
+    else:
+        executor = None; results = map(convert_tex_batch_job, *args)
+    try:
+        for job_num, ((name, src), (digest, converted)) in enumerate(zip(jobs, results)):
+            num_converted += converted
+            if digest is not None:
+                manifest[name] = digest
+            if progress is not None:
+                progress(job_num+1, len(jobs), name)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if skip == 'hash':
+            with open(manifest_filename + '.tmp', 'w') as f:
+                dump(manifest, f)
+            replace(manifest_filename + '.tmp', manifest_filename)
+    return {'num_files': len(jobs), 'num_converted': num_converted, 'num_skipped': len(jobs)-num_converted, 'seconds': time()-start_time}
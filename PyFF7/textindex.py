@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+'''
+Functions and classes for indexing and searching the text of every Field file in an LGP archive (e.g. flevel.lgp)
+Niema Moshiri 2019
+'''
+from .field import FieldFile
+from .lgp import LGP
+from concurrent.futures import ProcessPoolExecutor
+from gzip import open as gzip_open
+from hashlib import sha1
+from json import dump,load
+from os import replace
+from re import compile as re_compile
+from time import time
+
+# constants
+INDEX_VERSION = 1 # version of the on-disk index format
+BATCH_CHUNKS_PER_WORKER = 4 # number of chunks of Field files per worker when indexing
+TOKEN_PATTERN = re_compile(r"\w+") # tokens are runs of letters/digits (lowercased)
+
+def tokenize(text):
+    '''Split text into its (lowercase) tokens
+
+    Args:
+        ``text`` (``str``): The text
+
+    Returns:
+        ``list`` of ``str``: The tokens of the text
+    '''
+    return TOKEN_PATTERN.findall(text.lower())
+
+def decode_strings_job(data):
+    '''Decode the strings of a Field file (run by each worker of ``TextIndex.update``)
+
+    Args:
+        ``data`` (``bytes``): The (possibly LZSS-compressed) data of the Field file
+
+    Returns:
+        ``list`` of ``str``: The strings of the Field file, or ``None`` if it isn't a Field file
+    '''
+    try:
+        return FieldFile(data).field_script.get_strings()
+    except Exception:
+        return None
+
+class TextIndex:
+    '''Text index of the Field files of an LGP archive: field name to strings, and token to (field name, string ID) pairs'''
+    def __init__(self, filename=None):
+        '''``TextIndex`` constructor
+
+        Args:
+            ``filename`` (``str``): The filename of a saved index to load (gzipped JSON), or ``None`` to start empty
+        '''
+        self.fields = dict()  # map each field name to its strings
+        self.digests = dict() # map each file in the archive (Field file or not) to the SHA-1 of its data when it was indexed
+        self.tokens = dict()  # map each token to the set of (field name, string ID) pairs containing it
+        if filename is not None:
+            with gzip_open(filename, 'rt', encoding='utf-8') as f:
+                data = load(f)
+            if data['version'] != INDEX_VERSION:
+                raise ValueError("Unsupported text index version: %s" % data['version'])
+            self.fields = data['fields']; self.digests = data['digests']; names = data['field_names']
+            for token,postings in data['tokens'].items(): # postings are flattened (field number, string ID) pairs
+                self.tokens[token] = {(names[postings[i]], postings[i+1]) for i in range(0, len(postings), 2)}
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def add_field(self, name, strings):
+        '''Add (or replace) the strings of a field
+
+        Args:
+            ``name`` (``str``): The field name
+
+            ``strings`` (``list`` of ``str``): The strings of the field
+        '''
+        if name in self.fields:
+            self.remove_field(name)
+        self.fields[name] = strings
+        for i,s in enumerate(strings):
+            for token in set(tokenize(s)):
+                self.tokens.setdefault(token, set()).add((name,i))
+
+    def remove_field(self, name):
+        '''Remove a field (and its tokens) from this index
+
+        Args:
+            ``name`` (``str``): The field name
+        '''
+        for i,s in enumerate(self.fields.pop(name)):
+            for token in set(tokenize(s)):
+                postings = self.tokens[token]; postings.discard((name,i))
+                if len(postings) == 0:
+                    del self.tokens[token]
+
+    def update(self, lgp_filename, workers=1, progress=None):
+        '''Bring this index up to date with an LGP archive: only files that were added or changed since they were indexed are decoded (optionally in parallel), and files that are no longer in the archive are removed
+
+        Args:
+            ``lgp_filename`` (``str``): The filename of the LGP archive (e.g. flevel.lgp)
+
+            ``workers`` (``int``): The number of worker processes (1 = decode in this process)
+
+            ``progress`` (``function``): A function called as ``progress(num_done, num_total, filename)`` after each decoded file, or ``None``
+
+        Returns:
+            ``dict``: Statistics of the update (``num_files``, ``num_decoded``, ``num_removed``, ``num_fields``, and ``seconds``)
+        '''
+        start_time = time(); jobs = dict() # if a filename appears multiple times, the last one wins (as in unpack_lgp)
+        with LGP(lgp_filename) as lgp:
+            for entry in lgp:
+                data = lgp.load_toc_entry(entry); digest = sha1(data).hexdigest() # only keep the data of new/changed files
+                jobs[entry['filename']] = (digest, bytes(data) if self.digests.get(entry['filename']) != digest else None)
+        removed = [name for name in self.digests if name not in jobs]
+        for name in removed:
+            del self.digests[name]
+            if name in self.fields:
+                self.remove_field(name)
+        jobs = [(name,digest,data) for name,(digest,data) in sorted(jobs.items()) if data is not None]
+
+        # decode the strings of the new/changed files (results are yielded in order as workers finish them)
+        datas = [data for name,digest,data in jobs]
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(decode_strings_job, datas, chunksize=max(1, len(jobs)//(workers*BATCH_CHUNKS_PER_WORKER)))
+        else:
+            executor = None; results = map(decode_strings_job, datas)
+        try:
+            for job_num, ((name,digest,data), strings) in enumerate(zip(jobs, results)):
+                if strings is None:
+                    if name in self.fields:
+                        self.remove_field(name)
+                else:
+                    self.add_field(name, strings)
+                self.digests[name] = digest
+                if progress is not None:
+                    progress(job_num+1, len(jobs), name)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return {'num_files': len(self.digests), 'num_decoded': len(jobs), 'num_removed': len(removed), 'num_fields': len(self.fields), 'seconds': time()-start_time}
+
+    def search(self, query):
+        '''Find the strings that contain every token of a query
+
+        Args:
+            ``query`` (``str``): The query
+
+        Returns:
+            ``list`` of ``tuple``: The (field name, string ID) pairs of the matching strings, sorted
+        '''
+        tokens = sorted(set(tokenize(query)), key=lambda t: len(self.tokens.get(t, ())))
+        if len(tokens) == 0 or tokens[0] not in self.tokens:
+            return list()
+        matches = set(self.tokens[tokens[0]])
+        for token in tokens[1:]:
+            matches &= self.tokens.get(token, set())
+        return sorted(matches)
+
+    def save(self, filename):
+        '''Save this index (as gzipped JSON, written atomically)
+
+        Args:
+            ``filename`` (``str``): The output filename
+        '''
+        names = sorted(self.fields); number = {name:i for i,name in enumerate(names)}
+        tokens = {token:[x for name,i in sorted(postings) for x in (number[name],i)] for token,postings in self.tokens.items()}
+        with gzip_open(filename + '.tmp', 'wt', encoding='utf-8') as f:
+            dump({'version':INDEX_VERSION, 'field_names':names, 'fields':self.fields, 'digests':self.digests, 'tokens':tokens}, f, ensure_ascii=False, separators=(',',':'))
+        replace(filename + '.tmp', filename)
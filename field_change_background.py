@@ -17,6 +17,9 @@ if __name__ == "__main__":
     print("Input Image File: %s" % argv[2])
     print("Output Field File: %s" % argv[3])
     ff = FieldFile(argv[1])
-    ff.change_bg_image(argv[2])
-    data = ff.get_bytes()
-    f = open(argv[3],'wb'); f.write(data); f.close()
+    stats = ff.change_bg_image(argv[2])
+    print("Number of Tiles: %d" % stats['num_tiles'])
+    print("Number of Unique Tiles: %d (dedup ratio %.2f)" % (stats['num_unique_tiles'], stats['dedup_ratio']))
+    print("Number of Textures: %d" % stats['num_textures'])
+    print("Number of Color Pages: %d" % stats['num_color_pages'])
+    ff.write(argv[3])
@@ -4,15 +4,42 @@ Extract the background from a Field file
 Niema Moshiri 2019
 '''
 from PyFF7.field import FieldFile
-from os.path import isdir,isfile
+from os.path import isdir,isfile,splitext
 from sys import argv,stderr
-USAGE = "USAGE: %s <input_field_file> <output_image_file>" % argv[0]
+USAGE = "USAGE: %s <input_field_file> <output_image_file> [-flat] [-state <param>:<state> ...] [-frames]" % argv[0]
 
 if __name__ == "__main__":
-    if len(argv) != 3:
+    if len(argv) < 3 or argv[1] == '-h' or argv[1] == '--help':
         print(USAGE); exit(1)
+    flat = False; states = None; frames = False
+    i = 3
+    while i < len(argv):
+        if argv[i] == '-flat':
+            flat = True
+        elif argv[i] == '-state' and i+1 < len(argv) and ':' in argv[i+1]:
+            if states is None:
+                states = dict()
+            param,state = argv[i+1].split(':'); states.setdefault(int(param), set()).add(int(state)); i += 1
+        elif argv[i] == '-frames':
+            frames = True
+        else:
+            print(USAGE); exit(1)
+        i += 1
     if isdir(argv[2]) or isfile(argv[2]):
         raise ValueError("ERROR: Specified output directory exists: %s" % argv[2])
     print("Input File: %s" % argv[1])
     print("Output File: %s" % argv[2])
-    FieldFile(argv[1]).get_bg_image().save(argv[2])
+    ff = FieldFile(argv[1])
+    if flat:
+        ff.get_bg_image().save(argv[2])
+    else:
+        ff.render_bg_image(states).save(argv[2])
+    if frames: # one extra image per animation state, drawn over the tiles that are always shown
+        base,ext = splitext(argv[2])
+        try:
+            for param,param_states in ff.background.get_bg_states().items():
+                for state in param_states:
+                    fn = "%s_param%d_state%d%s" % (base, param, state, ext)
+                    ff.render_bg_image({param:{state}}).save(fn); print("Frame File: %s" % fn)
+        except BrokenPipeError:
+            stderr.close()
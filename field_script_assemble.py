@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+'''
+Assemble a Field Script disassembly into a Field File (or a directory of disassemblies into the Field Files of an LGP archive, in place)
+Niema Moshiri 2019
+'''
+from PyFF7.field import FieldFile,assemble_lgp
+from os.path import isdir,isfile
+from sys import argv,stderr
+USAGE = "USAGE: %s <input_field_file> <input_asm_file> <output_field_file>\n       %s <lgp_file> <input_asm_directory>" % (argv[0], argv[0])
+
+if __name__ == "__main__":
+    if len(argv) not in {3,4} or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    if not isfile(argv[1]):
+        raise ValueError("ERROR: Specified input file doesn't exist: %s" % argv[1])
+    try:
+        if len(argv) == 3:
+            if not isdir(argv[2]):
+                raise ValueError("ERROR: Specified input directory doesn't exist: %s" % argv[2])
+            print("LGP File: %s" % argv[1])
+            print("Input Directory: %s" % argv[2])
+            filenames = assemble_lgp(argv[1], argv[2])
+            print("Updated %d Field File(s)" % len(filenames))
+        else:
+            if isdir(argv[3]) or isfile(argv[3]):
+                raise ValueError("ERROR: Specified output file exists: %s" % argv[3])
+            print("Input Field File: %s" % argv[1])
+            print("Input Disassembly File: %s" % argv[2])
+            print("Output Field File: %s" % argv[3])
+            ff = FieldFile(argv[1])
+            with open(argv[2]) as f:
+                ff.field_script.assemble_text(f.read())
+            ff.write(argv[3])
+    except BrokenPipeError:
+        stderr.close()
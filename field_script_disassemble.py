@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+'''
+Disassemble the Field Script of a Field File (or of every Field File in an LGP archive)
+Niema Moshiri 2019
+'''
+from PyFF7.field import FieldFile,disassemble_lgp
+from os.path import isdir,isfile
+from sys import argv,stderr
+USAGE = "USAGE: %s <input_field_file_or_lgp> <output_asm_file_or_directory>" % argv[0]
+
+if __name__ == "__main__":
+    if len(argv) != 3 or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    if not isfile(argv[1]):
+        raise ValueError("ERROR: Specified input file doesn't exist: %s" % argv[1])
+    if isfile(argv[2]):
+        raise ValueError("ERROR: Specified output file exists: %s" % argv[2])
+    try:
+        print("Input File: %s" % argv[1])
+        if argv[1].lower().endswith('.lgp'):
+            print("Output Directory: %s" % argv[2])
+            filenames = disassemble_lgp(argv[1], argv[2])
+            print("Disassembled %d Field File(s)" % len(filenames))
+        else:
+            if isdir(argv[2]):
+                raise ValueError("ERROR: Specified output file is a directory: %s" % argv[2])
+            print("Output File: %s" % argv[2])
+            with open(argv[2], 'w') as f:
+                f.write(FieldFile(argv[1]).field_script.disassemble_text())
+    except BrokenPipeError:
+        stderr.close()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+'''
+Build (or incrementally update) the text index of the Field files in an LGP archive (e.g. flevel.lgp)
+Niema Moshiri 2019
+'''
+from PyFF7.textindex import TextIndex
+from os.path import isfile
+from sys import argv,stderr
+USAGE = "USAGE: %s <input_lgp_file> <index_file> [-j <num_workers>]" % argv[0]
+
+if __name__ == "__main__":
+    if len(argv) not in {3,5} or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    workers = 1
+    if len(argv) == 5:
+        if argv[3] != '-j':
+            print(USAGE); exit(1)
+        workers = int(argv[4])
+    if not isfile(argv[1]):
+        raise ValueError("ERROR: Specified LGP file doesn't exist: %s" % argv[1])
+    try:
+        print("LGP File: %s" % argv[1])
+        print("Index File: %s" % argv[2])
+        print("Number of Workers: %d" % workers)
+        index = TextIndex(argv[2] if isfile(argv[2]) else None)
+        stats = index.update(argv[1], workers=workers)
+        index.save(argv[2])
+        print("Decoded %d of %d files (%d removed) in %.3f seconds" % (stats['num_decoded'], stats['num_files'], stats['num_removed'], stats['seconds']))
+        print("Number of Indexed Fields: %d" % stats['num_fields'])
+        print("Number of Tokens: %d" % len(index.tokens))
+    except BrokenPipeError:
+        stderr.close()
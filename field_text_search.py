@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+'''
+Search the text of every Field file using a text index (see field_text_index.py)
+Niema Moshiri 2019
+'''
+from PyFF7.textindex import TextIndex
+from os.path import isfile
+from sys import argv,stderr
+USAGE = "USAGE: %s <index_file> <query>" % argv[0]
+
+if __name__ == "__main__":
+    if len(argv) < 3 or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    if not isfile(argv[1]):
+        raise ValueError("ERROR: Specified index file doesn't exist: %s" % argv[1])
+    try:
+        index = TextIndex(argv[1])
+        for field,string_id in index.search(' '.join(argv[2:])):
+            print("%s\t%d\t%s" % (field, string_id, index[field][string_id].replace('\n', '\\n')))
+    except BrokenPipeError:
+        stderr.close()
@@ -7,11 +7,15 @@ from PyFF7.lgp import pack_lgp
 from glob import glob
 from os.path import isdir,isfile
 from sys import argv,stderr
-USAGE = "USAGE: %s <input_directory> <output_lgp_file>" % argv[0]
+USAGE = "USAGE: %s <input_directory> <output_lgp_file> [-j <num_workers>]" % argv[0]
 
 if __name__ == "__main__":
-    if len(argv) != 3:
+    if len(argv) not in {3,5} or (len(argv) == 5 and argv[3] != '-j'):
         print(USAGE); exit(1)
+    if len(argv) == 5:
+        workers = int(argv[4])
+    else:
+        workers = 1
     if not isdir(argv[1]):
         raise ValueError("Invalid directory: %s" % argv[1])
     if isfile(argv[2]) or isdir(argv[2]):
@@ -21,6 +25,6 @@ if __name__ == "__main__":
         print("File Directory: %s" % argv[1])
         print("Number of Files: %d" % len(filenames))
         print("Output LGP: %s" % argv[2])
-        pack_lgp(filenames, argv[2])
+        pack_lgp(filenames, argv[2], workers=workers)
     except BrokenPipeError:
         stderr.close()
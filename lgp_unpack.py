@@ -3,32 +3,24 @@
 Unpack an LGP archive
 Niema Moshiri 2019
 '''
-from PyFF7.lgp import LGP
-from os import makedirs
+from PyFF7.lgp import unpack_lgp
 from os.path import isdir,isfile
 from sys import argv
-from warnings import warn
-USAGE = "USAGE: %s <input_lgp_file> <output_directory>" % argv[0]
+USAGE = "USAGE: %s <input_lgp_file> <output_directory> [-j <num_workers>]" % argv[0]
 
 if __name__ == "__main__":
-    if len(argv) != 3:
+    if len(argv) not in {3,5} or (len(argv) == 5 and argv[3] != '-j'):
         print(USAGE); exit(1)
     if isdir(argv[2]) or isfile(argv[2]):
         raise ValueError("ERROR: Specified output directory exists: %s" % argv[2])
-    lgp = LGP(argv[1]); makedirs(argv[2])
+    if len(argv) == 5:
+        workers = int(argv[4])
+    else:
+        workers = 1
     print("LGP File: %s" % argv[1])
     print("Output Directory: %s" % argv[2])
-    tot = len(lgp)
-    for i,e in enumerate(lgp.load_files()):
-        print("Extracting file %d of %d..." % (i+1,len(lgp)), end='\r')
-        if '/' in e[0]:
-            makedirs('%s/%s' % (argv[2], '/'.join(e[0].split('/')[:-1])), exist_ok=True)
-        filename = "%s/%s" % (argv[2],e[0])
-        try:
-            isfile(filename)
-        except:
-            filename = filename[:filename.index('.')+4] # weird characters in filename, so truncate extension
-        if isfile(filename):
-            warn("Duplicate file not unpacked: %s" % filename); tot -= 1
-        f = open(filename, 'wb'); f.write(e[1]); f.close()
-    print("Extracted %d of %d files successfully" % (tot,len(lgp)))
+    print("Number of Workers: %d" % workers)
+    stats = unpack_lgp(argv[1], argv[2], workers=workers)
+    tot = stats['num_files'] - stats['num_duplicates']
+    print("Extracted %d of %d files successfully" % (tot,stats['num_files']))
+    print("Extracted %d bytes in %.3f seconds (%.2f MB/s)" % (stats['num_bytes'], stats['seconds'], stats['num_bytes']/max(stats['seconds'],1e-9)/1000000))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+'''
+Update an LGP archive in place (add, replace, or remove files without repacking)
+Niema Moshiri 2019
+'''
+from PyFF7.lgp import update_lgp
+from os.path import isfile
+from sys import argv
+USAGE = "USAGE: %s <lgp_file> [-a <archive_path> <input_file>] [-r <archive_path>] [-c]" % argv[0]
+
+if __name__ == "__main__":
+    if len(argv) < 3 or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    if not isfile(argv[1]):
+        raise ValueError("ERROR: Specified LGP file doesn't exist: %s" % argv[1])
+    files = list(); remove = list(); compact = False; i = 2
+    while i < len(argv):
+        if argv[i] == '-a' and i+2 < len(argv):
+            files.append((argv[i+1], argv[i+2])); i += 3
+        elif argv[i] == '-r' and i+1 < len(argv):
+            remove.append(argv[i+1]); i += 2
+        elif argv[i] == '-c':
+            compact = True; i += 1
+        else:
+            print(USAGE); exit(1)
+    print("LGP File: %s" % argv[1])
+    stats = update_lgp(argv[1], files=files, remove=remove, compact=compact)
+    print("Added %d, replaced %d, and removed %d file(s)" % (stats['added'], stats['replaced'], stats['removed']))
+    print("Relocated %d file(s)" % stats['relocated'])
+    print("New LGP Size: %d bytes" % stats['filesize'])
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+'''
+Benchmark the LZSS compressors (the original Dictionary vs. the hash-chain match finder)
+Niema Moshiri 2019
+'''
+from PyFF7.lgp import LGP
+from PyFF7.lzss import compress_lzss,compress_lzss_fast,decompress_lzss_fast
+from struct import unpack
+from sys import argv,stderr
+from time import time
+USAGE = "USAGE: %s <input_file_or_lgp> [<input_file_or_lgp> ...]" % argv[0]
+
+# compressors to benchmark: (name, function)
+COMPRESSORS = [
+    ('Dictionary', lambda data: compress_lzss(data)),
+    ('HashChain (greedy)', lambda data: compress_lzss_fast(data)),
+    ('HashChain (lazy)', lambda data: compress_lzss_fast(data, lazy=True)),
+]
+
+def is_lzss(data):
+    '''Guess if ``data`` is LZSS-compressed (4-byte header equal to the size of the remaining data)'''
+    return len(data) > 4 and unpack('I', data[:4])[0] == len(data)-4
+
+def load_inputs(filenames):
+    '''Yield (name, uncompressed data) tuples from the given files (LGP archives are expanded, and LZSS-compressed files are decompressed)'''
+    for fn in filenames:
+        if fn.lower().endswith('.lgp'):
+            for name, data in LGP(fn).load_files():
+                yield ('%s/%s' % (fn, name), data)
+        else:
+            with open(fn, 'rb') as f:
+                yield (fn, f.read())
+
+if __name__ == "__main__":
+    if len(argv) < 2 or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    totals = {name: [0,0.] for name, func in COMPRESSORS}; total_size = 0
+    try:
+        print("FILENAME\tSIZE\t%s" % '\t'.join("%s SIZE\t%s TIME" % (name, name) for name, func in COMPRESSORS))
+        for name, data in load_inputs(argv[1:]):
+            if is_lzss(data):
+                data = decompress_lzss_fast(data)
+            row = [name, str(len(data))]; total_size += len(data)
+            for comp_name, func in COMPRESSORS:
+                start = time(); comp = func(data); elapsed = time()-start
+                if decompress_lzss_fast(comp) != data:
+                    raise ValueError("ERROR: %s round-trip failed: %s" % (comp_name, name))
+                totals[comp_name][0] += len(comp); totals[comp_name][1] += elapsed
+                row += [str(len(comp)), "%.3f" % elapsed]
+            print('\t'.join(row))
+        print()
+        print("Total Uncompressed Size: %d" % total_size)
+        for comp_name, func in COMPRESSORS:
+            comp_size, elapsed = totals[comp_name]
+            print("* %s: %d bytes (ratio %.4f) in %.3f seconds" % (comp_name, comp_size, comp_size/max(total_size,1), elapsed))
+    except BrokenPipeError:
+        stderr.close()
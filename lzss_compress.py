@@ -3,7 +3,7 @@
 LZSS-compress a file
 Niema Moshiri 2019
 '''
-from PyFF7.lzss import compress_lzss
+from PyFF7.lzss import compress_lzss_fast
 from os.path import isdir,isfile
 from sys import argv
 USAGE = "USAGE: %s <input_file> <output_lzss_file>" % argv[0]
@@ -15,5 +15,5 @@ if __name__ == "__main__":
         raise ValueError("ERROR: Specified output file exists: %s" % argv[2])
     print("Input File: %s" % argv[1])
     print("Output File: %s" % argv[2])
-    out_bytes = compress_lzss(argv[1])
+    out_bytes = compress_lzss_fast(argv[1])
     f = open(argv[2],'wb'); f.write(out_bytes); f.close()
@@ -3,7 +3,7 @@
 Decompress an LZSS-compressed file
 Niema Moshiri 2019
 '''
-from PyFF7.lzss import decompress_lzss
+from PyFF7.lzss import decompress_lzss_stream
 from os.path import isdir,isfile
 from sys import argv
 USAGE = "USAGE: %s <input_lzss_file> <output_file>" % argv[0]
@@ -15,5 +15,6 @@ if __name__ == "__main__":
         raise ValueError("ERROR: Specified output file exists: %s" % argv[2])
     print("LZSS File: %s" % argv[1])
     print("Output File: %s" % argv[2])
-    out_bytes = decompress_lzss(argv[1])
-    f = open(argv[2],'wb'); f.write(out_bytes); f.close()
+    with open(argv[2],'wb') as f:
+        for out_bytes in decompress_lzss_stream(argv[1]):
+            f.write(out_bytes)
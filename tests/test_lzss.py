@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+'''
+Regression checks for the LZSS compressors and decompressors: the fast/streaming paths must match the reference implementations byte for byte
+Niema Moshiri 2019
+'''
+from PyFF7.lzss import LZSSCompressor,LZSSDecompressor,compress_lzss,compress_lzss_fast,decompress_lzss,decompress_lzss_fast
+from random import Random
+from struct import pack
+
+def sample_inputs(seed=0):
+    '''Yield a mix of empty, random, repetitive, and text-like buffers'''
+    rng = Random(seed)
+    yield b''
+    yield b'\x00'
+    yield b'\x00' * 5000
+    for n in [1, 7, 18, 19, 100, 4095, 4096, 4097, 9000]:
+        yield bytes(rng.randrange(256) for _ in range(n))                         # random
+        yield bytes(rng.randrange(4) for _ in range(n))                           # few symbols
+        yield (b'FINAL FANTASY VII ' * (n//18 + 1))[:n]                           # repetitive
+        yield bytes(rng.choice(b'abc ') if rng.random() < 0.9 else rng.randrange(256) for _ in range(n))
+
+def feed_in_pieces(obj, data, rng):
+    '''Feed ``data`` to a streaming (de)compressor in random-sized pieces, and return everything it outputs'''
+    out = bytearray(); pos = 0
+    while pos < len(data):
+        n = rng.randrange(1, 700); out += obj.feed(data[pos:pos+n]); pos += n
+    out += obj.flush()
+    return bytes(out)
+
+def test_decompress_fast_matches_reference():
+    for data in sample_inputs():
+        comp = compress_lzss(data)
+        assert bytes(decompress_lzss_fast(comp)) == bytes(decompress_lzss(comp)) == data
+
+def test_decompress_fast_matches_reference_on_garbage():
+    rng = Random(1)
+    for _ in range(300):
+        body = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 300)))
+        comp = pack('I', len(body)) + body
+        assert bytes(decompress_lzss_fast(comp)) == bytes(decompress_lzss(comp))
+
+def test_streaming_decompressor_matches_reference():
+    rng = Random(2)
+    for data in sample_inputs():
+        comp = compress_lzss(data)
+        assert feed_in_pieces(LZSSDecompressor(), comp, rng) == data
+
+def test_compress_fast_round_trip():
+    for data in sample_inputs():
+        for lazy in [False, True]:
+            comp = compress_lzss_fast(data, lazy=lazy)
+            assert bytes(decompress_lzss(comp)) == data
+
+def test_streaming_compressor_matches_fast():
+    rng = Random(3)
+    for data in sample_inputs():
+        for lazy in [False, True]:
+            assert feed_in_pieces(LZSSCompressor(lazy=lazy), data, rng) == bytes(compress_lzss_fast(data, include_header=False, lazy=lazy))
+
+if __name__ == "__main__":
+    for name,func in sorted(globals().items()):
+        if name.startswith('test_'):
+            func(); print("%s: OK" % name)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+'''
+Convert all TEX files in a directory, glob pattern, or LGP archive to regular image files (or all image files to TEX files)
+Niema Moshiri 2019
+'''
+from PyFF7.tex import convert_tex_batch,DEFAULT_IMAGE_EXTENSION
+from sys import argv,stderr
+USAGE = "USAGE: %s <input_directory_glob_or_lgp> <output_directory> [-tex] [-ext <image_extension>] [-j <num_workers>] [-hash] [-force] [-bmp] [-quantize]" % argv[0]
+
+if __name__ == "__main__":
+    if len(argv) < 3 or argv[1] == '-h' or argv[1] == '--help':
+        print(USAGE); exit(1)
+    to_tex = False; out_ext = DEFAULT_IMAGE_EXTENSION; workers = 1; skip = 'mtime'; bmp_mode = False; quantize = False
+    i = 3
+    while i < len(argv):
+        if argv[i] == '-tex':
+            to_tex = True
+        elif argv[i] == '-ext' and i+1 < len(argv):
+            out_ext = argv[i+1]; i += 1
+        elif argv[i] == '-j' and i+1 < len(argv):
+            workers = int(argv[i+1]); i += 1
+        elif argv[i] == '-hash':
+            skip = 'hash'
+        elif argv[i] == '-force':
+            skip = None
+        elif argv[i] == '-bmp':
+            bmp_mode = True
+        elif argv[i] == '-quantize':
+            quantize = True
+        else:
+            print(USAGE); exit(1)
+        i += 1
+    try:
+        print("Input: %s" % argv[1])
+        print("Output Directory: %s" % argv[2])
+        print("Number of Workers: %d" % workers)
+        stats = convert_tex_batch(argv[1], argv[2], to_tex=to_tex, out_ext=out_ext, skip=skip, workers=workers, bmp_mode=bmp_mode, quantize=quantize)
+        print("Converted %d of %d files (%d skipped as unchanged) in %.3f seconds" % (stats['num_converted'], stats['num_files'], stats['num_skipped'], stats['seconds']))
+    except BrokenPipeError:
+        stderr.close()
@@ -7,14 +7,15 @@ from PyFF7.tex import TEX
 from PIL import Image
 from os.path import isdir,isfile
 from sys import argv,stderr
-USAGE = "USAGE: %s <input_image_file> <output_tex_file> [-bmp]" % argv[0]
+USAGE = "USAGE: %s <input_image_file> <output_tex_file> [-bmp] [-quantize]" % argv[0]
 
 if __name__ == "__main__":
-    if len(argv) != 3 and (len(argv) != 4 or argv[-1].lower() != '-bmp'):
+    flags = {a.lower() for a in argv[3:]}
+    if len(argv) < 3 or len(flags) != len(argv)-3 or len(flags-{'-bmp','-quantize'}) != 0:
         print(USAGE); exit(1)
     if isdir(argv[2]) or isfile(argv[2]):
         raise ValueError("ERROR: Specified output file exists: %s" % argv[2])
     img = Image.open(argv[1])
     tex = TEX(img)
-    data = tex.get_bytes(bmp_mode = (len(argv) == 4 and argv[-1].lower() == '-bmp'))
+    data = tex.get_bytes(bmp_mode = ('-bmp' in flags), quantize = ('-quantize' in flags))
     f = open(argv[2],'wb'); f.write(data); f.close()
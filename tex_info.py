@@ -20,6 +20,13 @@ if __name__ == "__main__":
         print("* File Name: %s" % filename)
         print("* Image Width: %d" % tex.get_width())
         print("* Image Height: %d" % tex.get_height())
+        if tex.header is not None:
+            print("* TEX Version: %d" % tex.header['HEADER_VERSION'])
+            print("* Number of Palettes: %d" % tex.header['HEADER_NUM-PALETTES'])
+            print("* Number of Colors per Palette: %d" % tex.header['HEADER_NUM-COLORS-PER-PALETTE'])
+            print("* Bit Depth: %d" % tex.header['HEADER_BIT-DEPTH'])
+            print("* Bytes per Pixel: %d" % tex.header['HEADER_BYTES-PER-PIXEL'])
+            print("* Color Key Flag: %d" % tex.header['HEADER_COLOR-KEY-FLAG'])
         print("* Unique RGBA Colors: %d" % tex.num_colors())
         for c in tex.unique_colors():
             print("  * (%d,%d,%d,%d)" % c)